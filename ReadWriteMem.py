@@ -1,10 +1,12 @@
 from typing import Any,  List, NewType
+import abc
+import errno
+import os
 import os.path
+import sys
+import threading
+import time
 import ctypes as c
-from ctypes import wintypes as w
-
-import win32process
-import win32api
 
 # Process Permissions
 PROCESS_QUERY_INFORMATION = 0x0400
@@ -14,35 +16,165 @@ PROCESS_VM_WRITE = 0x0020
 
 MAX_PATH = 260
 
-# Settings for 8Byte values
-k32 = c.windll.kernel32
+# Maximum number of iovec entries per process_vm_readv/process_vm_writev call
+IOV_MAX = 1024
+
+if sys.platform == 'win32':
+    from ctypes import wintypes as w
+
+    import win32process
+    import win32api
+
+    # Settings for 8Byte values
+    k32 = c.windll.kernel32
+
+    OpenProcess = k32.OpenProcess
+    OpenProcess.argtypes = [w.DWORD,w.BOOL,w.DWORD]
+    OpenProcess.restype = w.HANDLE
+
+    ReadProcessMemory = k32.ReadProcessMemory
+    ReadProcessMemory.argtypes = [w.HANDLE,w.LPCVOID,w.LPVOID,c.c_size_t,c.POINTER(c.c_size_t)]
+    ReadProcessMemory.restype = w.BOOL
 
-OpenProcess = k32.OpenProcess
-OpenProcess.argtypes = [w.DWORD,w.BOOL,w.DWORD]
-OpenProcess.restype = w.HANDLE
+    WriteProcessMemory = k32.WriteProcessMemory
+    WriteProcessMemory.argtypes = [w.HANDLE,w.LPCVOID,w.LPVOID,c.c_size_t,c.POINTER(c.c_size_t)]
+    WriteProcessMemory.restype = w.BOOL
 
-ReadProcessMemory = k32.ReadProcessMemory
-ReadProcessMemory.argtypes = [w.HANDLE,w.LPCVOID,w.LPVOID,c.c_size_t,c.POINTER(c.c_size_t)]
-ReadProcessMemory.restype = w.BOOL
+    GetLastError = k32.GetLastError
+    GetLastError.argtypes = None
+    GetLastError.restype = w.DWORD
 
-WriteProcessMemory = k32.WriteProcessMemory
-WriteProcessMemory.argtypes = [w.HANDLE,w.LPCVOID,w.LPVOID,c.c_size_t,c.POINTER(c.c_size_t)]
-WriteProcessMemory.restype = w.BOOL
+    CloseHandle = k32.CloseHandle
+    CloseHandle.argtypes = [w.HANDLE]
+    CloseHandle.restype = w.BOOL
+else:
+    libc = c.CDLL(None, use_errno=True)
+
+    class IOVec(c.Structure):
+        _fields_ = [('iov_base', c.c_void_p), ('iov_len', c.c_size_t)]
+
+    process_vm_readv = libc.process_vm_readv
+    process_vm_readv.argtypes = [c.c_int, c.POINTER(IOVec), c.c_ulong, c.POINTER(IOVec), c.c_ulong, c.c_ulong]
+    process_vm_readv.restype = c.c_ssize_t
+
+    process_vm_writev = libc.process_vm_writev
+    process_vm_writev.argtypes = [c.c_int, c.POINTER(IOVec), c.c_ulong, c.POINTER(IOVec), c.c_ulong, c.c_ulong]
+    process_vm_writev.restype = c.c_ssize_t
 
-GetLastError = k32.GetLastError
-GetLastError.argtypes = None
-GetLastError.restype = w.DWORD
 
-CloseHandle = k32.CloseHandle
-CloseHandle.argtypes = [w.HANDLE]
-CloseHandle.restype = w.BOOL
 class ReadWriteMemoryError(Exception):
     pass
 
 
-class Process(object):
+def to_address(value) -> int:
+    """Address from an int or a string such as '0x1B50'"""
+    return value if isinstance(value, int) else int(str(value), 0)
+
+
+class PointerChain(object):
+    """
+    Cached resolution of a base address plus offsets chain, as walked by Process.get_pointer.
+
+    The address read at every hop but the last is kept; once resolved, resolve only reads the penultimate hop's
+    pointer again and re-walks the chain if it changed, so a resolved chain costs one read instead of one per hop.
+    """
+    def __init__(self, process: "Process", base_address: int, offsets: List[int] = ()):
+        """
+        :param process: The opened process.
+        :param base_address: The address the chain starts from.
+        :param offsets: The offsets added to the pointer read at every hop.
+        """
+        self.process = process
+        self.hits = 0
+        self.misses = 0
+        self.re_resolves = 0
+        self.set_chain(base_address, offsets)
+
+    def set_chain(self, base_address: int, offsets: List[int] = ()):
+        """
+        Change the chain, the next resolve walks it from the base address.
+        """
+        self.base_address = to_address(base_address)
+        self.offsets = tuple(to_address(offset) for offset in offsets)
+        self.address = None
+        # Address of the last pointer in the chain and its value at the last walk
+        self._penultimate = None
+        self._penultimate_value = None
+
+    def resolve(self) -> int:
+        """
+        Get the final address of the chain.
+
+        :return: The address, like Process.get_pointer.
+        """
+        if not self.offsets:
+            return self.base_address
+        if self.address is None:
+            self.misses += 1
+            return self._walk()
+        if self.process.read(self._penultimate) == self._penultimate_value:
+            self.hits += 1
+            return self.address
+        self.re_resolves += 1
+        return self._walk()
+
+    def read(self, c_type=c.c_float) -> Any:
+        """
+        Read the value at the final address, validating the cached chain within the same vectored read.
+
+        :param c_type: ctypes type of the value.
+
+        :return: The value, raises ReadWriteMemoryError if it could not be read.
+        """
+        value = c_type()
+        if not self.read_at(0, c.addressof(value), c.sizeof(value)):
+            raise ReadWriteMemoryError(f'Unable to read the value at the end of the chain '
+                                       f'{hex(self.base_address)} {[hex(o) for o in self.offsets]}')
+        return value.value
+
+    def read_at(self, offset: int, local_address: int, size: int) -> bool:
+        """
+        Read size bytes from the final address plus offset into local memory, validating the cached chain within the
+        same vectored read.
+
+        :return: True if all bytes were read.
+        """
+        if not self.offsets or self.address is None:
+            return self.process.transfer([self.resolve() + offset], [local_address], [size], False) == size
+        pointer = c.c_uint64()
+        transferred = self.process.transfer([self._penultimate, self.address + offset],
+                                            [c.addressof(pointer), local_address], [c.sizeof(pointer), size], False)
+        if pointer.value == self._penultimate_value:
+            self.hits += 1
+            return transferred == c.sizeof(pointer) + size
+        self.re_resolves += 1
+        return self.process.transfer([self._walk() + offset], [local_address], [size], False) == size
+
+    def stats(self) -> dict:
+        return {'hits': self.hits, 'misses': self.misses, 're_resolves': self.re_resolves}
+
+    def _walk(self) -> int:
+        address = self.base_address
+        for hop, offset in enumerate(self.offsets):
+            value = self.process.read(address)
+            if not value:
+                self.address = None
+                raise ReadWriteMemoryError(f'Null pointer at hop {hop} ({hex(address)}) of the chain '
+                                           f'{hex(self.base_address)} {[hex(o) for o in self.offsets]}')
+            self._penultimate = address
+            self._penultimate_value = value
+            address = value + offset
+        self.address = address
+        return address
+
+
+class Process(abc.ABC):
     """
     The Process class holds the information about the requested process.
+
+    Memory is accessed through the platform's transfer, which copies a list of regions given as remote addresses,
+    local addresses and sizes; the vectored and typed read and write helpers are built on top of it. WindowsProcess
+    and LinuxProcess implement the platform specific methods.
     """
     def __init__(self, name: [str, bytes] = '', pid: int = -1, handle: int = -1, base_addr: int = -1, error_code: [str, bytes] = None):
         """
@@ -56,40 +188,60 @@ class Process(object):
         self.handle = handle
         self.base_addr = base_addr
         self.error_code = error_code
+        self._pointer_chains = {}
 
 
     def __repr__(self) -> str:
         return f'{self.__class__.__name__}: "{self.name}"'
 
+    @abc.abstractmethod
     def open(self):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def close(self) -> int:
+        raise NotImplementedError
+
+    @staticmethod
+    @abc.abstractmethod
+    def get_last_error() -> int:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def transfer(self, addresses: List[int], local_addresses: List[int], sizes: List[int], write: bool) -> int:
         """
-        Open the process with the Query, Operation, Read and Write permissions and return the process handle.
+        Copy regions between the process's memory and local memory.
 
-        :return: True if the handle exists if not return False
+        :param addresses: Addresses in the process.
+        :param local_addresses: Addresses of local buffers, e.g. from ctypes.addressof.
+        :param sizes: Size of every region in bytes.
+        :param write: Write the local buffers to the process instead of reading into them.
+
+        :return: The number of bytes transferred, less than sum(sizes) if a region could not be accessed.
         """
-        dw_desired_access = (PROCESS_QUERY_INFORMATION | PROCESS_VM_OPERATION | PROCESS_VM_READ | PROCESS_VM_WRITE)
-        b_inherit_handle = False
-        self.handle = OpenProcess(dw_desired_access, b_inherit_handle, self.pid)
-        if not self.handle:
-            raise ReadWriteMemoryError(f'Unable to open process <{self.name}>')
+        raise NotImplementedError
 
-    def close(self) -> int:
+    def read_vectored(self, regions: list) -> int:
         """
-        Closes the handle of the process.
+        Read several regions of the process's memory.
 
-        :return: The last error code from the result after an attempt to close the handle.
+        :param regions: (address, ctypes buffer) pairs, every buffer is filled with sizeof(buffer) bytes.
+
+        :return: The number of bytes read, less than the total size if a region could not be read.
         """
-        CloseHandle(self.handle)
-        return self.get_last_error()
+        return self.transfer([address for address, _ in regions], [c.addressof(buffer) for _, buffer in regions],
+                             [c.sizeof(buffer) for _, buffer in regions], False)
 
-    @staticmethod
-    def get_last_error() -> int:
+    def write_vectored(self, regions: list) -> int:
         """
-        Get the last error code.
+        Write several regions of the process's memory.
 
-        :return: The last error code.
+        :param regions: (address, ctypes buffer) pairs, sizeof(buffer) bytes are written from every buffer.
+
+        :return: The number of bytes written.
         """
-        return GetLastError()
+        return self.transfer([address for address, _ in regions], [c.addressof(buffer) for _, buffer in regions],
+                             [c.sizeof(buffer) for _, buffer in regions], True)
 
     def get_pointer(self, lp_base_address: hex, offsets: List[hex] = ()) -> int:
         """
@@ -100,15 +252,22 @@ class Process(object):
 
         :return: The pointer of a give address.
         """
-        temp_address = self.read(lp_base_address)
-        pointer = 0x0
-        if not offsets:
-            return lp_base_address
-        else:
-            for offset in offsets:
-                pointer = int(str(temp_address), 0) + int(str(offset), 0)
-                temp_address = self.read(pointer)
-            return pointer
+        return self.pointer_chain(lp_base_address, offsets).resolve()
+
+    def pointer_chain(self, lp_base_address: hex, offsets: List[hex] = ()) -> PointerChain:
+        """
+        Get the cached PointerChain of a base address and offsets, created on first use.
+
+        :param lp_base_address: The address from where you want to get the pointer.
+        :param offsets: a list of offets.
+
+        :return: The PointerChain, shared by all get_pointer calls with the same chain.
+        """
+        key = (to_address(lp_base_address), tuple(to_address(offset) for offset in offsets))
+        chain = self._pointer_chains.get(key)
+        if chain is None:
+            chain = self._pointer_chains[key] = PointerChain(self, *key)
+        return chain
 
     def read(self, lp_base_address: int) -> Any:
         """
@@ -118,20 +277,7 @@ class Process(object):
 
         :return: The data from the process's memory if succeed if not raises an exception.
         """
-        try:
-            read_buffer = c.c_uint64()
-            lp_buffer = c.byref(read_buffer)
-            n_size = c.sizeof(read_buffer)
-            lp_number_of_bytes_read = c.c_ulonglong(0)
-            ReadProcessMemory(self.handle, lp_base_address, lp_buffer,n_size, lp_number_of_bytes_read)
-            return read_buffer.value
-        except (BufferError, ValueError, TypeError) as error:
-            if self.handle:
-                self.close()
-            self.error_code = self.get_last_error()
-            error = {'msg': str(error), 'Handle': self.handle, 'PID': self.pid,
-                     'Name': self.name, 'ErrorCode': self.error_code}
-            ReadWriteMemoryError(error)
+        return self.read_many([lp_base_address], c.c_uint64)[0]
 
     def read_float(self, lp_base_address: int) -> Any:
         """
@@ -141,20 +287,7 @@ class Process(object):
 
         :return: The data from the process's memory if succeed if not raises an exception.
         """
-        try:
-            read_buffer = c.c_float()
-            lp_buffer = c.byref(read_buffer)
-            n_size = c.sizeof(read_buffer)
-            lp_number_of_bytes_read = c.c_ulonglong(0)
-            ReadProcessMemory(self.handle, lp_base_address, lp_buffer,n_size, lp_number_of_bytes_read)
-            return read_buffer.value
-        except (BufferError, ValueError, TypeError) as error:
-            if self.handle:
-                self.close()
-            self.error_code = self.get_last_error()
-            error = {'msg': str(error), 'Handle': self.handle, 'PID': self.pid,
-                     'Name': self.name, 'ErrorCode': self.error_code}
-            ReadWriteMemoryError(error)
+        return self.read_many([lp_base_address], c.c_float)[0]
 
     def write(self, lp_base_address: int, value: float) -> bool:
         """
@@ -165,21 +298,310 @@ class Process(object):
 
         :return: It returns True if succeed if not it raises an exception.
         """
+        return self.write_many([lp_base_address], [value], c.c_float)
+
+    def read_many(self, addresses: List[int], c_type=c.c_uint64) -> list:
+        """
+        Read one value of c_type from each address, with a single system call where the platform supports it.
+
+        :param addresses: The process's pointers.
+        :param c_type: ctypes type of the values.
+
+        :return: The values, raises ReadWriteMemoryError if any address could not be read.
+        """
+        try:
+            values = (c_type * len(addresses))()
+            size = c.sizeof(c_type)
+            local_address = c.addressof(values)
+            read = self.transfer(addresses, range(local_address, local_address + size * len(addresses), size),
+                                 [size] * len(addresses), False)
+        except (BufferError, ValueError, TypeError) as error:
+            self._fail(error)
+        if read != size * len(addresses):
+            raise ReadWriteMemoryError({'msg': f'Read {read} of {size * len(addresses)} bytes', 'PID': self.pid,
+                                        'Name': self.name, 'ErrorCode': self.error_code})
+        return values[:]
+
+    def write_many(self, addresses: List[int], values: list, c_type=c.c_float) -> bool:
+        """
+        Write one value of c_type to each address, with a single system call where the platform supports it.
+
+        :param addresses: The process's pointers.
+        :param values: The data to be written, one value per address.
+        :param c_type: ctypes type of the values.
+
+        :return: True if every value was written.
+        """
         try:
-            write_buffer = c.c_float(value)
-            lp_buffer = c.byref(write_buffer)
-            n_size = c.sizeof(write_buffer)
-            lp_number_of_bytes_written = c.c_ulonglong(0)
-            WriteProcessMemory(self.handle, lp_base_address, lp_buffer,
-                                                      n_size, lp_number_of_bytes_written)
-            return True
+            buffer = (c_type * len(addresses))(*values)
+            size = c.sizeof(c_type)
+            local_address = c.addressof(buffer)
+            written = self.transfer(addresses, range(local_address, local_address + size * len(addresses), size),
+                                    [size] * len(addresses), True)
+            return written == size * len(addresses)
         except (BufferError, ValueError, TypeError) as error:
-            if self.handle:
-                self.close()
-            self.error_code = self.get_last_error()
-            error = {'msg': str(error), 'Handle': self.handle, 'PID': self.pid,
-                     'Name': self.name, 'ErrorCode': self.error_code}
-            ReadWriteMemoryError(error)
+            self._fail(error)
+
+    def _fail(self, error: Exception):
+        if self.handle:
+            self.close()
+        self.error_code = self.get_last_error()
+        error = {'msg': str(error), 'Handle': self.handle, 'PID': self.pid,
+                 'Name': self.name, 'ErrorCode': self.error_code}
+        raise ReadWriteMemoryError(error)
+
+
+class WindowsProcess(Process):
+    """
+    Process memory access through ReadProcessMemory/WriteProcessMemory, one call per region.
+    """
+
+    def open(self):
+        """
+        Open the process with the Query, Operation, Read and Write permissions and return the process handle.
+
+        :return: True if the handle exists if not return False
+        """
+        dw_desired_access = (PROCESS_QUERY_INFORMATION | PROCESS_VM_OPERATION | PROCESS_VM_READ | PROCESS_VM_WRITE)
+        b_inherit_handle = False
+        self.handle = OpenProcess(dw_desired_access, b_inherit_handle, self.pid)
+        if not self.handle:
+            raise ReadWriteMemoryError(f'Unable to open process <{self.name}>')
+        # Pointers resolved in a previous session of the process are stale
+        self._pointer_chains.clear()
+
+    def close(self) -> int:
+        """
+        Closes the handle of the process.
+
+        :return: The last error code from the result after an attempt to close the handle.
+        """
+        CloseHandle(self.handle)
+        return self.get_last_error()
+
+    @staticmethod
+    def get_last_error() -> int:
+        """
+        Get the last error code.
+
+        :return: The last error code.
+        """
+        return GetLastError()
+
+    def transfer(self, addresses: List[int], local_addresses: List[int], sizes: List[int], write: bool) -> int:
+        function = WriteProcessMemory if write else ReadProcessMemory
+        total = 0
+        number_of_bytes = c.c_size_t(0)
+        for address, local_address, size in zip(addresses, local_addresses, sizes):
+            number_of_bytes.value = 0
+            if not function(self.handle, address, local_address, size, c.byref(number_of_bytes)):
+                self.error_code = self.get_last_error()
+            total += number_of_bytes.value
+        return total
+
+
+class LinuxProcess(Process):
+    """
+    Process memory access through process_vm_readv/process_vm_writev, all regions of a call are transferred with one
+    system call (per IOV_MAX regions). The handle is the pid; reading another process needs ptrace access to it, e.g.
+    being its parent or having CAP_SYS_PTRACE.
+    """
+
+    def open(self):
+        """
+        Check that the process exists, there is no handle to open on Linux.
+        """
+        if not os.path.exists(f'/proc/{self.pid}'):
+            raise ReadWriteMemoryError(f'Unable to open process <{self.name}>')
+        self.handle = self.pid
+        # Pointers resolved in a previous session of the process are stale
+        self._pointer_chains.clear()
+
+    def close(self) -> int:
+        self.handle = -1
+        return 0
+
+    @staticmethod
+    def get_last_error() -> int:
+        """
+        Get the errno of the last failed transfer.
+
+        :return: The last error code.
+        """
+        return c.get_errno()
+
+    def transfer(self, addresses: List[int], local_addresses: List[int], sizes: List[int], write: bool) -> int:
+        function = process_vm_writev if write else process_vm_readv
+        total = 0
+        for start in range(0, len(addresses), IOV_MAX):
+            stop = min(start + IOV_MAX, len(addresses))
+            count = stop - start
+            # iovec arrays filled as flat (base, length) word pairs
+            local = (c.c_size_t * (2 * count))()
+            remote = (c.c_size_t * (2 * count))()
+            local[0::2] = local_addresses[start:stop]
+            local[1::2] = remote[1::2] = sizes[start:stop]
+            remote[0::2] = addresses[start:stop]
+            transferred = function(self.pid, c.cast(local, c.POINTER(IOVec)), count,
+                                   c.cast(remote, c.POINTER(IOVec)), count, 0)
+            if transferred < 0:
+                self.error_code = self.get_last_error()
+                break
+            total += transferred
+            if transferred < sum(sizes[start:stop]):
+                # Transfers stop at the first region that could not be accessed
+                self.error_code = errno.EFAULT
+                break
+        return total
+
+    def get_module_base(self, module_name: str = None) -> int:
+        """
+        Lowest mapped address of a module, from /proc/<pid>/maps.
+
+        :param module_name: File name of the module, the executable by default.
+
+        :return: The base address of the module.
+        """
+        if module_name is None:
+            module_name = os.path.basename(os.readlink(f'/proc/{self.pid}/exe'))
+        with open(f'/proc/{self.pid}/maps') as maps:
+            for line in maps:
+                fields = line.split(maxsplit=5)
+                if len(fields) == 6 and os.path.basename(fields[5].rstrip('\n')) == module_name:
+                    return int(fields[0].split('-')[0], 16)
+        raise ReadWriteMemoryError(f'Module "{module_name}" is not mapped in process {self.pid}')
+
+
+PlatformProcess = WindowsProcess if sys.platform == 'win32' else LinuxProcess
+
+
+class ProcessIndex(object):
+    """
+    Executable name to PIDs map of the running processes.
+
+    refresh only looks up the names of PIDs that appeared since the previous refresh and drops PIDs that exited, so
+    keeping the index around makes repeated lookups cheap. Names are compared case-insensitively on Windows, where
+    '.exe' is appended to names without it.
+    """
+    def __init__(self):
+        self._names = {}
+        self._pids = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def normalize(process_name: str) -> str:
+        if sys.platform != 'win32':
+            return process_name
+        process_name = process_name.lower()
+        return process_name if process_name.endswith('.exe') else process_name + '.exe'
+
+    @staticmethod
+    def process_name(process_id: int) -> str:
+        """
+        Get the executable's file name of a process.
+
+        :param process_id: The process ID.
+
+        :return: The name, None if the process exited or cannot be inspected.
+        """
+        if sys.platform != 'win32':
+            try:
+                return os.path.basename(os.readlink(f'/proc/{process_id}/exe'))
+            except OSError:
+                try:
+                    with open(f'/proc/{process_id}/comm') as comm:
+                        return comm.read().rstrip('\n')
+                except OSError:
+                    return None
+
+        handle = OpenProcess(PROCESS_QUERY_INFORMATION, False, process_id)
+        if not handle:
+            return None
+        try:
+            image_file_name = (c.c_char * MAX_PATH)()
+            if c.windll.psapi.GetProcessImageFileNameA(handle, image_file_name, MAX_PATH) > 0:
+                return os.path.basename(image_file_name.value).decode('utf-8')
+            return None
+        finally:
+            CloseHandle(handle)
+
+    def refresh(self):
+        """
+        Update the index with the processes started and exited since the previous refresh.
+        """
+        process_ids = set(ReadWriteMemory.enumerate_processes())
+        with self._lock:
+            for process_id in set(self._names) - process_ids:
+                self._remove(process_id)
+            for process_id in process_ids - set(self._names):
+                name = self.process_name(process_id)
+                if name is not None:
+                    self._names[process_id] = name
+                    self._pids.setdefault(self.normalize(name), set()).add(process_id)
+
+    def find(self, process_name: str, refresh: bool = True) -> list:
+        """
+        Get the PIDs of the processes running an executable.
+
+        :param process_name: The name of the executable file, for example my_program.exe.
+        :param refresh: Refresh the index first.
+
+        :return: The PIDs, oldest first as far as PIDs tell.
+        """
+        if refresh:
+            self.refresh()
+        process_name = self.normalize(process_name)
+        with self._lock:
+            process_ids = sorted(self._pids.get(process_name, ()))
+        # A PID may have been reused since it was indexed
+        found = []
+        for process_id in process_ids:
+            name = self.process_name(process_id)
+            if name is not None and self.normalize(name) == process_name:
+                found.append(process_id)
+            else:
+                with self._lock:
+                    self._remove(process_id)
+        return found
+
+    def wait_for(self, process_name: str, timeout: float = None, stop_event: threading.Event = None,
+                 min_interval: float = 0.1, max_interval: float = 2.0) -> int:
+        """
+        Wait for a process running an executable to appear.
+
+        Neither Windows nor /proc notify about new processes without elevated rights, so the index is refreshed with
+        an interval growing from min_interval to max_interval; a refresh only inspects the PIDs that are new.
+
+        :param process_name: The name of the executable file.
+        :param timeout: Seconds to wait at most, None to wait until found or stopped.
+        :param stop_event: Set to abandon the wait from another thread.
+
+        :return: The PID, None if the wait timed out or was stopped.
+        """
+        stop_event = stop_event or threading.Event()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        interval = min_interval
+        while True:
+            process_ids = self.find(process_name)
+            if process_ids:
+                return process_ids[0]
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                interval = min(interval, remaining)
+            if stop_event.wait(interval):
+                return None
+            interval = min(interval * 2, max_interval)
+
+    def _remove(self, process_id: int):
+        name = self._names.pop(process_id, None)
+        if name is not None:
+            process_ids = self._pids.get(self.normalize(name))
+            if process_ids is not None:
+                process_ids.discard(process_id)
+                if not process_ids:
+                    del self._pids[self.normalize(name)]
 
 
 class ReadWriteMemory:
@@ -187,7 +609,8 @@ class ReadWriteMemory:
     The ReadWriteMemory Class is used to read and write to the memory of a running process.
     """
     def __init__(self):
-        self.process = Process()
+        self.process = PlatformProcess()
+        self.index = ProcessIndex()
 
     def get_process_by_name(self, process_name: [str, bytes]) -> "Process":
         """
@@ -197,32 +620,25 @@ class ReadWriteMemory:
 
         :return: A Process object containing the information from the requested Process.
         """
-        if not process_name.endswith('.exe'):
-            self.process.name = process_name + '.exe'
+        process_ids = self.index.find(process_name)
+        if not process_ids:
+            raise ReadWriteMemoryError(f'Process "{process_name}" not found!')
+        return self._set_process(process_ids[0])
 
-        process_ids = self.enumerate_processes()
+    def wait_for_process(self, process_name: [str, bytes], timeout: float = None,
+                         stop_event: threading.Event = None) -> "Process":
+        """
+        :description: Wait for a process to start, see ProcessIndex.wait_for, and return a Process object.
 
-        for process_id in process_ids:
-            self.process.handle = OpenProcess(PROCESS_QUERY_INFORMATION, False, process_id)
-            if self.process.handle:
-                image_file_name = (c.c_char * MAX_PATH)()
-                if c.windll.psapi.GetProcessImageFileNameA(self.process.handle, image_file_name, MAX_PATH) > 0:
-                    filename = os.path.basename(image_file_name.value)
-                    if filename.decode('utf-8') == process_name:
-                        self.process.pid = process_id
-                        self.process.name = process_name
-
-                        # Get Base Address
-                        PROCESS_ALL_ACCESS = 0x1F0FFF
-                        processHandle = win32api.OpenProcess(PROCESS_ALL_ACCESS, False, self.process.pid)
-                        modules = win32process.EnumProcessModules(processHandle)
-                        processHandle.close()
-                        self.process.base_addr = modules[0]
-
-                        return self.process
-                self.process.close()
-
-        raise ReadWriteMemoryError(f'Process "{self.process.name}" not found!')
+        :param process_name: The name of the executable file for the specified process for example, my_program.exe.
+        :param timeout: Seconds to wait at most, None to wait until found or stopped.
+
+        :return: A Process object containing the information from the requested Process.
+        """
+        process_id = self.index.wait_for(process_name, timeout, stop_event)
+        if process_id is None:
+            raise ReadWriteMemoryError(f'Process "{process_name}" not found!')
+        return self._set_process(process_id)
 
     def get_process_by_id(self, process_id: int) -> "Process":
         """
@@ -232,20 +648,12 @@ class ReadWriteMemory:
 
         :return: A Process object containing the information from the requested Process.
         """
-
-        self.process.handle = OpenProcess(PROCESS_QUERY_INFORMATION, False, process_id)
-        if self.process.handle:
-            image_file_name = (c.c_char * MAX_PATH)()
-            if c.windll.psapi.GetProcessImageFileNameA(self.process.handle, image_file_name, MAX_PATH) > 0:
-                filename = os.path.basename(image_file_name.value)
-                self.process.pid = process_id
-                self.process.name = filename.decode('utf-8')
-                self.process.close()
-                return self.process
-            else:
-                raise ReadWriteMemoryError(f'Unable to get the executable\'s name for PID={self.process.pid}!')
-
-        raise ReadWriteMemoryError(f'Process "{self.process.pid}" not found!')
+        name = self.index.process_name(process_id)
+        if name is None:
+            raise ReadWriteMemoryError(f'Process "{process_id}" not found!')
+        self.process.pid = process_id
+        self.process.name = name
+        return self.process
 
     @staticmethod
     def enumerate_processes() -> list:
@@ -254,6 +662,9 @@ class ReadWriteMemory:
 
         :return: A list of processes ID's
         """
+        if sys.platform != 'win32':
+            return [int(entry) for entry in os.listdir('/proc') if entry.isdigit()]
+
         count = 32
         while True:
             process_ids = (w.DWORD * count)()
@@ -261,6 +672,19 @@ class ReadWriteMemory:
             bytes_returned = w.DWORD()
             if c.windll.Psapi.EnumProcesses(c.byref(process_ids), cb, c.byref(bytes_returned)):
                 if bytes_returned.value < cb:
-                    return list(set(process_ids))
+                    return list(set(process_ids[:bytes_returned.value // c.sizeof(w.DWORD)]))
                 else:
                     count *= 2
+
+    def _set_process(self, process_id: int) -> "Process":
+        self.get_process_by_id(process_id)
+        # Get Base Address
+        if sys.platform != 'win32':
+            self.process.base_addr = self.process.get_module_base(self.process.name)
+        else:
+            PROCESS_ALL_ACCESS = 0x1F0FFF
+            processHandle = win32api.OpenProcess(PROCESS_ALL_ACCESS, False, process_id)
+            modules = win32process.EnumProcessModules(processHandle)
+            processHandle.close()
+            self.process.base_addr = modules[0]
+        return self.process
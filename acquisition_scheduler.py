@@ -0,0 +1,118 @@
+"""
+Adaptive board polling.
+
+AdaptivePollScheduler picks the acquisition poll interval from the rate at which samples actually arrive instead of a
+fixed 40 ms: each poll should return about target_interval * sampling_rate samples, the interval never exceeds
+max_interval so latency stays bounded, and it backs off while the processing side has a backlog so that fewer,
+larger chunks are handed over. PollStats keeps rate, wake-up jitter, overrun and chunk size statistics of the loop.
+"""
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+
+class PollStats:
+    """
+    Rolling statistics of a polling loop.
+
+    :param history: Number of most recent polls the jitter percentiles are computed over.
+    """
+
+    def __init__(self, history: int = 1000):
+        self.polls = 0
+        self.empty_polls = 0
+        self.overruns = 0
+        self.samples = 0
+        self._jitter = deque(maxlen=history)
+        self._first = None
+        self._last = None
+        self._lock = threading.Lock()
+
+    def record(self, jitter: float, num_samples: int, overrun: bool):
+        """
+        :param jitter: Seconds between the scheduled and the actual wake up.
+        :param num_samples: Samples returned by the poll.
+        :param overrun: Whether the previous iteration took longer than its interval.
+        """
+        now = time.perf_counter()
+        with self._lock:
+            if self._first is None:
+                self._first = now
+            self._last = now
+            self.polls += 1
+            self.samples += num_samples
+            self.empty_polls += num_samples == 0
+            self.overruns += overrun
+            self._jitter.append(jitter)
+
+    def snapshot(self) -> dict:
+        """Counters, achieved poll rate plus mean, p95 and max wake up jitter in milliseconds"""
+        with self._lock:
+            jitter = np.array(self._jitter) * 1e3
+            polls, empty_polls, overruns, samples = self.polls, self.empty_polls, self.overruns, self.samples
+            elapsed = self._last - self._first if polls > 1 else 0.0
+        return {
+            'polls': polls,
+            'rate_hz': (polls - 1) / elapsed if elapsed > 0 else 0.0,
+            'empty_polls': empty_polls,
+            'overruns': overruns,
+            'mean_samples_per_poll': samples / polls if polls else 0.0,
+            'jitter_mean_ms': float(jitter.mean()) if len(jitter) else 0.0,
+            'jitter_p95_ms': float(np.percentile(jitter, 95)) if len(jitter) else 0.0,
+            'jitter_max_ms': float(jitter.max()) if len(jitter) else 0.0
+        }
+
+
+class AdaptivePollScheduler:
+    """
+    :param sampling_rate: Nominal sampling rate of the board, the starting point of the arrival rate estimate.
+    :param target_interval: Interval aimed for while samples arrive at the nominal rate and processing keeps up.
+    :param min_interval: Lower bound, keeps the loop from spinning on fast boards.
+    :param max_interval: Upper bound on the interval and so on the acquisition latency.
+    :param backlog_threshold: Queued chunks above which the scheduler backs off.
+    """
+
+    def __init__(self, sampling_rate: float, target_interval: float = 0.04, min_interval: float = 0.005,
+                 max_interval: float = 0.25, backlog_threshold: int = 1):
+        self.sampling_rate = sampling_rate
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backlog_threshold = backlog_threshold
+        # At least one sample per poll
+        self.target_samples = max(1.0, target_interval * sampling_rate)
+        self.rate = float(sampling_rate)
+        self.backoff = 1.0
+        self.interval = self._clamp(self.target_samples / self.rate)
+        self.stats = PollStats()
+        self._last_poll = None
+
+    def _clamp(self, interval: float) -> float:
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    def update(self, now: float, num_samples: int, backlog: int = 0) -> float:
+        """
+        Account for a finished poll and compute the next interval.
+
+        :param now: time.perf_counter() of the poll.
+        :param num_samples: Samples the poll returned.
+        :param backlog: Chunks waiting for the processing side.
+
+        :return: Seconds until the next poll.
+        """
+        if self._last_poll is not None and now > self._last_poll:
+            # Smoothed arrival rate, bursty boards deliver packets rather than single samples
+            observed = num_samples / (now - self._last_poll)
+            self.rate = 0.8 * self.rate + 0.2 * observed
+        self._last_poll = now
+
+        if backlog > self.backlog_threshold:
+            self.backoff = min(self.backoff * 1.5, self.max_interval / self.min_interval)
+        elif num_samples == 0:
+            self.backoff = min(self.backoff * 1.25, self.max_interval / self.min_interval)
+        else:
+            self.backoff = max(1.0, self.backoff * 0.8)
+
+        self.interval = self._clamp(self.target_samples / max(self.rate, 1e-3) * self.backoff)
+        return self.interval
@@ -0,0 +1,152 @@
+"""
+Batched band power feature extraction shared by the band power monitor and the concentration classifier.
+
+The session used to run detrend + get_psd_welch + three get_band_power calls per channel for the band power monitor,
+then DataFilter.get_avg_band_powers over the whole window, which filtered every channel and computed its Welch PSD a
+second time. BandPowerExtractor computes each PSD once, batched over all channels, and derives from them:
+
+* absolute delta, theta, alpha, beta and gamma powers per channel;
+* channel averaged theta (3-7 Hz), alpha (8-13 Hz) and beta (14-30 Hz) powers shown on the band power monitor,
+  computed the way the session always did so the monitor stays comparable with earlier sessions: Blackman-Harris Welch
+  PSD with nfft the nearest power of two of the sampling rate and 50% overlap, over the linearly detrended latest
+  power of two samples of the processed window;
+* the classifier feature vector, channel averaged band powers relative to their sum followed by the standard deviations
+  across channels relative to the averages, laid out and normalized like the get_avg_band_powers output.
+
+The feature PSD comes from a StreamingWelch over the unfiltered window, so that segment periodograms can be reused
+across classifications. get_avg_band_powers instead detrends the whole window, runs the 50 Hz and 60 Hz bandstops and
+the 0.5-47.5 Hz bandpass over it in the time domain and then computes its Hann windowed Welch PSD. Here the filters are
+applied as their squared magnitude responses on the PSD and every segment is detrended on its own. The feature vector
+therefore differs from get_avg_band_powers by:
+
+* the filter transients at the start of the window, which the time domain filters add and the weighting does not;
+* the low frequency content removed by per segment instead of whole window detrending, mostly in the delta band;
+* the segment positions, StreamingWelch aligns segments to absolute sample positions rather than to the window start.
+
+On synthetic sessions the averages stay within about 0.003 and the relative deviations within about 0.011 of
+get_avg_band_powers, which moves the concentration score of the regression model by at most about 0.05.
+benchmarks/band_power_features_check.py measures both and fails above 0.02 per feature or 0.1 in score.
+"""
+import numpy as np
+
+from brainflow.data_filter import WindowFunctions
+from brainflow.dsp_cache import dsp_cache
+from brainflow.numpy_data_handler import AVG_BANDS, band_power, native_linear_detrend, welch
+
+from psd_engine import StreamingWelch, nearest_power_of_two
+
+# delta, theta, alpha, beta, gamma, the bands get_avg_band_powers uses
+BANDS = AVG_BANDS
+# theta, alpha, beta as shown on the band power monitor, with the window function of its Welch PSD
+MONITOR_BANDS = ((3.0, 7.0), (8.0, 13.0), (14.0, 30.0))
+MONITOR_WINDOW_FUNCTION = WindowFunctions.BLACKMAN_HARRIS.value
+# (center, width) of the mains interference bandstops and of the bandpass get_avg_band_powers applies
+MAINS_BANDSTOPS = ((50.0, 4.0), (60.0, 4.0))
+BANDPASS = (24.0, 47.0)
+# get_avg_band_powers computes its Welch PSD with a Hann window and segments overlapping by 4/5
+WINDOW_FUNCTION = WindowFunctions.HANNING.value
+
+
+def butterworth_bandstop_response(freqs: np.ndarray, sampling_rate: int, center_freq: float, band_width: float,
+                                  order: int) -> np.ndarray:
+    """
+    Squared magnitude response of the bilinear transform Butterworth bandstop DataFilter.perform_bandstop applies.
+
+    Multiplying a PSD by it gives the steady state PSD of the filtered signal, without running the filter.
+    """
+    warped = np.tan(np.pi * np.asarray(freqs) / sampling_rate)
+    low = np.tan(np.pi * (center_freq - band_width / 2.0) / sampling_rate)
+    high = np.tan(np.pi * (center_freq + band_width / 2.0) / sampling_rate)
+    with np.errstate(divide='ignore'):
+        ratio = (high - low) * warped / (low * high - warped ** 2)
+    return 1.0 / (1.0 + ratio ** (2 * order))
+
+
+def butterworth_bandpass_response(freqs: np.ndarray, sampling_rate: int, center_freq: float, band_width: float,
+                                  order: int) -> np.ndarray:
+    """Squared magnitude response of the bilinear transform Butterworth bandpass DataFilter.perform_bandpass applies"""
+    warped = np.tan(np.pi * np.asarray(freqs) / sampling_rate)
+    low = np.tan(np.pi * (center_freq - band_width / 2.0) / sampling_rate)
+    high = np.tan(np.pi * (center_freq + band_width / 2.0) / sampling_rate)
+    with np.errstate(divide='ignore'):
+        ratio = (warped ** 2 - low * high) / ((high - low) * warped)
+    return 1.0 / (1.0 + ratio ** (2 * order))
+
+
+class BandPowerFeatures:
+    """
+    :param band_powers: (channels x 5) absolute delta, theta, alpha, beta and gamma powers.
+    :param monitor_band_powers: Channel averaged theta, alpha and beta powers for the band power monitor.
+    :param feature_vector: Channel averaged band powers relative to their sum, followed by the standard deviations
+        across channels relative to the channel averages.
+    """
+    __slots__ = ('band_powers', 'monitor_band_powers', 'feature_vector')
+
+    def __init__(self, band_powers, monitor_band_powers, feature_vector):
+        self.band_powers = band_powers
+        self.monitor_band_powers = monitor_band_powers
+        self.feature_vector = feature_vector
+
+
+class BandPowerExtractor:
+    """
+    :param sampling_rate: Sampling rate of the input data.
+    :param apply_filter: Weight the PSD by the 50 Hz and 60 Hz bandstops and the bandpass before computing the
+        features, the counterpart of get_avg_band_powers with apply_filter=True.
+    """
+
+    def __init__(self, sampling_rate: int, apply_filter: bool = True):
+        self.sampling_rate = sampling_rate
+        self.apply_filter = apply_filter
+        # get_avg_band_powers starts from twice the sampling rate and halves nfft until it fits into the window
+        self.nfft = 2 * nearest_power_of_two(sampling_rate)
+        self.monitor_nfft = nearest_power_of_two(sampling_rate)
+
+    def filter_response(self, freqs: np.ndarray) -> np.ndarray:
+        """Combined squared magnitude response of the bandstops and the bandpass at freqs, cached in dsp_cache"""
+        def response():
+            weights = butterworth_bandpass_response(freqs, self.sampling_rate, BANDPASS[0], BANDPASS[1], 4)
+            for center_freq, band_width in MAINS_BANDSTOPS:
+                weights *= butterworth_bandstop_response(freqs, self.sampling_rate, center_freq, band_width, 4)
+            weights.flags.writeable = False
+            return weights
+        return dsp_cache.get(('filter_response', len(freqs), freqs[-1], self.sampling_rate), response)
+
+    def streaming_welch(self, window_length: int) -> StreamingWelch:
+        """Welch estimator producing the PSDs extract_psd expects"""
+        nfft = self.nfft
+        while nfft > window_length:
+            nfft //= 2
+        return StreamingWelch(self.sampling_rate, nfft, 4 * nfft // 5, window_length, WINDOW_FUNCTION)
+
+    def monitor_band_powers(self, window: np.ndarray) -> np.ndarray:
+        """
+        Channel averaged theta, alpha and beta powers, equal to averaging detrend + get_psd_welch + get_band_power over
+        the channels of the latest power of two samples of window, the largest one shorter than the window.
+
+        :param window: (channels x samples) processed window, longer than monitor_nfft samples.
+        """
+        length = 1
+        while length * 2 < window.shape[1]:
+            length *= 2
+        ampls, freqs = welch(native_linear_detrend(window[:, -length:]), self.monitor_nfft, self.monitor_nfft // 2,
+                             self.sampling_rate, MONITOR_WINDOW_FUNCTION)
+        return np.array([band_power(ampls, freqs, start, end).mean() for start, end in MONITOR_BANDS])
+
+    def extract_psd(self, ampls: np.ndarray, freqs: np.ndarray, window: np.ndarray) -> BandPowerFeatures:
+        """
+        Features of a PSD computed by streaming_welch.
+
+        :param ampls: (channels x bins) PSD of the unfiltered signal, the feature vector is computed from it weighted
+            by the filter responses if apply_filter is set.
+        :param window: (channels x samples) window the PSD was computed over, for monitor_band_powers.
+        """
+        monitor_band_powers = self.monitor_band_powers(window)
+        if self.apply_filter:
+            ampls = ampls * self.filter_response(freqs)
+
+        band_powers = np.column_stack([band_power(ampls, freqs, start, end) for start, end in BANDS])
+        # Like get_avg_band_powers: channel averages relative to their sum, deviations relative to their band average
+        means = band_powers.mean(axis=0)
+        feature_vector = np.concatenate((means / means.sum(), band_powers.std(axis=0) / means))
+        return BandPowerFeatures(band_powers, monitor_band_powers, feature_vector)
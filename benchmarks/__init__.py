@@ -0,0 +1,7 @@
+"""
+Benchmarks and parity checks, each module is a script.
+
+Run them from the repository root with python -m benchmarks.<module>, in the environment main.py runs in. Checks
+against the native brainflow libraries fall back to the reference outputs in benchmarks/fixtures when the libraries
+do not load, which is the case everywhere but on Windows.
+"""
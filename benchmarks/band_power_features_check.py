@@ -0,0 +1,99 @@
+"""
+Checks the BandPowerExtractor outputs against the DataFilter calls they replace.
+
+Builds synthetic 8 channel sessions with drift, offsets, delta to gamma oscillations and 50/60 Hz mains interference
+and, on the 7 s session window:
+
+* compares the StreamingWelch + extract_psd feature vector of the session and of rescore_sessions against
+  get_avg_band_powers with apply_filters=True, which filters the window in the time domain. Reports the largest
+  absolute difference of the feature values, averages relative to their sum and deviations relative to the band
+  averages, see the band_power_features module docstring for where it comes from;
+* converts the per feature differences into the largest change they can cause in the concentration score of the
+  brainflow logistic regression model, 0.25 * sum(|coefficient| * difference) at its steepest point. The KNN model
+  averages the labels of the nearest neighbours and only changes when a difference reorders them;
+* compares the monitor band powers against averaging detrend + get_psd_welch + get_band_power over the channels, the
+  way the session computed them before, which has to match up to rounding.
+
+Run from the repository root with: python -m benchmarks.band_power_features_check
+"""
+import sys
+
+import numpy as np
+
+from brainflow.data_filter import DataFilter, DetrendOperations
+
+from band_power_features import MONITOR_BANDS, MONITOR_WINDOW_FUNCTION, BandPowerExtractor
+from ring_buffer import RingBuffer
+
+SAMPLING_RATE = 250
+WINDOW = 7 * SAMPLING_RATE
+CHANNELS = 8
+SESSIONS = 20
+# (frequency, amplitude) of the synthetic oscillations, mains included
+COMPONENTS = ((2.0, 15.0), (6.0, 8.0), (10.0, 12.0), (20.0, 5.0), (40.0, 3.0), (50.0, 20.0), (60.0, 5.0))
+TOLERANCE = 0.02
+# Coefficients of the brainflow concentration REGRESSION model over the 10 features, recovered from the logits of its
+# predictions, and the largest concentration score change the feature differences may cause
+REGRESSION_COEFFICIENTS = np.array([-4.001, -1.412, -15.767, 7.031, 18.156, -3.696, 3.181, -8.274, 2.301, 2.943])
+SCORE_TOLERANCE = 0.1
+MONITOR_TOLERANCE = 1e-9
+
+
+def session(rng, length: int) -> np.ndarray:
+    t = np.arange(length) / SAMPLING_RATE
+    rows = []
+    for _ in range(CHANNELS):
+        row = rng.normal(0, 5, length) + np.cumsum(rng.normal(0, 1, length)) + rng.uniform(-100, 100)
+        for frequency, amplitude in COMPONENTS:
+            row += amplitude * rng.uniform(0.5, 1.5) * np.sin(2 * np.pi * frequency * t + rng.uniform(0, 2 * np.pi))
+        rows.append(row)
+    return np.array(rows)
+
+
+def reference_monitor_band_powers(window: np.ndarray, extractor: BandPowerExtractor) -> np.ndarray:
+    length = 1
+    while length * 2 < window.shape[1]:
+        length *= 2
+    band_powers = np.zeros(len(MONITOR_BANDS))
+    for row in window[:, -length:].copy():
+        DataFilter.detrend(row, DetrendOperations.LINEAR.value)
+        psd = DataFilter.get_psd_welch(row, extractor.monitor_nfft, extractor.monitor_nfft // 2, SAMPLING_RATE,
+                                       MONITOR_WINDOW_FUNCTION)
+        band_powers += [DataFilter.get_band_power(psd, start, end) for start, end in MONITOR_BANDS]
+    return band_powers / window.shape[0]
+
+
+def main():
+    rng = np.random.default_rng(0)
+    extractor = BandPowerExtractor(SAMPLING_RATE)
+    errors = np.zeros(len(REGRESSION_COEFFICIENTS))
+    monitor_error = 0.0
+    for i in range(SESSIONS):
+        data = session(rng, WINDOW + 37 * i)
+        window = data[:, -WINDOW:]
+        reference = np.concatenate(DataFilter.get_avg_band_powers(window.copy(), list(range(CHANNELS)),
+                                                                  SAMPLING_RATE, True))
+
+        buffer = RingBuffer(CHANNELS, WINDOW)
+        buffer.append(data)
+        ampls, freqs = extractor.streaming_welch(WINDOW).update(buffer)
+        features = extractor.extract_psd(ampls, freqs, buffer.latest())
+        errors = np.maximum(errors, np.abs(features.feature_vector - reference))
+
+        expected = reference_monitor_band_powers(window, extractor)
+        monitor_error = max(monitor_error, np.abs(features.monitor_band_powers / expected - 1).max())
+
+    error = errors.max()
+    score_error = 0.25 * np.abs(REGRESSION_COEFFICIENTS) @ errors
+    print(f'DataFilter backend {DataFilter.get_backend()}')
+    print(f'features: max abs difference {error:.2e}, tolerance {TOLERANCE:.0e}'
+          f'{"  FAILED" if error > TOLERANCE else ""}')
+    print(f'regression score: max change {score_error:.2e}, tolerance {SCORE_TOLERANCE:.0e}'
+          f'{"  FAILED" if score_error > SCORE_TOLERANCE else ""}')
+    print(f'monitor band powers: max rel difference {monitor_error:.2e}, tolerance {MONITOR_TOLERANCE:.0e}'
+          f'{"  FAILED" if monitor_error > MONITOR_TOLERANCE else ""}')
+    return error > TOLERANCE or score_error > SCORE_TOLERANCE or monitor_error > MONITOR_TOLERANCE
+
+
+if __name__ == '__main__':
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,65 @@
+"""
+Per-call prepare/predict/release against a persistent ConcentrationClassifier.
+
+Uses the native MLModule library when it can be loaded and a synthetic NumPy KNN model otherwise.
+Run from the repository root with: python -m benchmarks.classifier_benchmark
+"""
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from brainflow.ml_model import BrainFlowClassifiers
+
+from classifier_service import ConcentrationClassifier, native_ml_available
+
+PREDICTIONS = 200
+TRAINING_SAMPLES = 2000
+
+
+def timed(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    rng = np.random.default_rng(0)
+    features = rng.random((PREDICTIONS, 10))
+
+    with tempfile.TemporaryDirectory() as directory:
+        if native_ml_available():
+            backend, model_file = 'native', ''
+        else:
+            backend, model_file = 'numpy', os.path.join(directory, 'knn.npz')
+            np.savez(model_file, features=rng.random((TRAINING_SAMPLES, 10)),
+                     labels=rng.integers(0, 2, TRAINING_SAMPLES), k=5)
+
+        def per_call():
+            for feature_vector in features:
+                classifier = ConcentrationClassifier(BrainFlowClassifiers.KNN.value, model_file=model_file,
+                                                     backend=backend)
+                classifier.prepare()
+                classifier.predict(feature_vector)
+                classifier.release()
+
+        classifier = ConcentrationClassifier(BrainFlowClassifiers.KNN.value, model_file=model_file, backend=backend)
+        classifier.prepare()
+
+        def persistent():
+            for feature_vector in features:
+                classifier.predict(feature_vector)
+
+        per_call_time = timed(per_call)
+        persistent_time = timed(persistent)
+        classifier.release()
+
+    print(f'{backend} backend, {PREDICTIONS} predictions')
+    print(f'prepare/release per call: {per_call_time / PREDICTIONS * 1e6:10.1f} us/prediction')
+    print(f'persistent:               {persistent_time / PREDICTIONS * 1e6:10.1f} us/prediction '
+          f'({per_call_time / persistent_time:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
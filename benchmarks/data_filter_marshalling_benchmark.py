@@ -0,0 +1,115 @@
+"""
+Regression benchmark for the Python side input marshalling of DataFilter's ctypes shims.
+
+Calls the real DataFilter.get_avg_band_powers, perform_ifft and perform_fft against a registered 'recording' backend
+that keeps copies of the buffers it receives and fills its outputs from them. The buffers have to equal the ones the
+former per-element loops built, and the returned arrays the ones the loops assembled, so a regression in the shims
+themselves shows up here. The timings compare those loops with a full DataFilter call, which includes the backend
+call on top of the vectorized marshalling. Needs no native library.
+Run from the repository root with: python -m benchmarks.data_filter_marshalling_benchmark
+"""
+import sys
+import timeit
+
+import numpy as np
+
+from brainflow.data_filter import DataFilter, WindowFunctions
+from brainflow.exit_codes import BrainflowExitCodes
+
+SAMPLING_RATE = 250
+OK = BrainflowExitCodes.STATUS_OK.value
+
+
+class RecordingDataHandler:
+    """Backend keeping a copy of every input buffer, outputs are derived from the inputs so they can be checked"""
+
+    def __init__(self):
+        self.inputs = None
+
+    def get_avg_band_powers(self, data, rows, cols, sampling_rate, apply_filters, avg_band_powers,
+                            stddev_band_powers):
+        self.inputs = (data.copy(),)
+        avg_band_powers[:] = data[:5]
+        stddev_band_powers[:] = data[-5:]
+        return OK
+
+    def perform_fft(self, data, data_len, window, output_re, output_im):
+        self.inputs = (data.copy(),)
+        spectrum = np.fft.rfft(data)
+        output_re[:] = spectrum.real
+        output_im[:] = spectrum.imag
+        return OK
+
+    def perform_ifft(self, input_re, input_im, data_len, restored_data):
+        self.inputs = (input_re.copy(), input_im.copy())
+        restored_data[:] = np.fft.irfft(input_re + 1j * input_im, data_len)
+        return OK
+
+
+def avg_band_powers_loop(data, channels):
+    data_1d = np.zeros(len(channels) * data.shape[1])
+    for i, channel in enumerate(channels):
+        for j in range(data.shape[1]):
+            data_1d[j + data.shape[1] * i] = data[channel][j]
+    return data_1d
+
+
+def ifft_loop(data):
+    temp_re = np.zeros(data.shape[0]).astype(np.float64)
+    temp_im = np.zeros(data.shape[0]).astype(np.float64)
+    for i in range(data.shape[0]):
+        temp_re[i] = data[i].real
+        temp_im[i] = data[i].imag
+    return temp_re, temp_im
+
+
+def fft_output_loop(temp_re, temp_im):
+    output = np.zeros(temp_re.shape[0]).astype(np.complex128)
+    for i in range(output.shape[0]):
+        output[i] = np.complex128(complex(temp_re[i], temp_im[i]))
+    return output
+
+
+def check(name, handler, call, expected_inputs, expected_output, loop, *loop_args) -> bool:
+    output = call()
+    ok = all(np.array_equal(expected, actual) for expected, actual in zip(expected_inputs, handler.inputs))
+    ok = ok and len(expected_inputs) == len(handler.inputs)
+    ok = ok and all(np.array_equal(expected, actual)
+                    for expected, actual in zip(np.atleast_1d(expected_output), np.atleast_1d(output)))
+    loop_time = min(timeit.repeat(lambda: loop(*loop_args), number=3, repeat=3)) / 3
+    call_time = min(timeit.repeat(call, number=100, repeat=3)) / 100
+    print(f'{name:<40} {loop_time * 1e3:>10.2f} {call_time * 1e3:>12.4f} {loop_time / call_time:>8.0f}x'
+          f'{"" if ok else "  FAILED"}')
+    return ok
+
+
+def main() -> bool:
+    rng = np.random.default_rng(0)
+    board_data = rng.standard_normal((24, 30 * SAMPLING_RATE))
+    eeg_channels = list(range(1, 9))
+    signal = rng.standard_normal(8192)
+    spectrum = np.fft.rfft(signal)
+
+    handler = RecordingDataHandler()
+    previous_backend = DataFilter.get_backend()
+    DataFilter.register_backend('recording', lambda: handler)
+    DataFilter.set_backend('recording')
+    try:
+        print(f'{"marshalling":<40} {"loop ms":>10} {"shim call ms":>12} {"speedup":>9}')
+        data_1d = avg_band_powers_loop(board_data, eeg_channels)
+        ok = check('get_avg_band_powers 8 ch x 30 s', handler,
+                   lambda: DataFilter.get_avg_band_powers(board_data, eeg_channels, SAMPLING_RATE, True),
+                   (data_1d,), (data_1d[:5], data_1d[-5:]), avg_band_powers_loop, board_data, eeg_channels)
+        ok &= check('perform_ifft 4097 bins', handler, lambda: DataFilter.perform_ifft(spectrum),
+                    ifft_loop(spectrum), np.fft.irfft(spectrum, signal.shape[0]), ifft_loop, spectrum)
+        ok &= check('perform_fft output 4097 bins', handler,
+                    lambda: DataFilter.perform_fft(signal, WindowFunctions.NO_WINDOW.value),
+                    (signal,), fft_output_loop(spectrum.real, spectrum.imag), fft_output_loop, spectrum.real,
+                    spectrum.imag)
+    finally:
+        DataFilter.set_backend(previous_backend)
+    return ok
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,163 @@
+"""
+Parity check of the numpy DataFilter backend against the native DataHandler library.
+
+Runs every DataFilter function on the same synthetic EEG with both backends and reports the largest difference
+relative to the largest native output value, failing when it exceeds the tolerance of the case. Without a loadable
+native library the numpy backend is compared against the native outputs stored in benchmarks/fixtures, which
+--write-fixture regenerates on a machine where the native library loads.
+Run from the repository root with: python -m benchmarks.data_filter_parity [--write-fixture]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from brainflow.data_filter import AggOperations, DataFilter, DetrendOperations, FilterTypes, WindowFunctions
+
+SAMPLING_RATE = 250
+LENGTH = 1024
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'data_filter_native.npz')
+
+
+def in_place(func):
+    def run(data):
+        data = data.copy()
+        func(data)
+        return data
+    return run
+
+
+def cases():
+    fs = SAMPLING_RATE
+    yield 'perform_lowpass', 1e-6, in_place(lambda d: DataFilter.perform_lowpass(
+        d, fs, 30.0, 4, FilterTypes.BUTTERWORTH.value, 0))
+    yield 'perform_highpass', 1e-6, in_place(lambda d: DataFilter.perform_highpass(
+        d, fs, 1.0, 4, FilterTypes.CHEBYSHEV_TYPE_1.value, 1.0))
+    yield 'perform_bandpass', 1e-6, in_place(lambda d: DataFilter.perform_bandpass(
+        d, fs, 24.0, 47.0, 4, FilterTypes.BUTTERWORTH.value, 0))
+    yield 'perform_bandstop', 1e-6, in_place(lambda d: DataFilter.perform_bandstop(
+        d, fs, 50.0, 4.0, 4, FilterTypes.BUTTERWORTH.value, 0))
+    yield 'perform_bandpass bessel', 1e-6, in_place(lambda d: DataFilter.perform_bandpass(
+        d, fs, 15.0, 10.0, 3, FilterTypes.BESSEL.value, 0))
+    for period in 3, 4:
+        for operation in AggOperations.MEAN, AggOperations.MEDIAN:
+            yield f'perform_rolling_filter {operation.name} {period}', 1e-9, in_place(
+                lambda d, op=operation, p=period: DataFilter.perform_rolling_filter(d, p, op.value))
+        for operation in AggOperations:
+            yield f'perform_downsampling {operation.name} {period}', 1e-9, \
+                lambda d, op=operation, p=period: DataFilter.perform_downsampling(d, p, op.value)
+    yield 'perform_wavelet_transform', 1e-9, lambda d: DataFilter.perform_wavelet_transform(d, 'db4', 3)
+    yield 'perform_inverse_wavelet_transform', 1e-9, lambda d: DataFilter.perform_inverse_wavelet_transform(
+        DataFilter.perform_wavelet_transform(d, 'db4', 3), d.shape[0], 'db4', 3)
+    yield 'perform_wavelet_denoising', 1e-6, in_place(lambda d: DataFilter.perform_wavelet_denoising(d, 'db4', 3))
+    for window in WindowFunctions:
+        yield f'perform_fft {window.name}', 1e-9, lambda d, w=window: DataFilter.perform_fft(d, w.value)
+        yield f'get_psd {window.name}', 1e-9, lambda d, w=window: DataFilter.get_psd(d, fs, w.value)
+    yield 'get_psd_welch', 1e-9, lambda d: DataFilter.get_psd_welch(d, 256, 128, fs, WindowFunctions.HANNING.value)
+    yield 'perform_ifft', 1e-9, lambda d: DataFilter.perform_ifft(np.fft.rfft(d))
+    for operation in DetrendOperations:
+        yield f'detrend {operation.name}', 1e-9, in_place(lambda d, op=operation: DataFilter.detrend(d, op.value))
+    yield 'get_band_power', 1e-9, lambda d: DataFilter.get_band_power(
+        DataFilter.get_psd_welch(d, 256, 128, fs, WindowFunctions.HANNING.value), 8.0, 13.0)
+    for apply_filters in True, False:
+        yield f'get_avg_band_powers {"filtered" if apply_filters else "unfiltered"}', 1e-9, \
+            lambda d, f=apply_filters: DataFilter.get_avg_band_powers(
+                np.vstack((d, d[::-1], np.roll(d, 100))), [0, 1, 2], fs, f)
+    yield 'get_nearest_power_of_two', 0, lambda d: DataFilter.get_nearest_power_of_two(fs)
+
+
+def flatten(result) -> np.ndarray:
+    if isinstance(result, tuple):
+        return np.concatenate([flatten(part) for part in result])
+    result = np.asarray(result)
+    if np.iscomplexobj(result):
+        return np.concatenate((result.real.ravel(), result.imag.ravel()))
+    return result.ravel().astype(np.float64)
+
+
+def run(backend, data):
+    DataFilter.set_backend(backend)
+    results = {}
+    for name, _, func in cases():
+        start = time.perf_counter()
+        try:
+            results[name] = flatten(func(data)), time.perf_counter() - start
+        except ImportError as e:
+            results[name] = e, 0.0
+    return results
+
+
+def write_fixture(data):
+    results = run('native', data)
+    os.makedirs(os.path.dirname(FIXTURE), exist_ok=True)
+    np.savez_compressed(FIXTURE, data=data, **{name: result for name, (result, _) in results.items()})
+    print(f'native outputs of {len(results)} cases written to {FIXTURE}')
+
+
+def read_fixture():
+    """:return: (input data, {case name: (native output, None)}) stored by write_fixture, None if there is none"""
+    if not os.path.isfile(FIXTURE):
+        return None
+    with np.load(FIXTURE) as fixture:
+        return fixture['data'], {name: (fixture[name], None) for name in fixture.files if name != 'data'}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the numpy DataFilter backend with the native library.')
+    parser.add_argument('--write-fixture', action='store_true',
+                        help='store the native outputs as reference for machines without the native library')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    t = np.arange(LENGTH) / SAMPLING_RATE
+    data = 20 * np.sin(2 * np.pi * 10 * t) + 5 * np.sin(2 * np.pi * 50 * t) + rng.standard_normal(LENGTH) + 3 * t
+    if args.write_fixture:
+        try:
+            write_fixture(data)
+        except OSError as e:
+            print(f'the native backend is needed to write the fixture ({e})')
+            return 1
+        return 0
+
+    try:
+        native_results = run('native', data)
+    except OSError as e:
+        fixture = read_fixture()
+        if fixture is None:
+            print(f'native backend unavailable ({e}) and no fixture, checking the numpy backend only')
+            native_results = None
+        else:
+            print(f'native backend unavailable, comparing against {FIXTURE}')
+            data, native_results = fixture
+    numpy_results = run('numpy', data)
+
+    failures = 0
+    print(f'{"function":<40} {"rel. error":>12} {"tolerance":>10} {"native ms":>10} {"numpy ms":>10}')
+    for name, tolerance, _ in cases():
+        actual, numpy_time = numpy_results[name]
+        if isinstance(actual, ImportError):
+            print(f'{name:<40} skipped: {actual}')
+            continue
+        if native_results is None:
+            print(f'{name:<40} {"":>12} {"":>10} {"":>10} {numpy_time * 1e3:>10.3f}')
+            continue
+        if name not in native_results:
+            print(f'{name:<40} missing from the fixture, rerun with --write-fixture  FAILED')
+            failures += 1
+            continue
+        expected, native_time = native_results[name]
+        if expected.shape != actual.shape:
+            error = np.inf
+        else:
+            error = np.abs(expected - actual).max() / max(np.abs(expected).max(), 1e-12)
+        failures += error > tolerance
+        native_ms = f'{native_time * 1e3:.3f}' if native_time is not None else 'fixture'
+        print(f'{name:<40} {error:>12.2e} {tolerance:>10.0e} {native_ms:>10} {numpy_time * 1e3:>10.3f}'
+              f'{"  FAILED" if error > tolerance else ""}')
+    return failures
+
+
+if __name__ == '__main__':
+    sys.exit(1 if main() else 0)
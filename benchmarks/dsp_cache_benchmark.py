@@ -0,0 +1,50 @@
+"""
+Cost of recomputing DSP constants against looking them up in dsp_cache.
+
+Times window, rfft frequency and Butterworth/Chebyshev SOS construction with the parameters the session uses every
+tick, then prints the cache counters collected while doing so. SOS design needs scipy.
+Run from the repository root with: python -m benchmarks.dsp_cache_benchmark
+"""
+import timeit
+
+from brainflow.data_filter import FilterTypes, WindowFunctions
+from brainflow.dsp_cache import dsp_cache
+from brainflow import numpy_data_handler
+
+SAMPLING_RATE = 250
+NUMBER = 1000
+
+
+def compare(name, build, cached):
+    build_time = min(timeit.repeat(build, number=NUMBER, repeat=3)) / NUMBER
+    cached_time = min(timeit.repeat(cached, number=NUMBER, repeat=3)) / NUMBER
+    print(f'{name:<40} {build_time * 1e6:>10.1f} {cached_time * 1e6:>10.2f} {build_time / cached_time:>8.0f}x')
+
+
+def main():
+    blackman_harris = WindowFunctions.BLACKMAN_HARRIS.value
+    butterworth = FilterTypes.BUTTERWORTH.value
+    chebyshev = FilterTypes.CHEBYSHEV_TYPE_1.value
+
+    print(f'{"constant":<40} {"build us":>10} {"cached us":>10} {"speedup":>9}')
+    compare('Blackman-Harris window 4096',
+            lambda: numpy_data_handler._make_window(blackman_harris, 4096),
+            lambda: numpy_data_handler.get_window(blackman_harris, 4096))
+    compare('rfft frequencies 4096',
+            lambda: numpy_data_handler._make_psd_freqs(4096, SAMPLING_RATE),
+            lambda: numpy_data_handler.get_psd_freqs(4096, SAMPLING_RATE))
+    try:
+        compare('Butterworth bandstop 50 Hz order 4',
+                lambda: numpy_data_handler._make_filter_sos(SAMPLING_RATE, 'bandstop', (48.0, 52.0), 4, butterworth, 0),
+                lambda: numpy_data_handler.get_filter_sos(SAMPLING_RATE, 'bandstop', (48.0, 52.0), 4, butterworth, 0))
+        compare('Chebyshev bandpass 0.5-47.5 Hz order 4',
+                lambda: numpy_data_handler._make_filter_sos(SAMPLING_RATE, 'bandpass', (0.5, 47.5), 4, chebyshev, 1),
+                lambda: numpy_data_handler.get_filter_sos(SAMPLING_RATE, 'bandpass', (0.5, 47.5), 4, chebyshev, 1))
+    except ImportError as e:
+        print(f'filters skipped: {e}')
+
+    print('dsp_cache counters (hits, misses):', dsp_cache.stats())
+
+
+if __name__ == '__main__':
+    main()
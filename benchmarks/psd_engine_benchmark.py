@@ -0,0 +1,125 @@
+"""
+PsdEngine against the per-channel DataFilter.get_psd loop the session used, including the .tolist() conversion.
+
+Also checks that both produce the same values, against the native DataHandler library when it can be loaded and
+otherwise against the native outputs stored in benchmarks/fixtures, which --write-fixture regenerates on a machine where
+the native library loads.
+Run from the repository root with: python -m benchmarks.psd_engine_benchmark [--write-fixture]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+
+from brainflow.data_filter import DataFilter, DataHandlerDLL, WindowFunctions
+
+from psd_engine import PsdEngine
+
+SAMPLING_RATE = 250
+CHANNELS = (8, 16, 32)
+LENGTHS = (1024, 4096)
+# Inputs of the parity check, kept small so the fixture stays small
+PARITY_SHAPES = ((4, 256), (4, 1024))
+FIXTURE = os.path.join(os.path.dirname(__file__), 'fixtures', 'psd_engine_native.npz')
+
+
+def native_available() -> bool:
+    try:
+        DataHandlerDLL.get_instance()
+    except (FileNotFoundError, OSError):
+        return False
+    return True
+
+
+def per_channel_psd(data):
+    psd_data = []
+    psd_x = []
+    for count, row in enumerate(data):
+        channel_psd_data = DataFilter.get_psd(row, SAMPLING_RATE, WindowFunctions.BLACKMAN_HARRIS.value)
+        if count == 0:
+            psd_x = channel_psd_data[1].tolist()
+        psd_data.append(channel_psd_data[0].tolist())
+    return psd_x, psd_data
+
+
+def parity_inputs():
+    rng = np.random.default_rng(1)
+    return [rng.standard_normal(shape) * 50 for shape in PARITY_SHAPES]
+
+
+def write_fixture():
+    arrays = {}
+    for i, data in enumerate(parity_inputs()):
+        psd_x, psd_data = per_channel_psd(data)
+        arrays.update({f'data_{i}': data, f'freqs_{i}': psd_x, f'ampls_{i}': psd_data})
+    os.makedirs(os.path.dirname(FIXTURE), exist_ok=True)
+    np.savez_compressed(FIXTURE, **arrays)
+    print(f'native PSDs of {len(PARITY_SHAPES)} inputs written to {FIXTURE}')
+
+
+def references(native: bool):
+    """:return: [(data, native freqs, native ampls)], from the native library or the fixture, None without either"""
+    if native:
+        return [(data, *per_channel_psd(data)) for data in parity_inputs()]
+    if not os.path.isfile(FIXTURE):
+        return None
+    with np.load(FIXTURE) as fixture:
+        return [(fixture[f'data_{i}'], fixture[f'freqs_{i}'], fixture[f'ampls_{i}'])
+                for i in range(len(fixture.files) // 3)]
+
+
+def check_parity(engine: PsdEngine, native: bool) -> bool:
+    cases = references(native)
+    if cases is None:
+        print('no native library and no fixture, parity not checked')
+        return True
+    matches = True
+    for data, psd_x, psd_data in cases:
+        ampls, freqs = engine.psd(data)
+        match = np.allclose(freqs, psd_x) and np.allclose(ampls, psd_data, rtol=1e-9, atol=1e-12)
+        print(f'parity {data.shape[0]}x{data.shape[1]} against {"native" if native else "fixture"}: '
+              f'{"ok" if match else "FAILED"}')
+        matches &= match
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time PsdEngine against the per-channel DataFilter.get_psd loop.')
+    parser.add_argument('--write-fixture', action='store_true',
+                        help='store the native PSDs as reference for machines without the native library')
+    args = parser.parse_args()
+
+    native = native_available()
+    if native:
+        DataFilter.set_backend('native')
+    if args.write_fixture:
+        if not native:
+            print('the native DataHandler library is needed to write the fixture')
+            return False
+        write_fixture()
+        return True
+
+    rng = np.random.default_rng(0)
+    engine = PsdEngine(SAMPLING_RATE, WindowFunctions.BLACKMAN_HARRIS.value)
+    matches = check_parity(engine, native)
+    if not native:
+        print('native DataHandler library not available, timing PsdEngine only')
+
+    print(f'{"channels":>8} {"length":>8} {"native us":>10} {"engine us":>10} {"speedup":>8}')
+    for channels in CHANNELS:
+        for length in LENGTHS:
+            data = rng.standard_normal((channels, length)) * 50
+            engine_time = min(timeit.repeat(lambda: engine.psd(data), number=20, repeat=5)) / 20
+            if native:
+                native_time = min(timeit.repeat(lambda: per_channel_psd(data), number=20, repeat=5)) / 20
+                print(f'{channels:>8} {length:>8} {native_time * 1e6:>10.1f} {engine_time * 1e6:>10.1f} '
+                      f'{native_time / engine_time:>7.1f}x')
+            else:
+                print(f'{channels:>8} {length:>8} {"-":>10} {engine_time * 1e6:>10.1f} {"-":>8}')
+    return matches
+
+
+if __name__ == '__main__':
+    sys.exit(0 if main() else 1)
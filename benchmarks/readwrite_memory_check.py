@@ -0,0 +1,129 @@
+"""
+Checks the Linux ReadWriteMem backend against a dummy target process and times vectored against per-address reads,
+cached against walked pointer chains and incremental against full process index refreshes.
+
+The target is a child Python process holding a float array and a pointer chain to it, so no ptrace privileges are
+needed beyond being its parent.
+Run from the repository root with: python -m benchmarks.readwrite_memory_check
+"""
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import timeit
+import ctypes as c
+
+from ReadWriteMem import Process, ProcessIndex, ReadWriteMemory, ReadWriteMemoryError
+
+NUM_VALUES = 256
+NUMBER = 200
+
+TARGET = f'''
+import ctypes, sys
+values = (ctypes.c_float * {NUM_VALUES})(*range({NUM_VALUES}))
+# base -> node, node[2] -> values
+node = (ctypes.c_uint64 * 4)(0, 0, ctypes.addressof(values), 0)
+base = ctypes.c_uint64(ctypes.addressof(node))
+print(ctypes.addressof(values), ctypes.addressof(base), flush=True)
+sys.stdin.read()
+print(*values, flush=True)
+'''
+
+
+def index_check():
+    index = ProcessIndex()
+    start = time.perf_counter()
+    index.refresh()
+    full = time.perf_counter() - start
+    start = time.perf_counter()
+    index.refresh()
+    incremental = time.perf_counter() - start
+    print(f'process index: first refresh {full * 1e3:.2f} ms, incremental {incremental * 1e3:.2f} ms')
+
+    with tempfile.TemporaryDirectory() as directory:
+        # A copy of the interpreter under a name nothing else runs
+        executable = os.path.join(directory, 'rwm_dummy_target')
+        shutil.copy(sys.executable, executable)
+        assert not index.find('rwm_dummy_target')
+        timer = threading.Timer(0.5, lambda: started.append(subprocess.Popen([executable, '-c', 'input()'],
+                                                                             stdin=subprocess.PIPE)))
+        started = []
+        timer.start()
+        try:
+            pid = ReadWriteMemory().wait_for_process('rwm_dummy_target', timeout=10).pid
+            assert pid == started[0].pid, (pid, started[0].pid)
+            print('wait_for_process found the started process')
+        finally:
+            timer.join()
+            for process in started:
+                process.kill()
+                process.wait()
+        assert not index.find('rwm_dummy_target')
+
+
+def main():
+    if not sys.platform.startswith('linux'):
+        print('the Linux backend needs process_vm_readv, skipping')
+        return
+    target = subprocess.Popen([sys.executable, '-c', TARGET], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                              text=True)
+    try:
+        values_address, base_address = map(int, target.stdout.readline().split())
+        process = ReadWriteMemory().get_process_by_id(target.pid)
+        process.open()
+        addresses = [values_address + 4 * i for i in range(NUM_VALUES)]
+
+        assert process.read_many(addresses, c.c_float) == [float(i) for i in range(NUM_VALUES)]
+        assert process.read(process.get_pointer(base_address, offsets=[0x10])) == values_address
+        assert process.read_float(addresses[3]) == 3.0
+        assert process.write_many(addresses[::2], [-1.0] * (NUM_VALUES // 2))
+        assert process.write(addresses[1], 42.5)
+        try:
+            process.read_many([addresses[0], 0x10], c.c_float)
+            raise AssertionError('reading an unmapped address did not fail')
+        except ReadWriteMemoryError:
+            pass
+        try:
+            Process()
+            raise AssertionError('the abstract Process could be instantiated')
+        except TypeError:
+            pass
+        print('read/write checks passed')
+
+        chain = process.pointer_chain(base_address, [0x10, 0x8])
+        assert chain.resolve() == values_address + 8 and chain.read() == -1.0
+        assert chain.resolve() == values_address + 8 and chain.read() == -1.0
+        node_address = process.read(base_address)
+        # Repoint the last pointer, the next resolve has to notice
+        process.write_many([node_address + 0x10], [values_address + 4], c.c_uint64)
+        assert chain.read() == 3.0 and chain.resolve() == values_address + 12
+        assert chain.stats() == {'hits': 4, 'misses': 1, 're_resolves': 1}, chain.stats()
+        process.write_many([node_address + 0x10], [values_address], c.c_uint64)
+        print('pointer chain checks passed')
+
+        walk = min(timeit.repeat(lambda: chain._walk(), number=NUMBER, repeat=3))
+        cached = min(timeit.repeat(lambda: chain.resolve(), number=NUMBER, repeat=3))
+        print(f'2 hop pointer chain: walk {walk / NUMBER * 1e6:.1f} us, cached {cached / NUMBER * 1e6:.1f} us')
+        vectored = min(timeit.repeat(lambda: process.read_many(addresses, c.c_float), number=NUMBER, repeat=3))
+        single = min(timeit.repeat(lambda: [process.read_float(address) for address in addresses], number=NUMBER,
+                                   repeat=3))
+        print(f'{NUM_VALUES} floats: vectored {vectored / NUMBER * 1e6:.1f} us, '
+              f'per address {single / NUMBER * 1e6:.1f} us ({single / vectored:.1f}x)')
+        process.close()
+
+        index_check()
+
+        target.stdin.close()
+        written = [float(value) for value in target.stdout.readline().split()]
+        assert written[:3] == [-1.0, 42.5, -1.0], written[:3]
+        print('target sees the written values')
+    finally:
+        target.kill()
+        target.wait()
+
+
+if __name__ == '__main__':
+    main()
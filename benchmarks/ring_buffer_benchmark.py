@@ -0,0 +1,62 @@
+"""
+Per-tick cost of the session sample history: np.hstack sliding window against RingBuffer.
+
+Run from the repository root with: python -m benchmarks.ring_buffer_benchmark
+"""
+import timeit
+
+import numpy as np
+
+from ring_buffer import RingBuffer
+
+SAMPLING_RATE = 250
+CHUNK_SIZE = 10  # ~40 ms session tick at 250 Hz
+WINDOW_SECONDS = (7, 30, 120)
+CHANNELS = (8, 16, 32)
+TICKS = 500
+
+
+def hstack_tick(history, chunk):
+    history = history[:, chunk.shape[1]:]
+    return np.hstack([history, chunk])
+
+
+def bench_hstack(rows, window, chunks):
+    history = np.zeros((rows, window))
+
+    def run():
+        nonlocal history
+        for chunk in chunks:
+            history = hstack_tick(history, chunk)
+            history[:, -window:]
+
+    return min(timeit.repeat(run, number=1, repeat=3)) / len(chunks)
+
+
+def bench_ring_buffer(rows, window, chunks):
+    buffer = RingBuffer(rows, window)
+    buffer.append(np.zeros((rows, window)))
+
+    def run():
+        for chunk in chunks:
+            buffer.append(chunk)
+            buffer.latest(window)
+
+    return min(timeit.repeat(run, number=1, repeat=3)) / len(chunks)
+
+
+def main():
+    rng = np.random.default_rng(0)
+    print(f'{"channels":>8} {"window":>8} {"hstack us":>10} {"ring us":>10} {"speedup":>8}')
+    for channels in CHANNELS:
+        chunks = [rng.standard_normal((channels, CHUNK_SIZE)) for _ in range(TICKS)]
+        for seconds in WINDOW_SECONDS:
+            window = seconds * SAMPLING_RATE
+            hstack_time = bench_hstack(channels, window, chunks)
+            ring_time = bench_ring_buffer(channels, window, chunks)
+            print(f'{channels:>8} {window:>8} {hstack_time * 1e6:>10.1f} {ring_time * 1e6:>10.1f} '
+                  f'{hstack_time / ring_time:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
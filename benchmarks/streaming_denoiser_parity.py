@@ -0,0 +1,87 @@
+"""
+Parity check of StreamingDenoiser against denoising the full session window on every tick.
+
+Streams synthetic EEG through the denoiser in live sized hops and, on every tick, compares the processed window with a
+fresh full window recompute of the same raw samples. The rolling filter has to match except for the oldest margin
+samples, wavelet configs have to match exactly. Reports the largest difference relative to the largest reference value
+and the time per tick of both. Wavelet configs are recomputed over the full window, so their streamed and full times
+are about equal, see the streaming_denoiser module docstring for why.
+Run from the repository root with: python -m benchmarks.streaming_denoiser_parity
+"""
+import sys
+import time
+
+import numpy as np
+
+from brainflow.data_filter import AggOperations, DataFilter
+
+from ring_buffer import RingBuffer
+from streaming_denoiser import StreamingDenoiser
+
+SAMPLING_RATE = 250
+WINDOW = 7 * SAMPLING_RATE
+HOP = 10
+TICKS = 200
+CONFIGS = [('', 0), ('db4', 3), ('db4', 5), ('sym5', 4), ('coif3', 3)]
+
+
+def full_recompute(window: np.ndarray, wavelet: str, decomposition_level: int, rolling_period: int) -> np.ndarray:
+    window = window.copy()
+    for row in window:
+        if wavelet == '':
+            DataFilter.perform_rolling_filter(row, rolling_period, AggOperations.MEAN.value)
+        else:
+            DataFilter.perform_wavelet_denoising(row, wavelet, decomposition_level)
+    return window
+
+
+def check(data: np.ndarray, wavelet: str, decomposition_level: int):
+    raw = RingBuffer(data.shape[0], WINDOW)
+    denoiser = StreamingDenoiser(range(data.shape[0]), WINDOW)
+    denoiser.configure(wavelet, decomposition_level)
+    raw.append(data[:, :WINDOW])
+    denoiser.update(raw, WINDOW)
+
+    error = 0.0
+    streamed_time = full_time = 0.0
+    for tick in range(TICKS):
+        chunk = data[:, WINDOW + tick * HOP:WINDOW + (tick + 1) * HOP]
+        raw.append(chunk)
+        start = time.perf_counter()
+        processed = denoiser.update(raw, chunk.shape[1])
+        streamed_time += time.perf_counter() - start
+        start = time.perf_counter()
+        expected = full_recompute(raw.latest(), wavelet, decomposition_level, denoiser.rolling_period)
+        full_time += time.perf_counter() - start
+
+        # The full recompute applies its edge handling to the oldest margin samples, the stream had real neighbours
+        skip = denoiser.margin
+        difference = np.abs(processed[:, skip:] - expected[:, skip:]).max() / np.abs(expected).max()
+        error = max(error, difference)
+    return error, streamed_time / TICKS, full_time / TICKS
+
+
+def main():
+    rng = np.random.default_rng(0)
+    length = WINDOW + TICKS * HOP
+    t = np.arange(length) / SAMPLING_RATE
+    data = np.vstack([20 * np.sin(2 * np.pi * (8 + channel) * t) + 5 * rng.standard_normal(length)
+                      + np.cumsum(rng.normal(0, 0.5, length)) for channel in range(4)])
+
+    failures = 0
+    print(f'{"config":<12} {"rel. error":>12} {"streamed ms":>12} {"full ms":>10}')
+    for wavelet, decomposition_level in CONFIGS:
+        name = f'{wavelet}/L{decomposition_level}' if wavelet else 'rolling'
+        try:
+            error, streamed, full = check(data, wavelet, decomposition_level)
+        except ImportError as e:
+            print(f'{name:<12} skipped: {e}')
+            continue
+        failures += error > 1e-12
+        print(f'{name:<12} {error:>12.2e} {streamed * 1e3:>12.3f} {full * 1e3:>10.3f}'
+              f'{"  FAILED" if error > 1e-12 else ""}')
+    return failures
+
+
+if __name__ == '__main__':
+    sys.exit(1 if main() else 0)
@@ -0,0 +1,67 @@
+"""
+StreamingWelch against recomputing the Welch PSD of the whole window on every classification.
+
+Feeds synthetic chunks into a RingBuffer and classifies once per hop, like the session with a classification
+interval. Also reports the largest difference to a full recompute with per segment detrending.
+Run from the repository root with: python -m benchmarks.streaming_welch_benchmark
+"""
+import time
+
+import numpy as np
+
+from brainflow.data_filter import WindowFunctions
+from brainflow.numpy_data_handler import get_window, linear_detrend, scale_psd
+
+from psd_engine import StreamingWelch, nearest_power_of_two
+from ring_buffer import RingBuffer
+
+SAMPLING_RATE = 250
+CHUNK = 10
+CLASSIFICATIONS = 200
+
+
+def full_welch(window, nfft, step):
+    segments = np.lib.stride_tricks.sliding_window_view(window, nfft, axis=1)[:, ::step]
+    spectrum = np.fft.rfft(linear_detrend(segments) * get_window(WindowFunctions.BLACKMAN_HARRIS.value, nfft), axis=-1)
+    return scale_psd(spectrum.real ** 2 + spectrum.imag ** 2, nfft, SAMPLING_RATE).mean(axis=1)
+
+
+def run(channels, window_seconds, hop_seconds):
+    rng = np.random.default_rng(0)
+    nfft = nearest_power_of_two(SAMPLING_RATE)
+    step = nfft // 2
+    window_length = int(window_seconds * SAMPLING_RATE)
+    hop = int(hop_seconds * SAMPLING_RATE)
+    buffer = RingBuffer(channels, window_length)
+    buffer.append(rng.standard_normal((channels, window_length)))
+    welch = StreamingWelch(SAMPLING_RATE, nfft, step, window_length)
+
+    full_time = streaming_time = error = 0.0
+    for _ in range(CLASSIFICATIONS):
+        for _ in range(hop // CHUNK):
+            buffer.append(rng.standard_normal((channels, CHUNK)))
+        start = time.perf_counter()
+        ampls, _ = welch.update(buffer)
+        streaming_time += time.perf_counter() - start
+
+        total = buffer.total_written
+        first = -(-(total - window_length) // step) * step
+        start = time.perf_counter()
+        expected = full_welch(buffer.latest(total - first), nfft, step)
+        full_time += time.perf_counter() - start
+        error = max(error, np.abs(ampls - expected).max() / np.abs(expected).max())
+
+    print(f'{channels:>8} {window_seconds:>8} {hop_seconds:>6} {full_time / CLASSIFICATIONS * 1e3:>10.3f} '
+          f'{streaming_time / CLASSIFICATIONS * 1e3:>13.3f} {full_time / streaming_time:>8.1f}x {error:>10.1e}')
+
+
+def main():
+    print(f'{"channels":>8} {"window s":>8} {"hop s":>6} {"full ms":>10} {"streaming ms":>13} {"speedup":>9} '
+          f'{"rel. error":>10}')
+    for channels in (8, 32):
+        for window_seconds, hop_seconds in ((7, 1), (30, 1), (30, 0.2)):
+            run(channels, window_seconds, hop_seconds)
+
+
+if __name__ == '__main__':
+    main()
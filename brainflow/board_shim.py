@@ -8,7 +8,7 @@ import platform
 import sys
 import struct
 import json
-from typing import List, Set, Dict, Tuple
+from typing import List, Set, Dict, Tuple, NamedTuple
 
 from nptyping import NDArray, Float64
 
@@ -386,6 +386,23 @@ class BoardControllerDLL (object):
         ]
 
 
+class BoardDescriptor (NamedTuple):
+    """immutable description of a board, fetch it with BoardShim.get_board_descriptor
+
+    channel tuples are empty if the board has no such channels
+    """
+
+    board_id: int
+    sampling_rate: int
+    num_rows: int
+    timestamp_channel: int
+    package_num_channel: int
+    eeg_channels: Tuple[int, ...]
+    exg_channels: Tuple[int, ...]
+    accel_channels: Tuple[int, ...]
+    other_channels: Tuple[int, ...]
+
+
 class BoardShim (object):
     """BoardShim class is a primary interface to all boards
 
@@ -409,7 +426,36 @@ class BoardShim (object):
                                     BrainflowExitCodes.INVALID_ARGUMENTS_ERROR.value)
         else:
             self._master_board_id = self.board_id
+        # scratch arrays reused by get_board_data_count and read_into
+        self._count_scratch = numpy.zeros (1, dtype = numpy.int32)
+        self._read_scratch = numpy.zeros (0, dtype = numpy.float64)
 
+    _descriptors = {}
+
+    @classmethod
+    def get_board_descriptor (cls, board_id: int) -> BoardDescriptor:
+        """get static description of a board, queried from the library once per board id and memoized
+
+        :param board_id: Board Id
+        :type board_id: int
+        :return: board descriptor
+        :rtype: BoardDescriptor
+        :raises BrainFlowError: If this board is not supported exit code is UNSUPPORTED_BOARD_ERROR
+        """
+        descriptor = cls._descriptors.get (board_id)
+        if descriptor is None:
+            def channels (getter):
+                try:
+                    return tuple (getter (board_id))
+                except BrainFlowError:
+                    return ()
+
+            descriptor = BoardDescriptor (board_id, cls.get_sampling_rate (board_id), cls.get_num_rows (board_id),
+                cls.get_timestamp_channel (board_id), cls.get_package_num_channel (board_id),
+                channels (cls.get_eeg_channels), channels (cls.get_exg_channels), channels (cls.get_accel_channels),
+                channels (cls.get_other_channels))
+            cls._descriptors[board_id] = descriptor
+        return descriptor
 
     @classmethod
     def set_log_level (cls, log_level: int) -> None:
@@ -864,7 +910,7 @@ class BoardShim (object):
         :return: latest data from a board
         :rtype: NDArray[Float64]
         """
-        package_length = BoardShim.get_num_rows (self._master_board_id)
+        package_length = BoardShim.get_board_descriptor (self._master_board_id).num_rows
         data_arr = numpy.zeros (int(num_samples  * package_length)).astype (numpy.float64)
         current_size = numpy.zeros (1).astype (numpy.int32)
 
@@ -884,12 +930,12 @@ class BoardShim (object):
         :return: number of elements in ring buffer
         :rtype: int
         """
-        data_size = numpy.zeros (1).astype (numpy.int32)
+        data_size = self._count_scratch
 
         res = BoardControllerDLL.get_instance ().get_board_data_count (data_size, self.board_id, self.input_json)
         if res != BrainflowExitCodes.STATUS_OK.value:
             raise BrainFlowError ('unable to obtain buffer size', res)
-        return data_size[0]
+        return int (data_size[0])
     
     def get_board_id (self) -> int:
         """Get's the actual board id, can be different than provided
@@ -921,7 +967,7 @@ class BoardShim (object):
         """
         data_size = self.get_board_data_count ()
         #print("data_size:", data_size)
-        package_length = BoardShim.get_num_rows (self._master_board_id)
+        package_length = BoardShim.get_board_descriptor (self._master_board_id).num_rows
         data_arr = numpy.zeros (data_size * package_length).astype (numpy.float64)
 
         res = BoardControllerDLL.get_instance ().get_board_data (data_size, data_arr, self.board_id, self.input_json)
@@ -930,6 +976,36 @@ class BoardShim (object):
 
         return data_arr.reshape (package_length, data_size)
 
+    def read_into (self, buffer: NDArray[Float64], offset: int = 0) -> int:
+        """Get board data into a preallocated array and remove it from ringbuffer, reads at most as many samples as fit
+        and leaves the rest in ringbuffer. Doesnt allocate after the first calls
+
+        :param buffer: float64 array of shape (num_rows, capacity)
+        :type buffer: NDArray[Float64]
+        :param offset: column of buffer receiving the first sample
+        :type offset: int
+        :return: number of samples written to buffer[:, offset:offset + count]
+        :rtype: int
+        """
+        package_length = BoardShim.get_board_descriptor (self._master_board_id).num_rows
+        if len (buffer.shape) != 2 or buffer.shape[0] != package_length:
+            raise BrainFlowError ('wrong shape for buffer, it should be %d rows' % package_length,
+                                  BrainflowExitCodes.INVALID_ARGUMENTS_ERROR.value)
+        data_size = min (self.get_board_data_count (), buffer.shape[1] - offset)
+        if data_size <= 0:
+            return 0
+        # the library writes rows one after another, so samples go through a reused contiguous scratch array
+        if self._read_scratch.shape[0] < data_size * package_length:
+            self._read_scratch = numpy.zeros (2 * data_size * package_length, dtype = numpy.float64)
+        scratch = self._read_scratch[0:data_size * package_length]
+
+        res = BoardControllerDLL.get_instance ().get_board_data (data_size, scratch, self.board_id, self.input_json)
+        if res != BrainflowExitCodes.STATUS_OK.value:
+            raise BrainFlowError ('unable to get board data', res)
+
+        buffer[:, offset:offset + data_size] = scratch.reshape (package_length, data_size)
+        return data_size
+
     def config_board (self, config) -> None:
         """Use this method carefully and only if you understand what you are doing, do NOT use it to start or stop streaming
 
@@ -295,8 +295,76 @@ class DataHandlerDLL (object):
         ]
 
 
+def _native_data_handler ():
+    return DataHandlerDLL.get_instance ()
+
+
+def _numpy_data_handler ():
+    from brainflow.numpy_data_handler import NumpyDataHandler
+    return NumpyDataHandler.get_instance ()
+
+
 class DataFilter (object):
-    """DataFilter class contains methods for signal processig"""
+    """DataFilter class contains methods for signal processig
+
+    Calls go to a data handler backend: 'native' loads the DataHandler library, 'numpy' is a pure NumPy/SciPy
+    implementation of the same functions and 'auto' (default) prefers native and falls back to numpy if the library
+    can not be loaded. The backend is taken from the BRAINFLOW_DATA_FILTER_BACKEND environment variable on first use
+    or chosen with set_backend.
+    """
+
+    BACKEND_ENV = 'BRAINFLOW_DATA_FILTER_BACKEND'
+    backends = {
+        'native': _native_data_handler,
+        'numpy': _numpy_data_handler
+    }
+    _backend = None
+    _handler = None
+
+    @classmethod
+    def register_backend (cls, name: str, factory) -> None:
+        """register a data handler backend
+
+        :param name: backend name for set_backend
+        :type name: str
+        :param factory: callable returning an object with the functions of DataHandlerDLL
+        """
+        cls.backends[name] = factory
+
+    @classmethod
+    def set_backend (cls, name: str = None) -> None:
+        """select the data handler backend used by all DataFilter methods
+
+        :param name: registered backend name or 'auto', defaults to BRAINFLOW_DATA_FILTER_BACKEND or 'auto'
+        :type name: str
+        """
+        if name is None:
+            name = os.environ.get (cls.BACKEND_ENV, 'auto')
+        if name == 'auto':
+            try:
+                cls._handler, cls._backend = _native_data_handler (), 'native'
+            except OSError:
+                cls._handler, cls._backend = _numpy_data_handler (), 'numpy'
+        elif name in cls.backends:
+            cls._handler, cls._backend = cls.backends[name] (), name
+        else:
+            raise BrainFlowError ('unknown data filter backend %s' % name, BrainflowExitCodes.INVALID_ARGUMENTS_ERROR.value)
+
+    @classmethod
+    def get_backend (cls) -> str:
+        """get name of the data handler backend in use, selecting it first if needed
+
+        :return: backend name
+        :rtype: str
+        """
+        cls._get_handler ()
+        return cls._backend
+
+    @classmethod
+    def _get_handler (cls):
+        if cls._handler is None:
+            cls.set_backend ()
+        return cls._handler
 
     @classmethod
     def _set_log_level (cls, log_level: int) -> None:
@@ -306,7 +374,7 @@ class DataFilter (object):
         :param log_level: log level, to specify it you should use values from LogLevels enum
         :type log_level: int
         """
-        res = DataHandlerDLL.get_instance ().set_log_level (log_level)
+        res = cls._get_handler ().set_log_level (log_level)
         if res != BrainflowExitCodes.STATUS_OK.value:
             raise BrainFlowError ('unable to enable logger', res)
 
@@ -336,7 +404,7 @@ class DataFilter (object):
             file = log_file.encode ()
         except:
             file = log_file
-        res = DataHandlerDLL.get_instance ().set_log_file (file)
+        res = cls._get_handler ().set_log_file (file)
         if res != BrainflowExitCodes.STATUS_OK.value:
             raise BrainFlowError ('unable to redirect logs to a file', res)
 
@@ -363,7 +431,7 @@ class DataFilter (object):
             raise BrainFlowError ('wrong type for filter type', BrainflowExitCodes.INVALID_ARGUMENTS_ERROR.value)
         if len (data.shape) != 1:
             raise BrainFlowError ('wrong shape for filter data array, it should be 1d array', BrainflowExitCodes.INVALID_ARGUMENTS_ERROR.value)
-        res = DataHandlerDLL.get_instance ().perform_lowpass (data, data.shape[0], sampling_rate, cutoff, order, filter_type, ripple)
+        res = cls._get_handler ().perform_lowpass (data, data.shape[0], sampling_rate, cutoff, order, filter_type, ripple)
         if res != BrainflowExitCodes.STATUS_OK.value:
             raise BrainFlowError ('unable to perform low pass filter', res)
 
@@ -390,7 +458,7 @@ class DataFilter (object):
             raise BrainFlowError ('wrong type for filter type', BrainflowExitCodes.INVALID_ARGUMENTS_ERROR.value)
         if len (data.shape) != 1:
             raise BrainFlowError ('wrong shape for filter data array, it should be 1d array', BrainflowExitCodes.INVALID_ARGUMENTS_ERROR.value)
-        res = DataHandlerDLL.get_instance ().perform_highpass (data, data.shape[0], sampling_rate, cutoff, order, filter_type, ripple)
+        res = cls._get_handler ().perform_highpass (data, data.shape[0], sampling_rate, cutoff, order, filter_type, ripple)
         if res != BrainflowExitCodes.STATUS_OK.value:
             raise BrainFlowError ('unable to apply high pass filter', res)
 
@@ -420,7 +488,7 @@ class DataFilter (object):
             raise BrainFlowError ('wrong type for filter type', BrainflowExitCodes.INVALID_ARGUMENTS_ERROR.value)
         if len (data.shape) != 1:
             raise BrainFlowError ('wrong shape for filter data array, it should be 1d array', BrainflowExitCodes.INVALID_ARGUMENTS_ERROR.value)
-        res = DataHandlerDLL.get_instance ().perform_bandpass (data, data.shape[0], sampling_rate, center_freq, band_width, order, filter_type, ripple)
+        res = cls._get_handler ().perform_bandpass (data, data.shape[0], sampling_rate, center_freq, band_width, order, filter_type, ripple)
         if res != BrainflowExitCodes.STATUS_OK.value:
             raise BrainFlowError ('unable to apply band pass filter', res)
 
@@ -450,7 +518,7 @@ class DataFilter (object):
             raise BrainFlowError ('wrong type for filter type', BrainflowExitCodes.INVALID_ARGUMENTS_ERROR.value)
         if len (data.shape) != 1:
             raise BrainFlowError ('wrong shape for filter data array, it should be 1d array', BrainflowExitCodes.INVALID_ARGUMENTS_ERROR.value)
-        res = DataHandlerDLL.get_instance ().perform_bandstop (data, data.shape[0], sampling_rate, center_freq, band_width, order, filter_type, ripple)
+        res = cls._get_handler ().perform_bandstop (data, data.shape[0], sampling_rate, center_freq, band_width, order, filter_type, ripple)
         if res != BrainflowExitCodes.STATUS_OK.value:
             raise BrainFlowError ('unable to apply band stop filter', res)
 
@@ -471,7 +539,7 @@ class DataFilter (object):
             raise BrainFlowError ('wrong type for operation', BrainflowExitCodes.INVALID_ARGUMENTS_ERROR.value)
         if len (data.shape) != 1:
             raise BrainFlowError ('wrong shape for filter data array, it should be 1d array', BrainflowExitCodes.INVALID_ARGUMENTS_ERROR.value)
-        res = DataHandlerDLL.get_instance ().perform_rolling_filter (data, data.shape[0], period, operation)
+        res = cls._get_handler ().perform_rolling_filter (data, data.shape[0], period, operation)
         if res != BrainflowExitCodes.STATUS_OK.value:
             raise BrainFlowError ('unable to smooth data', res)
 
@@ -498,7 +566,7 @@ class DataFilter (object):
             raise BrainFlowError ('Invalid value for period', BrainflowExitCodes.INVALID_ARGUMENTS_ERROR.value)
 
         downsampled_data = numpy.zeros (int (data.shape[0] / period)).astype (numpy.float64)
-        res = DataHandlerDLL.get_instance ().perform_downsampling (data, data.shape[0], period, operation, downsampled_data)
+        res = cls._get_handler ().perform_downsampling (data, data.shape[0], period, operation, downsampled_data)
         if res != BrainflowExitCodes.STATUS_OK.value:
             raise BrainFlowError ('unable to perform downsampling', res)
 
@@ -524,7 +592,7 @@ class DataFilter (object):
 
         wavelet_coeffs = numpy.zeros (data.shape[0] + 2 * (40 + 1)).astype (numpy.float64)
         lengths = numpy.zeros (decomposition_level + 1).astype (numpy.int32)
-        res = DataHandlerDLL.get_instance ().perform_wavelet_transform (data, data.shape[0], wavelet_func, decomposition_level, wavelet_coeffs, lengths)
+        res = cls._get_handler ().perform_wavelet_transform (data, data.shape[0], wavelet_func, decomposition_level, wavelet_coeffs, lengths)
         if res != BrainflowExitCodes.STATUS_OK.value:
             raise BrainFlowError ('unable to perform wavelet transform', res)
 
@@ -551,7 +619,7 @@ class DataFilter (object):
             wavelet_func = wavelet
 
         original_data = numpy.zeros (original_data_len).astype (numpy.float64)
-        res = DataHandlerDLL.get_instance ().perform_inverse_wavelet_transform (wavelet_output[0], original_data_len, wavelet_func, 
+        res = cls._get_handler ().perform_inverse_wavelet_transform (wavelet_output[0], original_data_len, wavelet_func, 
                                                                                 decomposition_level, wavelet_output[1], original_data)
         if res != BrainflowExitCodes.STATUS_OK.value:
             raise BrainFlowError ('unable to perform inverse wavelet transform', res)
@@ -574,7 +642,7 @@ class DataFilter (object):
         except:
             wavelet_func = wavelet
 
-        res = DataHandlerDLL.get_instance ().perform_wavelet_denoising (data, data.shape[0], wavelet_func, decomposition_level)
+        res = cls._get_handler ().perform_wavelet_denoising (data, data.shape[0], wavelet_func, decomposition_level)
         if res != BrainflowExitCodes.STATUS_OK.value:
             raise BrainFlowError ('unable to denoise data', res)
 
@@ -597,13 +665,13 @@ class DataFilter (object):
 
         temp_re = numpy.zeros (int (data.shape[0] / 2 + 1)).astype (numpy.float64)
         temp_im = numpy.zeros (int (data.shape[0] / 2 + 1)).astype (numpy.float64)
-        res = DataHandlerDLL.get_instance ().perform_fft (data, data.shape[0], window, temp_re, temp_im)
+        res = cls._get_handler ().perform_fft (data, data.shape[0], window, temp_re, temp_im)
         if res != BrainflowExitCodes.STATUS_OK.value:
             raise BrainFlowError ('unable to perform fft', res)
 
-        output = numpy.zeros (int (data.shape[0] / 2 + 1)).astype (numpy.complex128)
-        for i in range (output.shape[0]):
-            output[i] = numpy.complex128 (complex (temp_re[i], temp_im[i]))
+        output = numpy.empty (temp_re.shape[0], dtype = numpy.complex128)
+        output.real = temp_re
+        output.imag = temp_im
 
         return output
 
@@ -628,7 +696,7 @@ class DataFilter (object):
 
         ampls = numpy.zeros (int (data.shape[0] / 2 + 1)).astype (numpy.float64)
         freqs = numpy.zeros (int (data.shape[0] / 2 + 1)).astype (numpy.float64)
-        res = DataHandlerDLL.get_instance ().get_psd (data, data.shape[0], sampling_rate, window, ampls, freqs)
+        res = cls._get_handler ().get_psd (data, data.shape[0], sampling_rate, window, ampls, freqs)
         if res != BrainflowExitCodes.STATUS_OK.value:
             raise BrainFlowError ('unable to calc psd', res)
 
@@ -659,7 +727,7 @@ class DataFilter (object):
 
         ampls = numpy.zeros (int (nfft / 2 + 1)).astype (numpy.float64)
         freqs = numpy.zeros (int (nfft / 2 + 1)).astype (numpy.float64)
-        res = DataHandlerDLL.get_instance ().get_psd_welch (data, data.shape[0], nfft, overlap, sampling_rate, window, ampls, freqs)
+        res = cls._get_handler ().get_psd_welch (data, data.shape[0], nfft, overlap, sampling_rate, window, ampls, freqs)
         if res != BrainflowExitCodes.STATUS_OK.value:
             raise BrainFlowError ('unable to calc psd welch', res)
 
@@ -676,7 +744,7 @@ class DataFilter (object):
         """
         if len (data.shape) != 1:
             raise BrainFlowError ('wrong shape for data, should be 1d array', BrainflowExitCodes.INVALID_ARGUMENTS_ERROR.value)
-        res = DataHandlerDLL.get_instance ().detrend (data, data.shape[0], detrend_operation)
+        res = cls._get_handler ().detrend (data, data.shape[0], detrend_operation)
         if res != BrainflowExitCodes.STATUS_OK.value:
             raise BrainFlowError ('unable to detrend data', res)
 
@@ -694,7 +762,7 @@ class DataFilter (object):
         :rtype: float
         """
         band_power = numpy.zeros (1).astype (numpy.float64)
-        res = DataHandlerDLL.get_instance ().get_band_power (psd[0], psd[1], psd[0].shape[0], freq_start, freq_end, band_power)
+        res = cls._get_handler ().get_band_power (psd[0], psd[1], psd[0].shape[0], freq_start, freq_end, band_power)
         if res != BrainflowExitCodes.STATUS_OK.value:
             raise BrainFlowError ('unable to calc band power', res)
 
@@ -721,11 +789,9 @@ class DataFilter (object):
 
         avg_bands = numpy.zeros (5).astype (numpy.float64)
         stddev_bands = numpy.zeros (5).astype (numpy.float64)
-        data_1d = numpy.zeros (len (channels) * data.shape[1])
-        for i, channel in enumerate (channels):
-            for j in range (data.shape[1]):
-                data_1d[j + data.shape[1] * i] = data[channel][j]
-        res = DataHandlerDLL.get_instance ().get_avg_band_powers (data_1d, len (channels), data.shape[1], sampling_rate,
+        # rows of selected channels laid out one after another, fancy indexing already returns a new C-ordered array
+        data_1d = numpy.ascontiguousarray (data[list (channels)], dtype = numpy.float64).ravel ()
+        res = cls._get_handler ().get_avg_band_powers (data_1d, len (channels), data.shape[1], sampling_rate,
             int (apply_filter), avg_bands, stddev_bands)
         if res != BrainflowExitCodes.STATUS_OK.value:
             raise BrainFlowError ('unable to get_avg_band_powers', res)
@@ -741,14 +807,11 @@ class DataFilter (object):
         :return: restored data
         :rtype: NDArray[Float64]
         """
-        temp_re = numpy.zeros (data.shape[0]).astype (numpy.float64)
-        temp_im = numpy.zeros (data.shape[0]).astype (numpy.float64)
-        for i in range (data.shape[0]):
-            temp_re[i] = data[i].real
-            temp_im[i] = data[i].imag
+        temp_re = numpy.ascontiguousarray (data.real, dtype = numpy.float64)
+        temp_im = numpy.ascontiguousarray (data.imag, dtype = numpy.float64)
         output = numpy.zeros (2 * (data.shape[0] - 1)).astype (numpy.float64)
 
-        res = DataHandlerDLL.get_instance ().perform_ifft (temp_re, temp_im, output.shape[0], output)
+        res = cls._get_handler ().perform_ifft (temp_re, temp_im, output.shape[0], output)
         if res != BrainflowExitCodes.STATUS_OK.value:
             raise BrainFlowError ('unable to perform ifft', res)
 
@@ -764,7 +827,7 @@ class DataFilter (object):
         :rtype: int
         """
         output = numpy.zeros (1).astype (numpy.int32)
-        res = DataHandlerDLL.get_instance ().get_nearest_power_of_two (value, output)
+        res = cls._get_handler ().get_nearest_power_of_two (value, output)
         if res != BrainflowExitCodes.STATUS_OK.value:
             raise BrainFlowError ('unable to calc nearest power of two', res)
 
@@ -792,7 +855,7 @@ class DataFilter (object):
         except:
             mode = file_mode
         data_flatten = data.flatten ()
-        res = DataHandlerDLL.get_instance ().write_file (data_flatten, data.shape[0], data.shape[1], file, mode)
+        res = cls._get_handler ().write_file (data_flatten, data.shape[0], data.shape[1], file, mode)
         if res != BrainflowExitCodes.STATUS_OK.value:
             raise BrainFlowError ('unable to write file', res)
 
@@ -811,7 +874,7 @@ class DataFilter (object):
             file = file_name
 
         num_elements = numpy.zeros (1).astype (numpy.int32)
-        res = DataHandlerDLL.get_instance ().get_num_elements_in_file (file, num_elements)
+        res = cls._get_handler ().get_num_elements_in_file (file, num_elements)
         if res != BrainflowExitCodes.STATUS_OK.value:
             raise BrainFlowError ('unable to determine number of elements in file', res)
 
@@ -819,7 +882,7 @@ class DataFilter (object):
         num_rows = numpy.zeros (1).astype (numpy.int32)
         num_cols = numpy.zeros (1).astype (numpy.int32)
 
-        res = DataHandlerDLL.get_instance ().read_file (data_arr, num_rows, num_cols, file, num_elements[0])
+        res = cls._get_handler ().read_file (data_arr, num_rows, num_cols, file, num_elements[0])
         if res != BrainflowExitCodes.STATUS_OK.value:
             raise BrainFlowError ('unable to read file', res)
 
@@ -0,0 +1,72 @@
+"""Keyed LRU cache for precomputed DSP constants
+
+Window coefficients, rfft frequency vectors and filter coefficients only depend on a handful of parameters, which stay
+the same for the whole session. The Python processing layer looks them up in the shared dsp_cache instead of
+recomputing them on every call; its hit and miss counters show whether a code path actually reuses them.
+FFT plans are not cached here, NumPy's pocketfft keeps its own cache of them.
+"""
+import threading
+from collections import OrderedDict
+
+
+class KeyedLRUCache (object):
+    """thread safe least recently used cache with hit and miss counters per key kind
+
+    keys are tuples whose first element names the kind of value, e.g. ('window', window_function, length)
+
+    :param maxsize: maximum number of cached values
+    :type maxsize: int
+    """
+
+    def __init__ (self, maxsize: int = 256):
+        self.maxsize = maxsize
+        self.hits = {}
+        self.misses = {}
+        self._values = OrderedDict ()
+        self._lock = threading.Lock ()
+
+    def __len__ (self) -> int:
+        return len (self._values)
+
+    def get (self, key: tuple, factory):
+        """get the value cached for key, computing it with factory () on a miss
+
+        :param key: tuple starting with the kind of value
+        :type key: tuple
+        :param factory: callable without arguments computing the value
+        :return: cached value, shared between callers so it must not be modified
+        """
+        kind = key[0]
+        with self._lock:
+            if key in self._values:
+                self._values.move_to_end (key)
+                self.hits[kind] = self.hits.get (kind, 0) + 1
+                return self._values[key]
+            self.misses[kind] = self.misses.get (kind, 0) + 1
+        # computed outside of the lock, concurrent misses for the same key just compute it twice
+        value = factory ()
+        with self._lock:
+            self._values[key] = value
+            self._values.move_to_end (key)
+            while len (self._values) > self.maxsize:
+                self._values.popitem (last = False)
+        return value
+
+    def clear (self) -> None:
+        with self._lock:
+            self._values.clear ()
+            self.hits.clear ()
+            self.misses.clear ()
+
+    def stats (self) -> dict:
+        """get counters
+
+        :return: {kind: (hits, misses)} for every kind of value looked up so far
+        :rtype: dict
+        """
+        with self._lock:
+            kinds = set (self.hits) | set (self.misses)
+            return {kind: (self.hits.get (kind, 0), self.misses.get (kind, 0)) for kind in sorted (kinds)}
+
+
+dsp_cache = KeyedLRUCache ()
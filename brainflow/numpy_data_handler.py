@@ -0,0 +1,419 @@
+"""Pure NumPy implementation of the DataHandler library
+
+NumpyDataHandler exposes the same functions with the same arguments as DataHandlerDLL, so DataFilter can switch
+between them without changing its argument checks or error handling. It needs no native library and works on every
+platform. Filters require SciPy and wavelet functions require PyWavelets, both are imported on first use.
+
+Results follow the DataHandler library in brainflow/lib, quirks included: periodic windows, Welch segments and band
+power bins selected the way it does, its linear detrend and its get_avg_band_powers normalization. The one intended
+difference are filter cutoffs at or above the Nyquist frequency, which the native library turns into a meaningless
+filter and this backend rejects, so get_avg_band_powers with apply_filters needs a sampling rate above 124 Hz here.
+benchmarks/data_filter_parity.py compares every function against outputs of the native library.
+"""
+import numpy
+
+from brainflow.dsp_cache import dsp_cache
+from brainflow.exit_codes import BrainflowExitCodes
+
+
+NO_WINDOW = 0
+HANNING = 1
+HAMMING = 2
+BLACKMAN_HARRIS = 3
+
+BUTTERWORTH = 0
+CHEBYSHEV_TYPE_1 = 1
+BESSEL = 2
+
+MEAN = 0
+MEDIAN = 1
+EACH = 2
+
+DETREND_NONE = 0
+DETREND_CONSTANT = 1
+DETREND_LINEAR = 2
+
+# delta, theta, alpha, beta, gamma as used by get_avg_band_powers
+AVG_BANDS = ((1.5, 4.0), (4.0, 8.0), (7.5, 13.0), (13.0, 30.0), (30.0, 45.0))
+
+OK = BrainflowExitCodes.STATUS_OK.value
+INVALID_ARGUMENTS = BrainflowExitCodes.INVALID_ARGUMENTS_ERROR.value
+
+
+def get_window (window_function: int, length: int) -> numpy.ndarray:
+    """window coefficients matching the ones the native DataHandler applies before its FFT
+
+    :param window_function: int value from WindowFunctions enum
+    :type window_function: int
+    :param length: window length in samples
+    :type length: int
+    :return: read-only array of length samples, cached in dsp_cache
+    :rtype: numpy.ndarray
+    """
+    return dsp_cache.get (('window', window_function, length), lambda: _make_window (window_function, length))
+
+
+def _make_window (window_function: int, length: int) -> numpy.ndarray:
+    # periodic windows, the native library divides the phase by length, and its Blackman-Harris uses Nuttall's terms
+    phase = 2.0 * numpy.pi * numpy.arange (length) / length
+    if window_function == NO_WINDOW:
+        window = numpy.ones (length)
+    elif window_function == HANNING:
+        window = 0.5 - 0.5 * numpy.cos (phase)
+    elif window_function == HAMMING:
+        window = 0.54 - 0.46 * numpy.cos (phase)
+    elif window_function == BLACKMAN_HARRIS:
+        window = 0.355768 - 0.487396 * numpy.cos (phase) + 0.144232 * numpy.cos (2 * phase) - 0.012604 * numpy.cos (3 * phase)
+    else:
+        raise ValueError ('unsupported window function %s' % window_function)
+    window.flags.writeable = False
+    return window
+
+
+def get_psd_freqs (length: int, sampling_rate: int) -> numpy.ndarray:
+    """read-only frequencies of the rfft bins of a length samples long signal, cached in dsp_cache"""
+    return dsp_cache.get (('rfft_freqs', length, sampling_rate), lambda: _make_psd_freqs (length, sampling_rate))
+
+
+def _make_psd_freqs (length: int, sampling_rate: int) -> numpy.ndarray:
+    freqs = numpy.fft.rfftfreq (length, 1.0 / sampling_rate)
+    freqs.flags.writeable = False
+    return freqs
+
+
+def nearest_power_of_two (value: int) -> int:
+    """Python equivalent of get_nearest_power_of_two, ties go to the larger power"""
+    upper = 1
+    while upper < value:
+        upper *= 2
+    lower = max (upper // 2, 1)
+    return lower if value - lower < upper - value else upper
+
+
+def is_power_of_two (value: int) -> bool:
+    return value > 0 and value & (value - 1) == 0
+
+
+def scale_psd (ampls: numpy.ndarray, length: int, sampling_rate: int) -> numpy.ndarray:
+    """scale squared rfft magnitudes along the last axis to a one-sided PSD, works in-place"""
+    ampls /= sampling_rate * length
+    # every bin except DC and (for even lengths) Nyquist carries the power of its negative frequency too
+    ampls[..., 1:(length + 1) // 2] *= 2
+    return ampls
+
+
+def welch (data: numpy.ndarray, nfft: int, overlap: int, sampling_rate: int, window: int) -> tuple:
+    """Welch PSD along the last axis of data, averaging the PSDs of nfft long segments like the native library
+
+    Segments start every nfft - overlap samples as long as they end before the last sample, so a segment ending
+    exactly at the end of data is left out. The Nyquist bin is summed over the segments instead of averaged.
+
+    :return: amplitudes of nfft // 2 + 1 bins for every row and the matching frequency array
+    :rtype: tuple
+    """
+    step = nfft - overlap
+    segments = numpy.lib.stride_tricks.sliding_window_view (data[..., :-1], nfft, axis = -1)[..., ::step, :]
+    spectrum = numpy.fft.rfft (segments * get_window (window, nfft), axis = -1)
+    powers = spectrum.real ** 2 + spectrum.imag ** 2
+    ampls = powers.mean (axis = -2)
+    ampls[..., -1] = powers[..., -1].sum (axis = -1)
+    return scale_psd (ampls, nfft, sampling_rate), get_psd_freqs (nfft, sampling_rate)
+
+
+def band_slice (freqs: numpy.ndarray, freq_start: float, freq_end: float) -> slice:
+    """bins get_band_power integrates over, from the first one at or above freq_start to the first one above freq_end"""
+    start = numpy.searchsorted (freqs, freq_start, side = 'left')
+    end = min (numpy.searchsorted (freqs, freq_end, side = 'right'), freqs.shape[0] - 1)
+    return slice (start, end + 1)
+
+
+def band_power (ampls: numpy.ndarray, freqs: numpy.ndarray, freq_start: float, freq_end: float) -> numpy.ndarray:
+    """trapezoidal integration of the PSD over the band_slice bins along the last axis"""
+    bins = band_slice (freqs, freq_start, freq_end)
+    band_ampls = ampls[..., bins]
+    return 0.5 * ((band_ampls[..., 1:] + band_ampls[..., :-1]) * numpy.diff (freqs[bins])).sum (axis = -1)
+
+
+def linear_detrend (data: numpy.ndarray) -> numpy.ndarray:
+    """remove the least squares line along the last axis of data, returns a new array"""
+    x = numpy.arange (data.shape[-1]) - (data.shape[-1] - 1) / 2.0
+    means = data.mean (axis = -1, keepdims = True)
+    slopes = (data - means) @ x / (x @ x)
+    return data - means - slopes[..., None] * x
+
+
+def native_linear_detrend (data: numpy.ndarray) -> numpy.ndarray:
+    """linear detrend of the native library, its line goes through the mean at x = n / 2 instead of (n - 1) / 2"""
+    length = data.shape[-1]
+    x = numpy.arange (length)
+    mean_x = length / 2.0
+    mean_y = data.mean (axis = -1, keepdims = True)
+    slopes = ((data @ x)[..., None] / length - mean_x * mean_y) / (x @ x / length - mean_x * mean_x)
+    return data - (slopes * x + mean_y - slopes * mean_x)
+
+
+def _scipy_signal ():
+    try:
+        from scipy import signal
+    except ImportError as e:
+        raise ImportError ('filters of the numpy DataFilter backend require scipy') from e
+    return signal
+
+
+def _pywt ():
+    try:
+        import pywt
+    except ImportError as e:
+        raise ImportError ('wavelet functions of the numpy DataFilter backend require PyWavelets') from e
+    return pywt
+
+
+def get_filter_sos (sampling_rate: int, btype: str, cutoff: tuple, order: int, filter_type: int, ripple: float):
+    """second order sections of a digital IIR filter, cached in dsp_cache
+
+    :param cutoff: one cutoff for lowpass and highpass, (low, high) edges for bandpass and bandstop
+    :type cutoff: tuple
+    :return: sos array or None if filter_type is not a value of FilterTypes enum
+    """
+    key = ('sos', sampling_rate, btype, cutoff, order, filter_type, ripple)
+    return dsp_cache.get (key, lambda: _make_filter_sos (sampling_rate, btype, cutoff, order, filter_type, ripple))
+
+
+def _make_filter_sos (sampling_rate: int, btype: str, cutoff: tuple, order: int, filter_type: int, ripple: float):
+    signal = _scipy_signal ()
+    cutoff = cutoff[0] if len (cutoff) == 1 else list (cutoff)
+    if filter_type == BUTTERWORTH:
+        return signal.butter (order, cutoff, btype, fs = sampling_rate, output = 'sos')
+    if filter_type == CHEBYSHEV_TYPE_1:
+        return signal.cheby1 (order, ripple, cutoff, btype, fs = sampling_rate, output = 'sos')
+    if filter_type == BESSEL:
+        return signal.bessel (order, cutoff, btype, fs = sampling_rate, output = 'sos', norm = 'delay')
+    return None
+
+
+def _aggregate (blocks: numpy.ndarray, operation: int) -> numpy.ndarray:
+    if operation == MEAN:
+        return blocks.mean (axis = -1)
+    if operation == MEDIAN:
+        # the native median of an even number of samples is their mean
+        if blocks.shape[-1] % 2 == 0:
+            return blocks.mean (axis = -1)
+        return numpy.median (blocks, axis = -1)
+    return blocks[..., -1]
+
+
+class NumpyDataHandler (object):
+    """DataHandlerDLL replacement, every function writes its results into the passed arrays and returns an exit code"""
+
+    __instance = None
+
+    @classmethod
+    def get_instance (cls):
+        if cls.__instance is None:
+            cls.__instance = cls ()
+        return cls.__instance
+
+    def __init__ (self):
+        self.log_level = None
+        self.log_file = None
+
+    def set_log_level (self, log_level):
+        self.log_level = log_level
+        return OK
+
+    def set_log_file (self, log_file):
+        self.log_file = log_file
+        return OK
+
+    def _filter (self, data, data_len, sampling_rate, btype, cutoff, order, filter_type, ripple):
+        if data_len < 1 or order < 1 or sampling_rate <= 0:
+            return INVALID_ARGUMENTS
+        if any (freq <= 0 or freq >= sampling_rate / 2.0 for freq in cutoff):
+            return INVALID_ARGUMENTS
+        sos = get_filter_sos (sampling_rate, btype, cutoff, order, filter_type, ripple)
+        if sos is None:
+            return INVALID_ARGUMENTS
+        data[:data_len] = _scipy_signal ().sosfilt (sos, data[:data_len])
+        return OK
+
+    def perform_lowpass (self, data, data_len, sampling_rate, cutoff, order, filter_type, ripple):
+        return self._filter (data, data_len, sampling_rate, 'lowpass', (cutoff,), order, filter_type, ripple)
+
+    def perform_highpass (self, data, data_len, sampling_rate, cutoff, order, filter_type, ripple):
+        return self._filter (data, data_len, sampling_rate, 'highpass', (cutoff,), order, filter_type, ripple)
+
+    def perform_bandpass (self, data, data_len, sampling_rate, center_freq, band_width, order, filter_type, ripple):
+        edges = (center_freq - band_width / 2.0, center_freq + band_width / 2.0)
+        return self._filter (data, data_len, sampling_rate, 'bandpass', edges, order, filter_type, ripple)
+
+    def perform_bandstop (self, data, data_len, sampling_rate, center_freq, band_width, order, filter_type, ripple):
+        edges = (center_freq - band_width / 2.0, center_freq + band_width / 2.0)
+        return self._filter (data, data_len, sampling_rate, 'bandstop', edges, order, filter_type, ripple)
+
+    def perform_rolling_filter (self, data, data_len, period, agg_operation):
+        if period <= 0 or agg_operation not in (MEAN, MEDIAN):
+            return INVALID_ARGUMENTS
+        # trailing window, for the first period - 1 samples the mean aggregates the samples available so far and the
+        # median keeps them unchanged
+        if agg_operation == MEAN:
+            padded = numpy.concatenate ((numpy.full (period - 1, numpy.nan), data[:data_len]))
+            data[:data_len] = numpy.nanmean (numpy.lib.stride_tricks.sliding_window_view (padded, period), axis = 1)
+        elif data_len >= period:
+            windows = numpy.lib.stride_tricks.sliding_window_view (data[:data_len], period)
+            data[period - 1:data_len] = numpy.median (windows, axis = 1)
+        return OK
+
+    def perform_downsampling (self, data, data_len, period, agg_operation, output_data):
+        if period <= 0 or agg_operation not in (MEAN, MEDIAN, EACH):
+            return INVALID_ARGUMENTS
+        num_blocks = data_len // period
+        output_data[:num_blocks] = _aggregate (data[:num_blocks * period].reshape (num_blocks, period), agg_operation)
+        return OK
+
+    def perform_wavelet_transform (self, data, data_len, wavelet, decomposition_level, output_data, output_lengths):
+        pywt = _pywt ()
+        try:
+            coeffs = pywt.wavedec (data[:data_len], wavelet.decode (), mode = 'symmetric', level = decomposition_level)
+        except ValueError:
+            return INVALID_ARGUMENTS
+        output_lengths[:] = [len (block) for block in coeffs]
+        flat = numpy.concatenate (coeffs)
+        if flat.shape[0] > output_data.shape[0]:
+            return INVALID_ARGUMENTS
+        output_data[:flat.shape[0]] = flat
+        return OK
+
+    def perform_inverse_wavelet_transform (self, wavelet_coeffs, original_data_len, wavelet, decomposition_level,
+        decomposition_lengths, output_data):
+        pywt = _pywt ()
+        coeffs = numpy.split (wavelet_coeffs, numpy.cumsum (decomposition_lengths)[:-1])
+        try:
+            restored = pywt.waverec (coeffs, wavelet.decode (), mode = 'symmetric')
+        except ValueError:
+            return INVALID_ARGUMENTS
+        output_data[:original_data_len] = restored[:original_data_len]
+        return OK
+
+    def perform_wavelet_denoising (self, data, data_len, wavelet, decomposition_level):
+        pywt = _pywt ()
+        try:
+            coeffs = pywt.wavedec (data[:data_len], wavelet.decode (), mode = 'symmetric', level = decomposition_level)
+        except ValueError:
+            return INVALID_ARGUMENTS
+        # VisuShrink with soft thresholding, the noise level is estimated for every detail level separately
+        scale = numpy.sqrt (2.0 * numpy.log (data_len))
+        for details in coeffs[1:]:
+            sigma = numpy.median (numpy.abs (details)) / 0.6745
+            details[:] = pywt.threshold (details, sigma * scale, mode = 'soft')
+        data[:data_len] = pywt.waverec (coeffs, wavelet.decode (), mode = 'symmetric')[:data_len]
+        return OK
+
+    def perform_fft (self, data, data_len, window, output_re, output_im):
+        if not is_power_of_two (data_len):
+            return INVALID_ARGUMENTS
+        spectrum = numpy.fft.rfft (data[:data_len] * get_window (window, data_len))
+        output_re[:] = spectrum.real
+        output_im[:] = spectrum.imag
+        return OK
+
+    def perform_ifft (self, input_re, input_im, data_len, restored_data):
+        if not is_power_of_two (data_len):
+            return INVALID_ARGUMENTS
+        spectrum = numpy.empty (data_len // 2 + 1, dtype = numpy.complex128)
+        spectrum.real = input_re[:data_len // 2 + 1]
+        spectrum.imag = input_im[:data_len // 2 + 1]
+        restored_data[:data_len] = numpy.fft.irfft (spectrum, data_len)
+        return OK
+
+    def get_psd (self, data, data_len, sampling_rate, window, output_ampl, output_freq):
+        if not is_power_of_two (data_len) or sampling_rate <= 0:
+            return INVALID_ARGUMENTS
+        spectrum = numpy.fft.rfft (data[:data_len] * get_window (window, data_len))
+        output_ampl[:] = scale_psd (spectrum.real ** 2 + spectrum.imag ** 2, data_len, sampling_rate)
+        output_freq[:] = get_psd_freqs (data_len, sampling_rate)
+        return OK
+
+    def get_psd_welch (self, data, data_len, nfft, overlap, sampling_rate, window, output_ampl, output_freq):
+        if not is_power_of_two (nfft) or overlap < 0 or overlap >= nfft or data_len <= nfft or sampling_rate <= 0:
+            return INVALID_ARGUMENTS
+        output_ampl[:], output_freq[:] = welch (data[:data_len], nfft, overlap, sampling_rate, window)
+        return OK
+
+    def detrend (self, data, data_len, detrend_operation):
+        if detrend_operation == DETREND_CONSTANT:
+            data[:data_len] -= data[:data_len].mean ()
+        elif detrend_operation == DETREND_LINEAR:
+            data[:data_len] = native_linear_detrend (data[:data_len])
+        elif detrend_operation != DETREND_NONE:
+            return INVALID_ARGUMENTS
+        return OK
+
+    def get_band_power (self, ampl, freq, data_len, freq_start, freq_end, band_power_output):
+        bins = band_slice (freq[:data_len], freq_start, freq_end)
+        if freq_start >= freq_end or bins.stop - bins.start < 2:
+            return INVALID_ARGUMENTS
+        band_power_output[0] = band_power (ampl[:data_len], freq[:data_len], freq_start, freq_end)
+        return OK
+
+    def get_avg_band_powers (self, raw_data, rows, cols, sampling_rate, apply_filters, avg_band_powers,
+        stddev_band_powers):
+        # nfft starts at twice the sampling rate and is halved until it fits into the data
+        nfft = 2 * nearest_power_of_two (sampling_rate)
+        while nfft > cols:
+            nfft //= 2
+        if rows < 1 or nfft <= 7 or nfft == cols or sampling_rate <= 0:
+            return INVALID_ARGUMENTS
+        data = raw_data[:rows * cols].reshape (rows, cols).copy ()
+        if apply_filters:
+            data = native_linear_detrend (data)
+            for row in data:
+                for center_freq in (50.0, 60.0):
+                    res = self.perform_bandstop (row, cols, sampling_rate, center_freq, 4.0, 4, BUTTERWORTH, 0.0)
+                    if res != OK:
+                        return res
+                res = self.perform_bandpass (row, cols, sampling_rate, 24.0, 47.0, 4, BUTTERWORTH, 0.0)
+                if res != OK:
+                    return res
+        ampls, freqs = welch (data, nfft, 4 * nfft // 5, sampling_rate, HANNING)
+        if any (bins.stop - bins.start < 2 for bins in (band_slice (freqs, start, end) for start, end in AVG_BANDS)):
+            return INVALID_ARGUMENTS
+        band_powers = numpy.column_stack ([band_power (ampls, freqs, start, end) for start, end in AVG_BANDS])
+        # the averages are relative to their sum, the deviations relative to the average of their band
+        means = band_powers.mean (axis = 0)
+        avg_band_powers[:] = means / means.sum ()
+        stddev_band_powers[:] = band_powers.std (axis = 0) / means
+        return OK
+
+    def get_nearest_power_of_two (self, value, output):
+        if value < 0:
+            return INVALID_ARGUMENTS
+        output[0] = nearest_power_of_two (value)
+        return OK
+
+    def write_file (self, data, num_rows, num_cols, file_name, file_mode):
+        mode = file_mode.decode ()
+        if mode not in ('w', 'a'):
+            return INVALID_ARGUMENTS
+        # samples are stored as lines, like the native library does
+        with open (file_name.decode (), mode) as f:
+            numpy.savetxt (f, data[:num_rows * num_cols].reshape (num_rows, num_cols).T, fmt = '%f', delimiter = '\t')
+        return OK
+
+    def _load (self, file_name):
+        return numpy.loadtxt (file_name.decode (), delimiter = '\t', ndmin = 2)
+
+    def get_num_elements_in_file (self, file_name, num_elements):
+        try:
+            num_elements[0] = self._load (file_name).size
+        except OSError:
+            return BrainflowExitCodes.GENERAL_ERROR.value
+        return OK
+
+    def read_file (self, data, num_rows, num_cols, file_name, num_elements):
+        try:
+            samples = self._load (file_name)
+        except OSError:
+            return BrainflowExitCodes.GENERAL_ERROR.value
+        num_rows[0], num_cols[0] = samples.shape[1], samples.shape[0]
+        data[:samples.size] = samples.T.ravel ()[:num_elements]
+        return OK
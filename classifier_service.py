@@ -0,0 +1,135 @@
+"""
+Long lived concentration classifier.
+
+The session used to create, prepare(), predict() and release() a brainflow MLModel on every classification tick,
+reloading the model each time. ConcentrationClassifier is prepared once per session and reused, and can fall back to
+a pure NumPy KNN / logistic regression model when the native MLModule library is not available (e.g. on Linux).
+
+NumPy models are loaded from a .npz file:
+
+* KNN: 'features' (n x 10 feature vectors), 'labels' (n values, 1 for concentrated) and optional 'k' (default 5),
+  the score is the mean label of the k nearest neighbours;
+* REGRESSION: 'coefficients' (10 values) and 'intercept', the score is the logistic of the linear combination.
+"""
+import numpy as np
+
+from brainflow.ml_model import MLModel, MLModuleDLL, BrainFlowMetrics, BrainFlowClassifiers, BrainFlowModelParams
+
+
+class KnnModel:
+
+    def __init__(self, features: np.ndarray, labels: np.ndarray, k: int = 5):
+        self.features = np.asarray(features, dtype=np.float64)
+        self.labels = np.asarray(labels, dtype=np.float64)
+        self.k = min(k, len(self.labels))
+        self._squared_norms = np.einsum('ij,ij->i', self.features, self.features)
+
+    def predict_batch(self, data: np.ndarray) -> np.ndarray:
+        # |a - b|^2 = |a|^2 - 2ab + |b|^2, |a|^2 is constant per query row so it does not change the ranking
+        distances = self._squared_norms[None, :] - 2.0 * data @ self.features.T
+        nearest = np.argpartition(distances, self.k - 1, axis=1)[:, :self.k]
+        return self.labels[nearest].mean(axis=1)
+
+
+class RegressionModel:
+
+    def __init__(self, coefficients: np.ndarray, intercept: float):
+        self.coefficients = np.asarray(coefficients, dtype=np.float64)
+        self.intercept = float(intercept)
+
+    def predict_batch(self, data: np.ndarray) -> np.ndarray:
+        return 1.0 / (1.0 + np.exp(-(data @ self.coefficients + self.intercept)))
+
+
+def load_numpy_model(file: str, classifier: int):
+    """
+    Load a NumPy fallback model.
+
+    :param file: Path of the .npz model file.
+    :param classifier: int value from BrainFlowClassifiers enum, KNN and REGRESSION are supported.
+
+    :return: A KnnModel or RegressionModel.
+    """
+    with np.load(file) as model:
+        if classifier == BrainFlowClassifiers.KNN.value:
+            k = int(model['k']) if 'k' in model else 5
+            return KnnModel(model['features'], model['labels'], k)
+        if classifier == BrainFlowClassifiers.REGRESSION.value:
+            return RegressionModel(model['coefficients'], model['intercept'])
+    raise ValueError(f'classifier {classifier} has no NumPy implementation')
+
+
+def native_ml_available() -> bool:
+    try:
+        MLModuleDLL.get_instance()
+    except (FileNotFoundError, OSError):
+        return False
+    return True
+
+
+class ConcentrationClassifier:
+    """
+    Classifier service prepared once and reused for every prediction of a session.
+
+    :param classifier: int value from BrainFlowClassifiers enum.
+    :param metric: int value from BrainFlowMetrics enum.
+    :param model_file: Model file, passed to MLModel for the native backend, .npz file for the NumPy backend.
+    :param backend: 'native', 'numpy' or 'auto' to use the native library when it can be loaded.
+    """
+
+    def __init__(self, classifier: int = BrainFlowClassifiers.KNN.value,
+                 metric: int = BrainFlowMetrics.CONCENTRATION.value, model_file: str = '', backend: str = 'auto'):
+        if backend not in ('auto', 'native', 'numpy'):
+            raise ValueError(f'unknown classifier backend {backend}')
+        self.classifier = classifier
+        self.metric = metric
+        self.model_file = model_file
+        self.backend = backend
+        self.is_prepared = False
+        self._native = None
+        self._numpy = None
+
+    def __enter__(self) -> "ConcentrationClassifier":
+        self.prepare()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def prepare(self):
+        """Load the model, does nothing if it is already prepared"""
+        if self.is_prepared:
+            return
+        if self.backend == 'native' or (self.backend == 'auto' and native_ml_available()):
+            params = BrainFlowModelParams(self.metric, self.classifier)
+            params.file = self.model_file
+            self._native = MLModel(params)
+            self._native.prepare()
+            self.backend = 'native'
+        else:
+            if not self.model_file:
+                raise FileNotFoundError('native MLModule library is not available and no NumPy model file is set')
+            self._numpy = load_numpy_model(self.model_file, self.classifier)
+            self.backend = 'numpy'
+        self.is_prepared = True
+
+    def release(self):
+        if self._native is not None:
+            self._native.release()
+        self._native = None
+        self._numpy = None
+        self.is_prepared = False
+
+    def predict(self, feature_vector: np.ndarray) -> float:
+        """
+        Score one feature vector, preparing the model on first use.
+
+        :param feature_vector: Averaged band powers followed by their standard deviations.
+
+        :return: Metric value.
+        """
+        self.prepare()
+        if self._native is not None:
+            return self._native.predict(feature_vector)
+        return float(self._numpy.predict_batch(feature_vector[None, :])[0])
+
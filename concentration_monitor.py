@@ -1,3 +1,5 @@
+import logging
+
 from PyQt5 import QtWidgets as qtw
 from PyQt5 import QtGui as qtg
 from PyQt5 import QtCore as qtc
@@ -5,6 +7,8 @@ from PyQt5 import QtChart as qtch
 
 from designer.concentration_form import Ui_ConcentrationForm
 
+logger = logging.getLogger(__name__)
+
 
 class ConcentrationMonitor(qtw.QMainWindow):
     startSignal = qtc.pyqtSignal(int)
@@ -42,7 +46,7 @@ class ConcentrationMonitor(qtw.QMainWindow):
             self.classification_session_started = False
         else:
             interval = int(self.settings_form.intervalSpinBox.value()*1000)
-            print('classification interval:', interval)
+            logger.info('classification interval: %d ms', interval)
             self.startSignal.emit(interval)
             self.settings_form.startToggleBtn.setText('Stop')
             self.classification_session_started = True
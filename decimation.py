@@ -0,0 +1,23 @@
+import numpy as np
+
+
+def minmax_decimate(data: np.ndarray, bin_size: int, out: np.ndarray = None) -> np.ndarray:
+    """
+    Peak preserving downsampling for display: every bin of bin_size samples becomes its minimum followed by its maximum.
+
+    Unlike picking every n-th sample this keeps spikes and the signal envelope visible at any zoom level, while the
+    number of plotted points only depends on the number of bins.
+
+    :param data: (channels x n) array, n must be a multiple of bin_size.
+    :param bin_size: Number of samples per bin.
+    :param out: Optional preallocated (channels x 2 * n / bin_size) output array.
+
+    :return: (channels x 2 * n / bin_size) envelope, min and max of each bin interleaved.
+    """
+    num_bins = data.shape[1] // bin_size
+    bins = data.reshape(data.shape[0], num_bins, bin_size)
+    if out is None:
+        out = np.empty((data.shape[0], 2 * num_bins), dtype=data.dtype)
+    np.min(bins, axis=2, out=out[:, 0::2])
+    np.max(bins, axis=2, out=out[:, 1::2])
+    return out
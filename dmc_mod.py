@@ -1,12 +1,18 @@
+import logging
+
 from PyQt5 import QtWidgets as qtw
 from PyQt5 import QtGui as qtg
 from PyQt5 import QtCore as qtc
 from PyQt5 import QtChart as qtch
 
-from ReadWriteMem import ReadWriteMemory
+from ReadWriteMem import ReadWriteMemory, ReadWriteMemoryError
+
+from injection_engine import InjectionEngine
 
 from designer.dmc_mod_from import Ui_DmcEegModForm
 
+logger = logging.getLogger(__name__)
+
 
 class DMCMod(qtw.QMainWindow):
 
@@ -25,79 +31,89 @@ class DMCMod(qtw.QMainWindow):
         self.is_connected = False
         self.is_injecting = False
         self.current_eeg_concentration = 0.6
+        # Board timestamp of the newest sample behind current_eeg_concentration
+        self.current_eeg_sample_time = None
 
         # Read Write Memory params
         self.rwm = ReadWriteMemory()
         self.process = None
         self.concentration_ptr = None
+        self.concentration_chain = None
 
         # Buttons Trigger
         self.mod_form.connectBtn.clicked.connect(self.connect)
         self.mod_form.setValBtn.clicked.connect(self.form_set_value)
         self.mod_form.startBtn.clicked.connect(self.execute_injection)
 
-        self.concentration_update_value = 0
-
-        # Timers
-        self.value_update_timer = qtc.QTimer()
-        self.value_update_timer.timeout.connect(self.update_value)
-        self.injection_timer = qtc.QTimer()
-        self.injection_timer.timeout.connect(self.inject_value)
-
-    def inject_value(self):
-        # TODO: check if in combat
-        self.write_dmc_concentration(self.concentration_update_value)
-
-    def update_value(self):
-        print('update dmc5')
-        # calculate update value
-        dmc_concentration = self.read_dmc_concentration()
-        update_value = self.current_eeg_concentration - self.mod_form.thrSpinBox.value()
-        if update_value > 0:
-            update_value *= self.mod_form.addSpinBox.value()
-        else:
-            update_value *= self.mod_form.subSpinBox.value()
-
-        next_concentration_value = dmc_concentration + update_value
-        if next_concentration_value > 300:
-            next_concentration_value = 300
-        elif next_concentration_value < 0:
-            next_concentration_value = 0
-
-        # update status values
-        self.mod_form.concentrationLabel.setText(str(self.current_eeg_concentration))
-        self.mod_form.updateLabel.setText(str(update_value))
-        self.mod_form.gameLabel.setText(str(dmc_concentration))
-        self.mod_form.nextGameLabel.setText(str(next_concentration_value))
-
-        # update game value
-        self.concentration_update_value = next_concentration_value
+        # Update and injection ticks run on the engine thread, the GUI only polls its state and statistics
+        self.engine = None
+        self.status_timer = qtc.QTimer()
+        self.status_timer.timeout.connect(self.update_status)
+        for spin_box in (self.mod_form.thrSpinBox, self.mod_form.addSpinBox, self.mod_form.subSpinBox):
+            spin_box.valueChanged.connect(self.apply_parameters)
+
+    def set_eeg_concentration(self, concentration, sample_time=None):
+        self.current_eeg_concentration = concentration
+        self.current_eeg_sample_time = sample_time
+        if self.engine is not None:
+            self.engine.submit_concentration(concentration, sample_time)
+
+    def apply_parameters(self):
+        if self.engine is not None:
+            self.engine.set_parameters(self.mod_form.thrSpinBox.value(), self.mod_form.addSpinBox.value(),
+                                       self.mod_form.subSpinBox.value())
+
+    def update_status(self):
+        engine = self.engine
+        if engine.error is not None:
+            logger.error('injection stopped: %s', engine.error)
+            self.execute_injection()
+            return
+        if engine.state is not None:
+            eeg_concentration, update_value, dmc_concentration, next_concentration_value = engine.state
+            self.mod_form.concentrationLabel.setText(str(eeg_concentration))
+            self.mod_form.updateLabel.setText(str(update_value))
+            self.mod_form.gameLabel.setText(str(dmc_concentration))
+            self.mod_form.nextGameLabel.setText(str(next_concentration_value))
+        stats = engine.stats()
+        self.status.showMessage('update %.1f Hz, inject %.1f Hz, jitter p95 %.2f ms, overruns %d, writes %d/%d' % (
+            stats['update']['rate_hz'], stats['inject']['rate_hz'], stats['inject']['jitter_p95_ms'],
+            stats['update']['overruns'] + stats['inject']['overruns'], stats['writes'],
+            stats['writes'] + stats['skipped_writes']))
 
 
     def execute_injection(self):
         if not self.is_connected:
-            print('not connected to game')
+            logger.warning('not connected to game')
             return
         if not self.is_injecting:
-            print('start inject')
+            logger.info('start inject')
             update_interval = self.mod_form.valUpdateIntervalSpinBox.value()
             inject_interval = self.mod_form.injectIntervalSpinBox.value()
-            self.value_update_timer.start(update_interval)
-            self.injection_timer.start(inject_interval)
+            self.engine = InjectionEngine(self.read_dmc_concentration, self.write_dmc_concentration,
+                                          update_interval / 1000, inject_interval / 1000)
+            self.engine.submit_concentration(self.current_eeg_concentration, self.current_eeg_sample_time)
+            self.apply_parameters()
+            self.engine.start()
+            self.status_timer.start(500)
             self.mod_form.startBtn.setText('Stop Injection')
             self.mod_form.connectBtn.setDisabled(True)
             self.is_injecting = True
         else:
-            self.value_update_timer.stop()
-            self.injection_timer.stop()
+            self.status_timer.stop()
+            self.engine.stop()
+            self.engine.join()
+            self.engine = None
             self.mod_form.connectBtn.setDisabled(False)
             self.mod_form.startBtn.setText('Start Injection')
             self.is_injecting = False
 
     def form_set_value(self):
         val = self.mod_form.valSpinBox.value()
-        self.concentration_update_value = val
-        if self.is_connected:
+        if self.engine is not None:
+            # The engine thread owns the game memory while injecting
+            self.engine.set_target(val)
+        elif self.is_connected:
             self.write_dmc_concentration(val)
             # update status values
             self.mod_form.concentrationLabel.setText(str(self.current_eeg_concentration))
@@ -113,29 +129,35 @@ class DMCMod(qtw.QMainWindow):
 
             # Get concentration pointer
             base_offset = 0X7E61B90
-            module_addr = int(str(self.process.base_addr), 0) + int(str(base_offset), 0)
-            self.concentration_ptr = self.process.get_pointer(lp_base_address=module_addr, offsets=[0x78, 0x1B50])
+            module_addr = self.process.base_addr + base_offset
+            self.concentration_chain = self.process.pointer_chain(module_addr, [0x78, 0x1B50])
+            self.concentration_ptr = self.concentration_chain.resolve()
 
-            # TODO: Get in combat ptr
             self.is_connected = True
             self.mod_form.connectBtn.setText('Disconnect')
-            print('connection to dmc5')
+            logger.info('connection to dmc5')
         else:
             self.process.close()
             self.is_connected = False
             self.mod_form.connectBtn.setText('Connect')
-            print('disconnect from dmc5')
+            logger.info('disconnect from dmc5')
 
     def read_dmc_concentration(self):
-        con_val = self.process.read_float(self.concentration_ptr)
-        print('Read concentration:', con_val)
-        return con_val
+        # Validates the cached pointer chain and reads the value with one read
+        return self.concentration_chain.read()
 
     def write_dmc_concentration(self, val):
-        state = self.process.write(self.concentration_ptr, val)
-        print('write concentration state:', state)
+        # Revalidates the chain first, after a failed or stale walk its address is None or points to old memory
+        try:
+            self.concentration_ptr = self.concentration_chain.resolve()
+        except ReadWriteMemoryError:
+            self.concentration_ptr = None
+            return False
+        return self.process.write(self.concentration_ptr, val)
 
     def closeEvent(self, event):
+        if self.is_injecting:
+            self.execute_injection()
         if self.is_connected:
             self.process.close()
             self.is_connected = False
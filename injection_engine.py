@@ -0,0 +1,161 @@
+"""
+Game value injection off the GUI thread.
+
+InjectionEngine runs the DMCMod update and injection ticks on its own thread, each on a deadline schedule: the thread
+sleeps until the earliest deadline, and deadlines advance by the tick interval so lateness does not accumulate.
+Updates read the game value and compute the next one from the latest EEG concentration; injections write it only
+when it differs from the value last written, or when the game changed the value since.
+
+The concentration, the mod parameters and the engine state are handed over as whole tuples replaced by reference, so
+neither side takes a lock and the GUI only reads snapshots.
+"""
+import math
+import threading
+import time
+
+from acquisition_scheduler import PollStats
+from latency_probes import latency_probes
+
+MAX_GAME_VALUE = 300
+
+
+def next_game_value(game_value: float, eeg_concentration: float, threshold: float, add: float, sub: float):
+    """
+    :return: (update value, next game value), the EEG concentration above threshold raises the game value by add per
+        unit and below it lowers it by sub per unit, clamped to [0, MAX_GAME_VALUE].
+    """
+    update_value = eeg_concentration - threshold
+    if update_value > 0:
+        update_value *= add
+    else:
+        update_value *= sub
+    return update_value, min(max(game_value + update_value, 0), MAX_GAME_VALUE)
+
+
+def same_value(value: float, written: float) -> bool:
+    """Compare with the last written value, tolerating the rounding of a float32 round trip through game memory"""
+    return written is not None and math.isclose(value, written, rel_tol=1e-6, abs_tol=1e-6)
+
+
+class InjectionEngine(threading.Thread):
+    """
+    :param read_value: Function returning the current game value, called on the engine thread.
+    :param write_value: Function writing a game value, called on the engine thread. Returns False if nothing was
+        written, the next injection tick tries again.
+    :param update_interval: Seconds between reads of the game value.
+    :param inject_interval: Seconds between injection ticks.
+    """
+
+    # Longest single sleep, bounds how long stop takes
+    max_sleep = 0.05
+
+    def __init__(self, read_value, write_value, update_interval: float, inject_interval: float):
+        super().__init__(name='InjectionEngine', daemon=True)
+        self.read_value = read_value
+        self.write_value = write_value
+        self.update_interval = update_interval
+        self.inject_interval = inject_interval
+
+        # (concentration, sample time), (threshold, add, sub) and the target value, each replaced as a whole
+        self.concentration = (0.0, None)
+        self.parameters = (0.5, 1.0, 1.0)
+        self._target = None
+        # (eeg concentration, update value, game value, next game value) of the last update, for display
+        self.state = None
+
+        self.update_stats = PollStats()
+        self.inject_stats = PollStats()
+        self.writes = 0
+        self.skipped_writes = 0
+        self.error = None
+        self._written = None
+        self._stop_event = threading.Event()
+
+    def submit_concentration(self, concentration: float, sample_time: float = None):
+        """Hand over the latest classification, callable from any thread"""
+        self.concentration = (concentration, sample_time)
+
+    def set_parameters(self, threshold: float, add: float, sub: float):
+        self.parameters = (threshold, add, sub)
+
+    def set_target(self, value: float):
+        """Inject value on the next tick, until the next update replaces it"""
+        self._target = (value, None)
+
+    def stop(self):
+        self._stop_event.set()
+
+    def stats(self) -> dict:
+        return {
+            'update': self.update_stats.snapshot(),
+            'inject': self.inject_stats.snapshot(),
+            'writes': self.writes,
+            'skipped_writes': self.skipped_writes
+        }
+
+    def run(self):
+        now = time.perf_counter()
+        next_update = now
+        next_inject = now + self.inject_interval
+        try:
+            while not self._stop_event.is_set():
+                deadline = min(next_update, next_inject)
+                if not self._sleep_until(deadline):
+                    break
+                if next_update <= deadline:
+                    next_update = self._tick(self.update, next_update, self.update_interval, self.update_stats)
+                if next_inject <= deadline:
+                    next_inject = self._tick(self.inject, next_inject, self.inject_interval, self.inject_stats)
+        except Exception as e:
+            self.error = e
+
+    def update(self):
+        game_value = self.read_value()
+        concentration, sample_time = self.concentration
+        threshold, add, sub = self.parameters
+        update_value, next_value = next_game_value(game_value, concentration, threshold, add, sub)
+        if not same_value(game_value, self._written):
+            # The game changed the value since the last write, it has to be written again
+            self._written = None
+        self._target = (next_value, sample_time)
+        self.state = (concentration, update_value, game_value, next_value)
+
+    def inject(self):
+        # TODO: check if in combat
+        target = self._target
+        if target is None:
+            return
+        value, sample_time = target
+        if same_value(value, self._written):
+            self.skipped_writes += 1
+            return
+        start = latency_probes.clock()
+        if not self.write_value(value):
+            return
+        latency_probes.record_since('memory_write', start)
+        if sample_time is not None:
+            latency_probes.record_age('concentration_age', sample_time)
+        self._written = value
+        self.writes += 1
+
+    def _tick(self, task, deadline: float, interval: float, stats: PollStats) -> float:
+        woke = time.perf_counter()
+        task()
+        next_deadline = deadline + interval
+        now = time.perf_counter()
+        overrun = now > next_deadline
+        if overrun:
+            next_deadline = now + interval
+        stats.record(woke - deadline, 1, overrun)
+        return next_deadline
+
+    def _sleep_until(self, deadline: float) -> bool:
+        """Sleep until deadline in slices of at most max_sleep, False if stopped meanwhile"""
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return True
+            # time.sleep uses high resolution timers where Event.wait may round up to the system tick
+            time.sleep(min(remaining, self.max_sleep))
+            if self._stop_event.is_set():
+                return False
@@ -0,0 +1,68 @@
+from PyQt5 import QtWidgets as qtw
+from PyQt5 import QtCore as qtc
+
+from latency_probes import latency_probes, PERCENTILES
+
+
+class LatencyPanel(qtw.QWidget):
+    """Per stage latency percentiles of the latency_probes registry, refreshed while the panel is shown"""
+    refresh_interval = 1000
+
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle('Latency Probes')
+        layout = qtw.QVBoxLayout()
+        self.setLayout(layout)
+
+        self.enabled_check = qtw.QCheckBox('Enabled')
+        self.enabled_check.setChecked(latency_probes.enabled)
+        self.enabled_check.toggled.connect(self.set_enabled)
+        layout.addWidget(self.enabled_check)
+
+        headers = ['Count', 'Mean (ms)'] + ['p%d (ms)' % q for q in PERCENTILES] + ['Max (ms)']
+        self.table = qtw.QTableWidget(0, len(headers))
+        self.table.setHorizontalHeaderLabels(headers)
+        self.table.setEditTriggers(qtw.QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        buttons = qtw.QHBoxLayout()
+        reset_btn = qtw.QPushButton('Reset')
+        reset_btn.clicked.connect(self.reset)
+        export_btn = qtw.QPushButton('Export CSV')
+        export_btn.clicked.connect(self.export_csv)
+        buttons.addWidget(reset_btn)
+        buttons.addWidget(export_btn)
+        layout.addLayout(buttons)
+
+        self.refresh_timer = qtc.QTimer()
+        self.refresh_timer.timeout.connect(self.refresh)
+
+    def set_enabled(self, enabled):
+        latency_probes.enabled = enabled
+
+    def reset(self):
+        latency_probes.reset()
+        self.refresh()
+
+    def export_csv(self):
+        file_name, _ = qtw.QFileDialog.getSaveFileName(self, 'Export Latencies', '', 'CSV Files (*.csv)')
+        if file_name:
+            latency_probes.write_csv(file_name)
+
+    def refresh(self):
+        summary = latency_probes.summary()
+        self.table.setRowCount(len(summary))
+        self.table.setVerticalHeaderLabels(list(summary))
+        for row, (count, *values) in enumerate(summary.values()):
+            self.table.setItem(row, 0, qtw.QTableWidgetItem(str(count)))
+            for column, value in enumerate(values, 1):
+                self.table.setItem(row, column, qtw.QTableWidgetItem('%.2f' % (value * 1e3)))
+
+    def showEvent(self, event):
+        self.refresh()
+        self.refresh_timer.start(self.refresh_interval)
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super().hideEvent(event)
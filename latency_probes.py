@@ -0,0 +1,153 @@
+"""
+In-process latency probes.
+
+Stages record durations into log-bucketed histograms of the shared latency_probes registry:
+
+* board_read: age of the newest sample of a chunk when the acquisition thread reads it, from the timestamp channel;
+* denoise, psd, classification: processing time of the stage on the processing worker;
+* classification_age: age of the newest classified sample once the concentration value is published;
+* monitor_paint: time spent updating the waveform and PSD plots on the GUI thread;
+* memory_write, concentration_age: DMCMod game memory write and age of the newest sample behind the written value.
+
+Probes are disabled unless the ADS_LATENCY_PROBES environment variable is set or the registry is enabled at run time;
+disabled, a probe costs one attribute check. Probe pattern:
+
+    start = latency_probes.clock()
+    ...
+    latency_probes.record_since('denoise', start)
+"""
+import csv
+import math
+import os
+import threading
+import time
+
+PROBES_ENV = 'ADS_LATENCY_PROBES'
+PERCENTILES = (50, 95, 99)
+
+
+class LatencyHistogram:
+    """
+    Log-bucketed histogram of durations, percentiles are accurate to the bucket width (about 6 %).
+
+    :param min_value: Lower edge of the first bucket in seconds, smaller values are counted there.
+    :param max_value: Upper edge of the last bucket in seconds, larger values are counted there.
+    :param buckets_per_decade: Resolution of the histogram.
+    """
+
+    def __init__(self, min_value: float = 1e-6, max_value: float = 100.0, buckets_per_decade: int = 40):
+        self.min_value = min_value
+        self.buckets_per_decade = buckets_per_decade
+        self.num_buckets = int(math.ceil(math.log10(max_value / min_value) * buckets_per_decade))
+        self.counts = [0] * self.num_buckets
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, value: float):
+        if value > self.min_value:
+            bucket = min(int(math.log10(value / self.min_value) * self.buckets_per_decade), self.num_buckets - 1)
+        else:
+            bucket = 0
+        with self._lock:
+            self.counts[bucket] += 1
+            self.count += 1
+            self.total += value
+            if value > self.max:
+                self.max = value
+
+    def upper_edge(self, bucket: int) -> float:
+        return self.min_value * 10 ** ((bucket + 1) / self.buckets_per_decade)
+
+    def percentile(self, q: float) -> float:
+        """Upper edge of the bucket holding the q-th percentile, 0.0 without samples"""
+        with self._lock:
+            counts, count, maximum = list(self.counts), self.count, self.max
+        if count == 0:
+            return 0.0
+        rank = q / 100 * count
+        cumulative = 0
+        for bucket, bucket_count in enumerate(counts):
+            cumulative += bucket_count
+            if cumulative >= rank and bucket_count:
+                return min(self.upper_edge(bucket), maximum)
+        return maximum
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def reset(self):
+        with self._lock:
+            self.counts = [0] * self.num_buckets
+            self.count = 0
+            self.total = 0.0
+            self.max = 0.0
+
+
+class LatencyRegistry:
+    """Histograms by stage name, created on first record"""
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def clock(self) -> float:
+        """time.perf_counter() if enabled, 0.0 otherwise, record_since ignores such starts"""
+        return time.perf_counter() if self.enabled else 0.0
+
+    def record(self, stage: str, seconds: float):
+        if not self.enabled:
+            return
+        histogram = self._histograms.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(stage, LatencyHistogram())
+        histogram.record(seconds)
+
+    def record_since(self, stage: str, start: float):
+        """
+        Record the time elapsed since start = clock().
+
+        A start of 0.0 was taken while probes were disabled, it is skipped so that enabling the probes between clock()
+        and record_since does not record the whole perf_counter() value.
+        """
+        if self.enabled and start:
+            self.record(stage, time.perf_counter() - start)
+
+    def record_age(self, stage: str, timestamp: float):
+        """Record the age of a wall clock (time.time()) timestamp, e.g. from the board timestamp channel"""
+        if self.enabled:
+            self.record(stage, time.time() - timestamp)
+
+    def stages(self) -> list:
+        with self._lock:
+            return sorted(self._histograms)
+
+    def summary(self, percentiles=PERCENTILES) -> dict:
+        """
+        :return: {stage: (count, mean, p..., max)} in seconds, one p column per percentile.
+        """
+        result = {}
+        for stage in self.stages():
+            histogram = self._histograms[stage]
+            result[stage] = (histogram.count, histogram.mean, *(histogram.percentile(q) for q in percentiles),
+                             histogram.max)
+        return result
+
+    def write_csv(self, file_name: str, percentiles=PERCENTILES):
+        """Write the summary in milliseconds, one row per stage"""
+        with open(file_name, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(['stage', 'count', 'mean_ms', *(f'p{q}_ms' for q in percentiles), 'max_ms'])
+            for stage, (count, *values) in self.summary(percentiles).items():
+                writer.writerow([stage, count, *(f'{value * 1e3:.3f}' for value in values)])
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+latency_probes = LatencyRegistry(enabled=bool(os.environ.get(PROBES_ENV)))
@@ -1,6 +1,7 @@
 import sys
 import os
 import time
+import logging
 from random import randrange
 
 from PyQt5 import QtWidgets as qtw
@@ -23,8 +24,20 @@ from monitor import Monitor
 from concentration_monitor import ConcentrationMonitor
 from denoising_config import DenoisingConfigWidget
 from dmc_mod import DMCMod
+from latency_panel import LatencyPanel
+from latency_probes import latency_probes
+from session_pipeline import SessionPipeline
+from session_recorder import SessionRecorder
+from playback_board import PlaybackBoard
+
+PLAYBACK_AS_FAST_AS_POSSIBLE = 'As fast as possible'
 
 class SessionMainWindow(qtw.QMainWindow):
+    # Emitted from the processing worker thread, so delivery to the slots is queued onto the GUI thread
+    frameReady = qtc.pyqtSignal()
+    classificationReady = qtc.pyqtSignal(float, float, float, float, float)
+    pipelineError = qtc.pyqtSignal(str)
+    processingError = qtc.pyqtSignal(str)
 
     def __init__(self):
         super().__init__()
@@ -33,10 +46,14 @@ class SessionMainWindow(qtw.QMainWindow):
         # Brainflow Parameters
         self.board = None
         self.board_id = 0
+        self.board_descriptor = None
         self.params = BrainFlowInputParams()
         self.board_available = False
 
+        # Seconds of data the board buffers before the pipeline starts, so the first chunk fills the sample history
         self.initial_sleep = 7
+        self.buffer_seconds = 7
+        self.monitor_seconds = 6
         # Initialize Widgets and Windows
         self.serial_connection_wdg = SerialConnectionWidget()
         self.serial_connection_wdg.form.startButton.clicked.connect(self.initialize_serial_session)
@@ -45,6 +62,7 @@ class SessionMainWindow(qtw.QMainWindow):
         self.denoising_wdg.submitted.connect(self.apply_denoising_config)
 
         self.dmc_mod_window = DMCMod()
+        self.latency_panel = LatencyPanel()
         # Initialize Monitors
         self.raw_monitor = Monitor('Session Raw Monitor')
         self.processed_monitor = Monitor('Session Processed Monitor')
@@ -56,7 +74,11 @@ class SessionMainWindow(qtw.QMainWindow):
         options_menu = menubar.addMenu('Options')
         options_menu.addAction('Serial', self.serial_connection_wdg.show)
         options_menu.addAction('Synthetic', self.initialize_synthetic_session)
+        options_menu.addAction('Playback', self.initialize_playback_session)
         options_menu.addAction('Denoising Configuration', self.denoising_wdg.show)
+        options_menu.addAction('Start Recording', self.start_recording)
+        options_menu.addAction('Stop Recording', self.stop_recording)
+        options_menu.addAction('Latency Probes', self.latency_panel.show)
 
         # TODO: Add Monitor menu
         # TODO: Add concentration menu
@@ -66,19 +88,24 @@ class SessionMainWindow(qtw.QMainWindow):
         games_menu = menubar.addMenu('Game Mods')
         games_menu.addAction('DMC5', self.dmc_mod_window.show)
 
-        self.session_timer = qtc.QTimer()
-        self.session_timer.timeout.connect(self.session_update)
+        # Acquisition and processing run on worker threads, see session_pipeline
+        self.pipeline = None
+        self.recorder = None
+        self.frameReady.connect(self.session_update)
 
-        self.is_buffers_initialized = False
-        self.data_buffer = None
-        self.processed_buffer = None
+        # Polls the board until initial_sleep seconds of data are buffered, without blocking the event loop
+        self.readiness_timer = qtc.QTimer()
+        self.readiness_timer.timeout.connect(self.check_readiness)
+        self.ready_samples = 0
+        self.classificationReady.connect(self.update_classification)
+        self.pipelineError.connect(self.show_pipeline_error)
+        self.processingError.connect(self.show_processing_error)
 
         # Denoising params
         self.denoising_method = ''
         self.denoising_decompose_level = 0
 
         # Classification params
-        self.power_2_of = 0
         self.classification_timer = qtc.QTimer()
         self.classification_timer.timeout.connect(self.concentration_classification)
 
@@ -88,173 +115,163 @@ class SessionMainWindow(qtw.QMainWindow):
         self.show()
 
     def concentration_classification(self):
-        master_board_id = int(self.board_id)
-        sampling_rate = BoardShim.get_sampling_rate(self.board_id)
-        eeg_channels = BoardShim.get_eeg_channels(master_board_id)
-        nfft = DataFilter.get_nearest_power_of_two(sampling_rate)
-
-        # Get band powers
-        tmp_buffer = self.processed_buffer.copy()
-        bp_buffer = tmp_buffer[:, -self.power_2_of:]
-        theta_sum = 0
-        alpha_sum = 0
-        beta_sum = 0
-
-        for i in range(8):
-            current_channel = eeg_channels[i]
-            # optional detrend
-            DataFilter.detrend(bp_buffer[current_channel], DetrendOperations.LINEAR.value)
-            psd = DataFilter.get_psd_welch(bp_buffer[current_channel], nfft, nfft // 2, sampling_rate,
-                                           WindowFunctions.BLACKMAN_HARRIS.value)
-
-            theta_sum += DataFilter.get_band_power(psd, 3.0, 7.0)
-            alpha_sum += DataFilter.get_band_power(psd, 8.0, 13.0)
-            beta_sum += DataFilter.get_band_power(psd, 14.0, 30.0)
+        if self.pipeline is not None:
+            self.pipeline.request_classification()
+
+    def update_classification(self, theta, alpha, beta, concentration_result, sample_time):
+        BoardShim.log_message(LogLevels.LEVEL_DEBUG.value, 'concentration: %f' % concentration_result)
 
         # Update band power monitor
-        self.concentration_monitor.bandpower_graph.update(theta_sum/8, alpha_sum/8, beta_sum/8)
-
-        # Concentration Classification
-        bands = DataFilter.get_avg_band_powers(self.processed_buffer, eeg_channels, sampling_rate, True)
-        feature_vector = np.concatenate((bands[0], bands[1]))
-        print(feature_vector)
-        # KNN, SWM, REGRESSION
-        concentration_params = BrainFlowModelParams(BrainFlowMetrics.CONCENTRATION.value, BrainFlowClassifiers.KNN.value)
-        concentration = MLModel(concentration_params)
-        concentration.prepare()
-        print(self.processed_buffer.shape)
-        concentration_result = concentration.predict(feature_vector)
-        print('Concentration: %f' % concentration_result)
-        concentration.release()
+        self.concentration_monitor.bandpower_graph.update(theta, alpha, beta)
 
         # Update Value monitor
         self.concentration_monitor.value_graph.update(concentration_result)
-        self.dmc_mod_window.current_eeg_concentration = concentration_result
-        #self.classification_buffer_initialized = False
-        # self.classification_buffer = None
-
+        self.dmc_mod_window.set_eeg_concentration(concentration_result, sample_time)
 
     def apply_denoising_config(self, wavelet, decompose):
         self.denoising_method = wavelet
         self.denoising_decompose_level = decompose
+        if self.pipeline is not None:
+            self.pipeline.set_denoising(wavelet, decompose)
 
     def session_update(self):
-        # print('session update')
-
-        # Get current data
-        current_data = self.board.get_board_data()
-
-        # Initialize/update buffer
-        if not self.is_buffers_initialized:
-            self.is_buffers_initialized = True
-            self.data_buffer = current_data
+        # Runs on the GUI thread, only plots frames the processing worker has already prepared
+        frame = self.pipeline.take_frame()
+        if frame is None:
             return
-        else:
-            self.data_buffer = self.data_buffer[:, current_data.shape[1]:]
-            self.data_buffer = np.hstack([self.data_buffer, current_data])
-
-        # board params
-        sampling_rate = BoardShim.get_sampling_rate(self.board_id)
-        eeg_channels = BoardShim.get_eeg_channels(self.board_id)
-        # Raw data monitor update
-        raw_eeg = []
-        for count, channel in enumerate(eeg_channels):
-            raw_eeg.append(current_data[channel])
-            # TODO: Add downsampling
-
-        self.raw_monitor.update_waveform(raw_eeg)
-
-        # Create psd buffer
-        # Selectable psd range size
-        psd_buffer = self.data_buffer.copy()
-        firstPowerOf2 = 1
-        nextPowerOf2 = 2
-        while nextPowerOf2 < psd_buffer.shape[1]:
-            firstPowerOf2 = nextPowerOf2
-            nextPowerOf2 = nextPowerOf2 * 2
-        psd_buffer = psd_buffer[:, -firstPowerOf2:]
-        self.power_2_of = firstPowerOf2
-
-        # Create PSD data
-        psd_data = []
-        psd_x = []
-        for count, channel in enumerate(eeg_channels):
-            channel_psd_data = DataFilter.get_psd(psd_buffer[channel], 250, WindowFunctions.BLACKMAN_HARRIS.value)
-            if count == 0:
-                psd_x = channel_psd_data[1].tolist()
-            psd_data.append(channel_psd_data[0].tolist())
 
-        # Update monitor PSD
-        self.raw_monitor.update_psd(psd_x, psd_data)
-
-        # Data processing
-        self.processed_buffer = self.data_buffer.copy()
-        if self.denoising_method == '':
-            for count, channel in enumerate(eeg_channels):
-                DataFilter.perform_rolling_filter(self.processed_buffer[channel], 3, AggOperations.MEAN.value)
-        else:
-            for count, channel in enumerate(eeg_channels):
-                DataFilter.perform_wavelet_denoising(self.processed_buffer[channel], self.denoising_method, self.denoising_decompose_level)
-
-        # Update processed monitor
-        # Update waveform monitors
-        processed_data = []
-        for count, channel in enumerate(eeg_channels):
-            processed_data.append(self.processed_buffer[channel, -current_data.shape[1]:])
-        self.processed_monitor.update_waveform(processed_data)
-
-        # Update PSD monitor
-        tmp_buffer = self.processed_buffer.copy()
-        psd_buffer = tmp_buffer[:, -firstPowerOf2:]
-
-        # Create PSD data
-        psd_data = []
-        psd_x = []
-        for count, channel in enumerate(eeg_channels):
-            channel_psd_data = DataFilter.get_psd(psd_buffer[channel], 250, WindowFunctions.BLACKMAN_HARRIS.value)
-            if count == 0:
-                psd_x = channel_psd_data[1].tolist()
-            psd_data.append(channel_psd_data[0].tolist())
+        # Update waveform monitors, the monitors decimate to their display width themselves
+        start = latency_probes.clock()
+        self.raw_monitor.update_waveform(frame.raw_waveform)
+        self.processed_monitor.update_waveform(frame.processed_waveform)
 
         # Update monitor PSD
-        self.processed_monitor.update_psd(psd_x, psd_data)
-
+        self.raw_monitor.update_psd(frame.psd_freqs, frame.raw_psd)
+        self.processed_monitor.update_psd(frame.psd_freqs, frame.processed_psd)
+        latency_probes.record_since('monitor_paint', start)
+
+    def wait_for_board(self):
+        sampling_rate = BoardShim.get_board_descriptor(self.board_id).sampling_rate
+        self.ready_samples = int(self.initial_sleep * sampling_rate)
+        if isinstance(self.board, PlaybackBoard) and self.board.speed is None:
+            # As fast as possible playback buffers nothing, it releases a chunk on every read
+            self.ready_samples = self.board.get_board_data_count()
+        self.board_available = True
+        BoardShim.log_message(LogLevels.LEVEL_INFO.value, 'waiting for %d samples' % self.ready_samples)
+        self.readiness_timer.start(100)
+
+    def check_readiness(self):
+        if self.board.get_board_data_count() >= self.ready_samples:
+            self.readiness_timer.stop()
+            self.start_pipeline()
+
+    def start_pipeline(self):
+        self.board_descriptor = BoardShim.get_board_descriptor(self.board_id)
+        num_channels = len(self.board_descriptor.eeg_channels)
+        window_samples = int(self.monitor_seconds * self.board_descriptor.sampling_rate)
+        self.raw_monitor.set_channels(num_channels, window_samples)
+        self.processed_monitor.set_channels(num_channels, window_samples)
+
+        self.pipeline = SessionPipeline(self.board, self.board_id,
+                                        on_frame=self.frameReady.emit,
+                                        on_classification=self.classificationReady.emit,
+                                        buffer_seconds=self.buffer_seconds,
+                                        on_error=self.pipelineError.emit,
+                                        on_processing_error=self.processingError.emit)
+        self.pipeline.set_denoising(self.denoising_method, self.denoising_decompose_level)
+        self.pipeline.start()
+
+    def show_pipeline_error(self, message):
+        # Only classifier failures end up here, the worker disables classification after them, there is no point in
+        # requesting it any more
+        if self.pipeline is not None and not self.pipeline.processing.classification_enabled:
+            self.classification_timer.stop()
+        qtw.QMessageBox.warning(self, 'Session', message)
+
+    def show_processing_error(self, message):
+        # Reported once per distinct error and cleared with an empty message, so it does not need a modal dialog
+        self.statusBar().showMessage(message)
+
+    def start_recording(self):
+        if self.pipeline is None or self.recorder is not None:
+            return
+        file_name, _ = qtw.QFileDialog.getSaveFileName(self, 'Record Session', '', 'Session Recordings (*.adsrec)')
+        if not file_name:
+            return
+        self.recorder = SessionRecorder(file_name, self.board_descriptor.num_rows,
+                                        self.board_descriptor.sampling_rate, self.board_id, dtype=np.float64,
+                                        timestamp_channel=self.board_descriptor.timestamp_channel)
+        self.recorder.start()
+        self.pipeline.set_recorder(self.recorder)
+
+    def stop_recording(self):
+        if self.recorder is None:
+            return
+        self.pipeline.set_recorder(None)
+        self.recorder.stop()
+        self.recorder = None
 
     def initialize_serial_session(self):
-        print('start serial session')
+        BoardShim.log_message(LogLevels.LEVEL_INFO.value, 'start serial session')
         self.board_id = int(self.serial_connection_wdg.form.idInput.text())
         self.params.serial_port = self.serial_connection_wdg.form.serialPortInput.text()
         self.board = BoardShim(self.board_id, self.params)
         self.board.prepare_session()
         self.board.start_stream()
-        BoardShim.log_message(LogLevels.LEVEL_INFO.value, 'start sleeping in the main thread')
-        time.sleep(7)
-        self.board_available = True
-        self.session_timer.start(40)
+        self.wait_for_board()
         self.serial_connection_wdg.close()
 
     def initialize_synthetic_session(self):
-        print('start synthetic session')
+        BoardShim.log_message(LogLevels.LEVEL_INFO.value, 'start synthetic session')
         self.board_id = BoardIds.SYNTHETIC_BOARD.value
         self.board = BoardShim(self.board_id, self.params)
         self.board.prepare_session()
         self.board.start_stream()
-        BoardShim.log_message(LogLevels.LEVEL_INFO.value, 'start sleeping in the main thread')
-        time.sleep(self.initial_sleep)
-        self.board_available = True
-        self.session_timer.start(40)
+        self.wait_for_board()
+
+    def initialize_playback_session(self):
+        file_name, _ = qtw.QFileDialog.getOpenFileName(self, 'Playback Session', '', 'Session Recordings (*.adsrec)')
+        if not file_name:
+            return
+        # Editable, any speed between 0.1 and 100 can be typed in
+        speeds = ['1.0', '2.0', '5.0', '10.0', '100.0', PLAYBACK_AS_FAST_AS_POSSIBLE]
+        item, accepted = qtw.QInputDialog.getItem(self, 'Playback Session', 'Speed (x real time)', speeds, 0, True)
+        if not accepted:
+            return
+        if item == PLAYBACK_AS_FAST_AS_POSSIBLE:
+            speed = None
+        else:
+            try:
+                speed = float(item)
+            except ValueError:
+                speed = 0
+            if not 0.1 <= speed <= 100:
+                qtw.QMessageBox.warning(self, 'Playback Session', 'Speed must be between 0.1 and 100')
+                return
+        BoardShim.log_message(LogLevels.LEVEL_INFO.value, 'start playback session')
+        self.board = PlaybackBoard(file_name, speed)
+        self.board.prepare_session()
+        self.board_id = self.board.board_id
+        self.board.start_stream()
+        self.wait_for_board()
 
     def closeEvent(self, event):
 
+        self.readiness_timer.stop()
         if self.board_available:
-            self.session_timer.stop()
-            time.sleep(1)
+            self.classification_timer.stop()
+            if self.pipeline is not None:
+                self.pipeline.stop()
+                BoardShim.log_message(LogLevels.LEVEL_INFO.value,
+                                      'acquisition stats: %s' % self.pipeline.acquisition_stats())
+            self.stop_recording()
             self.board.stop_stream()
             self.board.release_session()
         qtw.QApplication.closeAllWindows()
 
 def main():
     BoardShim.enable_dev_board_logger()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
     if sys.platform == 'darwin':
         os.environ['QT_EVENT_DISPATCHER_CORE_FOUNDATION'] = '1'
 
@@ -1,14 +1,26 @@
 import sys
+import math
 import time
 from PyQt5 import QtWidgets as qtw
 from PyQt5 import QtGui as qtg
 from PyQt5 import QtCore as qtc
 import pyqtgraph as qtgr
+import numpy as np
+
+from decimation import minmax_decimate
+from ring_buffer import RingBuffer
+
+
+CHANNEL_PENS = ['c', 'm', 'g', 'r', 'b', 'w', 'y', (135, 100, 35)]
+
+
+def channel_pen(index):
+    return CHANNEL_PENS[index % len(CHANNEL_PENS)]
 
 
 class Monitor(qtgr.GraphicsWindow):
 
-    def __init__(self, title):
+    def __init__(self, title, display_points=1200):
         super().__init__(title)
 
         qtgr.setConfigOptions(antialias=True)
@@ -16,9 +28,6 @@ class Monitor(qtgr.GraphicsWindow):
         # qtgr.setConfigOption('foreground', 'w')
         qtgr.setConfigOption('useOpenGL', True)
 
-        self.traces = dict()
-        self.psd_traces = dict()
-
         proxy = qtw.QGraphicsProxyWidget()
         self.resize(1200, 900)
 
@@ -26,135 +35,102 @@ class Monitor(qtgr.GraphicsWindow):
         self.is_running = False
 
         # Waveform plot parameters
-        xrange = 1500
-
-        self.x = list(range(0, xrange))
-        self.ch1data = [0] * xrange
-        self.ch2data = [0] * xrange
-        self.ch3data = [0] * xrange
-        self.ch4data = [0] * xrange
-        self.ch5data = [0] * xrange
-        self.ch6data = [0] * xrange
-        self.ch7data = [0] * xrange
-        self.ch8data = [0] * xrange
-
-        self.graph_ch1 = self.addPlot(title='Channel1', row=1, col=1)
-        self.graph_ch2 = self.addPlot(title='Channel2', row=2, col=1)
-        self.graph_ch3 = self.addPlot(title='Channel3', row=3, col=1)
-        self.graph_ch4 = self.addPlot(title='Channel4', row=4, col=1)
-        self.graph_ch5 = self.addPlot(title='Channel5', row=5, col=1)
-        self.graph_ch6 = self.addPlot(title='Channel6', row=1, col=2)
-        self.graph_ch7 = self.addPlot(title='Channel7', row=2, col=2)
-        self.graph_ch8 = self.addPlot(title='Channel8', row=3, col=2)
+        # Windows longer than 2 * display_points samples are min/max decimated to display_points bins
+        self.display_points = display_points
+
+        self.set_channels(8)
+
+    def set_channels(self, num_channels, window_samples=1500):
+        """
+        Rebuild the plot grid for num_channels waveforms, e.g. len(BoardShim.get_board_descriptor(board_id).eeg_channels).
+
+        :param window_samples: Number of samples shown in each waveform plot.
+        """
+        self.clear()
+
+        # Traces are cached per channel index, plot lookup is a list index
+        self.graphs = []
+        self.traces = [None] * num_channels
+        self.psd_traces = [None] * num_channels
+
+        self.xrange = window_samples
+        self.reset_waveforms()
+
+        # Channels fill the grid column by column, the PSD plot takes the two cells after the last channel
+        rows = max(5, math.ceil(math.sqrt(num_channels + 2)))
+        for i in range(num_channels):
+            self.graphs.append(self.addPlot(title='Channel%d' % (i + 1), row=i % rows + 1, col=i // rows + 1))
 
         # PSD parameters
-        self.graph_psd = self.addPlot(title='PSD', row=4, col=2, colspan=1, rowspan=2)
+        psd_row = num_channels % rows
+        self.graph_psd = self.addPlot(title='PSD', row=psd_row + 1, col=num_channels // rows + 1, colspan=1,
+                                      rowspan=min(2, rows - psd_row))
         self.graph_psd.setRange(yRange=[0, 5])
 
+    def set_display_points(self, display_points):
+        self.display_points = display_points
+        self.reset_waveforms()
+
+    def reset_waveforms(self):
+        num_channels = len(self.traces)
+        if self.xrange <= 2 * self.display_points:
+            self.bin_size = 1
+        else:
+            self.bin_size = math.ceil(self.xrange / self.display_points)
+        self.num_bins = self.xrange // self.bin_size
+
+        # One array for all waveforms, x stays fixed and the curves are shifted instead. One extra bin of capacity
+        # lets the decimation bins stay aligned to absolute sample positions
+        capacity = self.xrange + self.bin_size
+        self.waveform_buffer = RingBuffer(num_channels, capacity)
+        self.waveform_buffer.append(np.zeros((num_channels, capacity)))
+        if self.bin_size == 1:
+            self.x = np.arange(self.xrange)
+            self.decimated = None
+        else:
+            self.x = np.repeat(np.arange(self.num_bins) * self.bin_size, 2)
+            self.decimated = np.empty((num_channels, 2 * self.num_bins))
 
     def start(self):
         self.is_running = True
         if (sys.flags.interactive != 1) or not hasattr(qtc, 'PYQT_VERSION'):
             qtg.QApplication.instance().exec_()
 
-    def set_waveform_plot(self, name, data_x, data_y):
-        if name in self.traces:
-            self.traces[name].setData(data_x, data_y)
-        else:
-            if name == 'Channel1':
-                self.traces[name] = self.graph_ch1.plot(pen='c', width=1)
-            if name == 'Channel2':
-                self.traces[name] = self.graph_ch2.plot(pen='m', width=1)
-            if name == 'Channel3':
-                self.traces[name] = self.graph_ch3.plot(pen='g', width=1)
-            if name == 'Channel4':
-                self.traces[name] = self.graph_ch4.plot(pen='r', width=1)
-            if name == 'Channel5':
-                self.traces[name] = self.graph_ch5.plot(pen='b', width=1)
-            if name == 'Channel6':
-                self.traces[name] = self.graph_ch6.plot(pen='w', width=1)
-            if name == 'Channel7':
-                self.traces[name] = self.graph_ch7.plot(pen='y', width=1)
-            if name == 'Channel8':
-                self.traces[name] = self.graph_ch8.plot(pen=qtgr.mkPen(color=(135, 100, 35)), width=1)
-
+    def set_waveform_plot(self, index, data_x, data_y):
+        if self.traces[index] is None:
+            self.traces[index] = self.graphs[index].plot(pen=channel_pen(index), width=1)
+        self.traces[index].setData(data_x, data_y)
 
     def update_waveform(self, stream_data):
-        #TODO: update plots
-        data_size = len(stream_data[0])
-
-        # update x data
-        xadd = list(range(self.x[-1], self.x[-1]+data_size))
-        self.x = self.x[data_size:]
-        self.x.extend(xadd)
-
-        # update channel 1
-        self.ch1data.extend(stream_data[0])
-        self.ch1data = self.ch1data[data_size:]
-        self.set_waveform_plot(name="Channel1", data_x=self.x, data_y=self.ch1data)
-
-        # update channel 2
-        self.ch2data.extend(stream_data[1])
-        self.ch2data = self.ch2data[data_size:]
-        self.set_waveform_plot(name="Channel2", data_x=self.x, data_y=self.ch2data)
-
-        # update channel 3
-        self.ch3data.extend(stream_data[2])
-        self.ch3data = self.ch3data[data_size:]
-        self.set_waveform_plot(name="Channel3", data_x=self.x, data_y=self.ch3data)
-
-        # update channel 4
-        self.ch4data.extend(stream_data[3])
-        self.ch4data = self.ch4data[data_size:]
-        self.set_waveform_plot(name="Channel4", data_x=self.x, data_y=self.ch4data)
-
-        # update channel 5
-        self.ch5data.extend(stream_data[4])
-        self.ch5data = self.ch5data[data_size:]
-        self.set_waveform_plot(name="Channel5", data_x=self.x, data_y=self.ch5data)
-
-        # update channel 6
-        self.ch6data.extend(stream_data[5])
-        self.ch6data = self.ch6data[data_size:]
-        self.set_waveform_plot(name="Channel6", data_x=self.x, data_y=self.ch6data)
-
-        # update channel 7
-        self.ch7data.extend(stream_data[6])
-        self.ch7data = self.ch7data[data_size:]
-        self.set_waveform_plot(name="Channel7", data_x=self.x, data_y=self.ch7data)
-
-        # update channel 8
-        self.ch8data.extend(stream_data[7])
-        self.ch8data = self.ch8data[data_size:]
-        self.set_waveform_plot(name="Channel8", data_x=self.x, data_y=self.ch8data)
-
-    def set_psd_plot(self, name, data_x, data_y):
-        if name in self.psd_traces:
-            self.psd_traces[name].setData(data_x, data_y)
+        self.waveform_buffer.append(np.asarray(stream_data))
+        # Keep buffering while hidden so the plots are complete when shown again, but skip decimation and repaints
+        if not self.isVisible():
+            return
+
+        total = self.waveform_buffer.total_written
+        if self.bin_size == 1:
+            start = total - self.xrange
+            waveforms = self.waveform_buffer.latest(self.xrange)
         else:
-            if name == 'Channel1':
-                self.psd_traces[name] = self.graph_psd.plot(pen='c', width=1)
-            if name == 'Channel2':
-                self.psd_traces[name] = self.graph_psd.plot(pen='m', width=1)
-            if name == 'Channel3':
-                self.psd_traces[name] = self.graph_psd.plot(pen='g', width=1)
-            if name == 'Channel4':
-                self.psd_traces[name] = self.graph_psd.plot(pen='r', width=1)
-            if name == 'Channel5':
-                self.psd_traces[name] = self.graph_psd.plot(pen='b', width=1)
-            if name == 'Channel6':
-                self.psd_traces[name] = self.graph_psd.plot(pen='w', width=1)
-            if name == 'Channel7':
-                self.psd_traces[name] = self.graph_psd.plot(pen='y', width=1)
-            if name == 'Channel8':
-                self.psd_traces[name] = self.graph_psd.plot(pen=qtgr.mkPen(color=(135, 100, 35)), width=1)
+            # Bins are aligned to absolute sample positions so the envelope does not shimmer while scrolling
+            end = total - total % self.bin_size
+            start = end - self.num_bins * self.bin_size
+            waveforms = minmax_decimate(self.waveform_buffer.latest(total - start)[:, :end - start], self.bin_size,
+                                        self.decimated)
+
+        # x of the oldest displayed sample, the x axis scrolls with the number of received samples
+        x_offset = start - self.waveform_buffer.capacity
+        for index in range(len(self.traces)):
+            self.set_waveform_plot(index, data_x=self.x, data_y=waveforms[index])
+            self.traces[index].setPos(x_offset, 0)
+
+    def set_psd_plot(self, index, data_x, data_y):
+        if self.psd_traces[index] is None:
+            self.psd_traces[index] = self.graph_psd.plot(pen=channel_pen(index), width=1)
+        self.psd_traces[index].setData(data_x, data_y)
 
     def update_psd(self, x_data, y_data):
-        self.set_psd_plot(name="Channel1", data_x=x_data, data_y=y_data[0])
-        self.set_psd_plot(name="Channel2", data_x=x_data, data_y=y_data[1])
-        self.set_psd_plot(name="Channel3", data_x=x_data, data_y=y_data[2])
-        self.set_psd_plot(name="Channel4", data_x=x_data, data_y=y_data[3])
-        self.set_psd_plot(name="Channel5", data_x=x_data, data_y=y_data[4])
-        self.set_psd_plot(name="Channel6", data_x=x_data, data_y=y_data[5])
-        self.set_psd_plot(name="Channel7", data_x=x_data, data_y=y_data[6])
-        self.set_psd_plot(name="Channel8", data_x=x_data, data_y=y_data[7])
\ No newline at end of file
+        if not self.isVisible():
+            return
+        for index in range(len(self.psd_traces)):
+            self.set_psd_plot(index, data_x=x_data, data_y=y_data[index])
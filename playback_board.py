@@ -0,0 +1,169 @@
+"""
+Python side playback of recorded sessions with the BoardShim streaming interface used by SessionPipeline.
+
+Unlike BoardIds.PLAYBACK_FILE_BOARD this needs no native library and is not bound to real time:
+
+* speed=1.0 releases samples at the recorded sampling rate;
+* speed=N releases them N times faster;
+* speed=None releases chunk_size samples on every get_board_data call, as fast as the consumer polls.
+
+Like the native playback board, released samples get new timestamps by default: the timestamp channel holds the wall
+clock time at which a sample is released rather than the time it was recorded at. Recordings store their timestamp
+row; for CSV files and version 1 recordings it is looked up from the board descriptor, and samples keep their recorded
+timestamps if the native board library is not available for that.
+"""
+import time
+
+import numpy as np
+
+from brainflow.board_shim import BoardShim, BrainFlowError
+from brainflow.data_filter import DataFilter
+from brainflow.exit_codes import BrainflowExitCodes
+
+from session_recorder import SessionRecording
+
+
+class PlaybackBoard:
+    """
+    :param file_name: SessionRecorder recording or a DataFilter.write_file CSV.
+    :param speed: Playback speed relative to real time, None for as fast as possible.
+    :param board_id: Board id of the recorded board, required for CSV files, recordings store their own.
+    :param chunk_size: Samples per get_board_data call when speed is None, one second of data by default.
+    :param loop: Restart from the beginning once the end of the file is reached.
+    :param new_timestamps: Replace recorded timestamps with release times.
+    """
+
+    def __init__(self, file_name: str, speed: float = 1.0, board_id: int = None, chunk_size: int = None,
+                 loop: bool = False, new_timestamps: bool = True):
+        self.file_name = file_name
+        self.speed = speed
+        self.board_id = board_id
+        self.chunk_size = chunk_size
+        self.loop = loop
+        self.new_timestamps = new_timestamps
+        self.timestamp_channel = None
+        self.sampling_rate = None
+        self.data = None
+        self.position = 0
+        self._start_time = None
+        self._start_wall_time = None
+        self._start_position = 0
+
+    def prepare_session(self):
+        if self.file_name.endswith('.csv'):
+            if self.board_id is None:
+                raise BrainFlowError('board id is required to play back csv files',
+                                     BrainflowExitCodes.INVALID_ARGUMENTS_ERROR.value)
+            self.data = DataFilter.read_file(self.file_name)
+            self.sampling_rate = BoardShim.get_board_descriptor(self.board_id).sampling_rate
+        else:
+            recording = SessionRecording(self.file_name)
+            self.data = recording.data
+            self.sampling_rate = int(recording.sampling_rate)
+            self.timestamp_channel = recording.timestamp_channel
+            if self.board_id is None:
+                self.board_id = recording.board_id
+        if self.chunk_size is None:
+            self.chunk_size = self.sampling_rate
+        if not self.new_timestamps:
+            self.timestamp_channel = None
+        elif self.timestamp_channel is None:
+            try:
+                self.timestamp_channel = BoardShim.get_board_descriptor(self.board_id).timestamp_channel
+            except OSError:
+                # No board library to look the row up in, samples keep their recorded timestamps
+                self.timestamp_channel = None
+
+    def is_prepared(self) -> bool:
+        return self.data is not None
+
+    def release_session(self):
+        self.data = None
+        self._start_time = None
+
+    def start_stream(self):
+        if self.data is None:
+            raise BrainFlowError('playback session is not prepared', BrainflowExitCodes.BOARD_NOT_CREATED_ERROR.value)
+        self._start_time = time.perf_counter()
+        self._start_wall_time = time.time()
+        self._start_position = self.position
+
+    def stop_stream(self):
+        if self._start_time is None:
+            raise BrainFlowError('playback stream is not started',
+                                 BrainflowExitCodes.STREAM_THREAD_IS_NOT_RUNNING.value)
+        self._start_time = None
+
+    @property
+    def num_samples(self) -> int:
+        return self.data.shape[1]
+
+    @property
+    def finished(self) -> bool:
+        return not self.loop and self.position >= self.num_samples
+
+    def _target_position(self) -> int:
+        if self._start_time is None:
+            return self.position
+        if self.speed is None:
+            target = self.position + self.chunk_size
+        else:
+            elapsed = time.perf_counter() - self._start_time
+            target = self._start_position + int(elapsed * self.sampling_rate * self.speed)
+        return target if self.loop else min(target, self.num_samples)
+
+    def _restamp(self, chunk: np.ndarray, first: int):
+        """Overwrite the timestamps of chunk, whose first column is sample number first, with release times"""
+        if self.timestamp_channel is None or chunk.shape[1] == 0:
+            return
+        if self.speed is None or self._start_wall_time is None:
+            chunk[self.timestamp_channel] = time.time()
+        else:
+            positions = np.arange(first - self._start_position, first - self._start_position + chunk.shape[1])
+            chunk[self.timestamp_channel] = self._start_wall_time + positions / (self.sampling_rate * self.speed)
+
+    def get_board_data_count(self) -> int:
+        """Number of samples get_board_data would return now"""
+        return self._target_position() - self.position
+
+    def get_board_data(self) -> np.ndarray:
+        """Consume and return all samples released since the last call, (rows x n) float64 like BoardShim"""
+        target = self._target_position()
+        indices = np.arange(self.position, target) % self.num_samples if self.loop else slice(self.position, target)
+        chunk = np.array(self.data[:, indices], dtype=np.float64)
+        self._restamp(chunk, self.position)
+        self.position = target
+        return chunk
+
+    def read_into(self, buffer: np.ndarray, offset: int = 0) -> int:
+        """
+        Consume released samples into buffer[:, offset:], at most as many as fit.
+
+        :return: Number of samples written.
+        """
+        count = min(self._target_position(), self.position + buffer.shape[1] - offset) - self.position
+        if count <= 0:
+            return 0
+        if self.loop:
+            count = min(count, self.num_samples)
+            first = min(count, self.num_samples - self.position % self.num_samples)
+            start = self.position % self.num_samples
+            buffer[:, offset:offset + first] = self.data[:, start:start + first]
+            buffer[:, offset + first:offset + count] = self.data[:, :count - first]
+        else:
+            buffer[:, offset:offset + count] = self.data[:, self.position:self.position + count]
+        self._restamp(buffer[:, offset:offset + count], self.position)
+        self.position += count
+        return count
+
+    def get_current_board_data(self, num_samples: int) -> np.ndarray:
+        """Latest num_samples released samples, without consuming them"""
+        # As fast as possible playback releases a chunk only when get_board_data or read_into consumes it
+        end = self.position if self.speed is None else self._target_position()
+        start = max(end - num_samples, 0)
+        if self.loop:
+            chunk = np.array(self.data[:, np.arange(start, end) % self.num_samples], dtype=np.float64)
+        else:
+            chunk = np.array(self.data[:, start:end], dtype=np.float64)
+        self._restamp(chunk, start)
+        return chunk
@@ -0,0 +1,121 @@
+"""
+Batched PSD for (channels x samples) arrays.
+
+PsdEngine produces the same values as DataFilter.get_psd, one-sided PSD scaled by 1 / (sampling_rate * N) with every
+bin except DC and Nyquist doubled, but computes all channels with a single NumPy rfft instead of one ctypes call and
+one FFT per channel. StreamingWelch scales its segment periodograms the same way.
+"""
+from collections import deque
+
+import numpy as np
+
+from brainflow.data_filter import WindowFunctions
+from brainflow.numpy_data_handler import get_psd_freqs, get_window, linear_detrend, nearest_power_of_two, scale_psd
+
+from ring_buffer import RingBuffer
+
+
+class PsdEngine:
+    """
+    Vectorized replacement for per-channel DataFilter.get_psd loops.
+
+    :param sampling_rate: Sampling rate of the input data.
+    :param window_function: int value from WindowFunctions enum.
+    """
+
+    def __init__(self, sampling_rate: int, window_function: int = WindowFunctions.BLACKMAN_HARRIS.value):
+        self.sampling_rate = sampling_rate
+        self.window_function = window_function
+
+    def psd(self, data: np.ndarray):
+        """
+        Calculate the PSD of every row of data.
+
+        :param data: (channels x samples) array.
+
+        :return: (channels x samples // 2 + 1) amplitudes and the matching frequency array, both plottable as-is.
+        """
+        length = data.shape[1]
+        spectrum = np.fft.rfft(data * get_window(self.window_function, length), axis=1)
+        ampls = spectrum.real ** 2 + spectrum.imag ** 2
+        return scale_psd(ampls, length, self.sampling_rate), get_psd_freqs(length, self.sampling_rate)
+
+
+class StreamingWelch:
+    """
+    Welch PSD of the latest window of a RingBuffer that reuses the periodograms of segments seen by earlier calls.
+
+    Segments start at absolute sample positions (RingBuffer.total_written) that are multiples of the step
+    nfft - overlap, so consecutive calls share every segment except the newly completed ones. Each segment is linearly
+    detrended on its own, which keeps its periodogram independent of the rest of the window. For a window starting at
+    a multiple of the step the result equals the Welch PSD of that window with per segment detrending.
+
+    :param sampling_rate: Sampling rate of the input data.
+    :param nfft: Segment length.
+    :param overlap: Overlap of consecutive segments, between 0 and nfft.
+    :param window_length: Number of most recent samples averaged over.
+    :param window_function: int value from WindowFunctions enum.
+    """
+
+    def __init__(self, sampling_rate: int, nfft: int, overlap: int, window_length: int,
+                 window_function: int = WindowFunctions.BLACKMAN_HARRIS.value):
+        self.sampling_rate = sampling_rate
+        self.nfft = nfft
+        self.step = nfft - overlap
+        self.window_length = window_length
+        self.window_function = window_function
+        # Number of segment periodograms computed so far
+        self.computed = 0
+        # (absolute start, channels x bins periodogram) of final segments, oldest first
+        self._segments = deque()
+        self._generation = None
+
+    def reset(self):
+        self._segments.clear()
+
+    def update(self, buffer: RingBuffer, provisional: int = 0, generation=None):
+        """
+        Calculate the Welch PSD of the latest window_length samples of buffer.
+
+        :param buffer: Sample window, every row is one channel.
+        :param provisional: Number of most recent samples that may still be rewritten, segments touching them are
+            recomputed on every call instead of cached.
+        :param generation: Any value that changes whenever older samples of buffer were rewritten, drops the cache.
+
+        :return: (channels x nfft // 2 + 1) amplitudes and the matching frequency array.
+        """
+        if generation != self._generation:
+            self.reset()
+            self._generation = generation
+        total = buffer.total_written
+        oldest = total - min(len(buffer), self.window_length)
+        first = -(-oldest // self.step) * self.step
+        starts = range(first, total - self.nfft + 1, self.step)
+        if len(starts) == 0:
+            raise ValueError(f'window holds less than {self.nfft} samples')
+
+        while self._segments and self._segments[0][0] < first:
+            self._segments.popleft()
+        if self._segments and self._segments[-1][0] + self.nfft > total:
+            # The buffer was rewound past cached segments
+            self.reset()
+
+        next_start = self._segments[-1][0] + self.step if self._segments else first
+        ampls = sum(periodogram for _, periodogram in self._segments)
+        num_fresh = len(range(next_start, starts[-1] + 1, self.step))
+        if num_fresh:
+            data = buffer.latest(total - next_start)
+            segments = np.lib.stride_tricks.sliding_window_view(data, self.nfft, axis=1)[:, ::self.step][:, :num_fresh]
+            periodograms = self._periodograms(segments)
+            self.computed += num_fresh
+            ampls = ampls + periodograms.sum(axis=1)
+            for i in range(num_fresh):
+                start = next_start + i * self.step
+                if start + self.nfft > total - provisional:
+                    break
+                self._segments.append((start, periodograms[:, i].copy()))
+        return ampls / len(starts), get_psd_freqs(self.nfft, self.sampling_rate)
+
+    def _periodograms(self, segments: np.ndarray) -> np.ndarray:
+        spectrum = np.fft.rfft(linear_detrend(segments) * get_window(self.window_function, self.nfft), axis=-1)
+        return scale_psd(spectrum.real ** 2 + spectrum.imag ** 2, self.nfft, self.sampling_rate)
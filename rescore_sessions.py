@@ -0,0 +1,192 @@
+"""
+Headless re-scoring of recorded sessions.
+
+Runs the processing of the live session on every recording of a directory: the eeg rows are streamed through a
+StreamingDenoiser hop by hop, every window goes through StreamingWelch and BandPowerExtractor and its feature vector is
+scored with ConcentrationClassifier.predict. Recordings are spread across a process pool, every worker process loads
+the classifier once and memory maps its recordings, so only file names cross process boundaries.
+
+Results are written per session as columns (sample, time, timestamp, theta, alpha, beta, concentration) to an .npz
+archive or a CSV file.
+
+Example: python rescore_sessions.py recordings --window 7 --hop 1 --wavelet db4 --level 3 --jobs 8
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from brainflow.board_shim import BoardShim
+from brainflow.data_filter import DataFilter
+from brainflow.ml_model import BrainFlowClassifiers
+
+from band_power_features import BandPowerExtractor
+from classifier_service import ConcentrationClassifier
+from ring_buffer import RingBuffer
+from session_recorder import SessionRecording
+from streaming_denoiser import StreamingDenoiser
+
+COLUMNS = ('sample', 'time', 'timestamp', 'theta', 'alpha', 'beta', 'concentration')
+
+# Per worker process state, set up once by init_worker
+_classifier = None
+
+
+def score_recording(recording: SessionRecording, classifier: ConcentrationClassifier, window_seconds: float = 7,
+                    hop_seconds: float = 1, wavelet: str = '', decomposition_level: int = 0,
+                    eeg_channels=None) -> dict:
+    """
+    Concentration time series of one recording.
+
+    :param window_seconds: Length of the classified window, like SessionMainWindow.buffer_seconds.
+    :param hop_seconds: Distance between the ends of consecutive windows, like the classification interval.
+    :param wavelet: Denoising wavelet, empty string for the rolling mean filter.
+    :param eeg_channels: Rows of the recording to use, looked up from its board id by default.
+
+    :return: Dict of equally long column arrays, see COLUMNS.
+    """
+    sampling_rate = int(recording.sampling_rate)
+    if eeg_channels is None:
+        eeg_channels = list(BoardShim.get_board_descriptor(recording.board_id).eeg_channels)
+    window = int(window_seconds * sampling_rate)
+    hop = int(hop_seconds * sampling_rate)
+    if window < 1 or hop < 1:
+        raise ValueError(f'window and hop are {window} and {hop} samples at {sampling_rate} Hz, '
+                         f'both must be at least 1')
+
+    raw_buffer = RingBuffer(len(eeg_channels), window)
+    denoiser = StreamingDenoiser(range(len(eeg_channels)), window)
+    denoiser.configure(wavelet, decomposition_level)
+    extractor = BandPowerExtractor(sampling_rate)
+    welch = extractor.streaming_welch(window)
+
+    ends = np.arange(window, recording.num_samples + 1, hop)
+    monitor_band_powers = np.empty((len(ends), 3))
+    features = np.empty((len(ends), 10))
+    position = 0
+    for i, end in enumerate(ends):
+        chunk = recording.get_data(position, end, eeg_channels)
+        raw_buffer.append(chunk)
+        denoiser.update(raw_buffer, chunk.shape[1])
+        position = end
+
+        ampls, freqs = welch.update(denoiser.buffer, denoiser.provisional, denoiser.generation)
+        window_features = extractor.extract_psd(ampls, freqs, denoiser.buffer.latest())
+        monitor_band_powers[i] = window_features.monitor_band_powers
+        features[i] = window_features.feature_vector
+
+    concentration = np.array([classifier.predict(feature_vector) for feature_vector in features])
+    if len(recording.index):
+        timestamps = np.interp(ends, recording.index['sample'], recording.index['timestamp'])
+    else:
+        timestamps = recording.start_time + ends / sampling_rate
+    return {
+        'sample': ends,
+        'time': ends / sampling_rate,
+        'timestamp': timestamps,
+        'theta': monitor_band_powers[:, 0],
+        'alpha': monitor_band_powers[:, 1],
+        'beta': monitor_band_powers[:, 2],
+        'concentration': concentration
+    }
+
+
+def write_columns(file_name: str, columns: dict, output_format: str):
+    if output_format == 'npz':
+        np.savez(file_name, **columns)
+    else:
+        table = np.column_stack([columns[name] for name in COLUMNS])
+        np.savetxt(file_name, table, delimiter=',', header=','.join(COLUMNS), comments='', fmt='%.10g')
+
+
+def init_worker(classifier: int, model_file: str, classifier_backend: str, data_filter_backend: str):
+    global _classifier
+    if data_filter_backend:
+        DataFilter.set_backend(data_filter_backend)
+    _classifier = ConcentrationClassifier(classifier, model_file=model_file, backend=classifier_backend)
+    _classifier.prepare()
+
+
+def rescore_file(file_name: str, output_dir: str, output_format: str, **options):
+    """Worker task, returns (file_name, number of windows, seconds spent)"""
+    start = time.perf_counter()
+    recording = SessionRecording(file_name)
+    columns = score_recording(recording, _classifier, **options)
+    stem = os.path.splitext(os.path.basename(file_name))[0]
+    write_columns(os.path.join(output_dir, f'{stem}.scores.{output_format}'), columns, output_format)
+    return file_name, len(columns['sample']), time.perf_counter() - start
+
+
+def positive(value_type):
+    """argparse type accepting values of value_type greater than 0"""
+    def parse(text: str):
+        value = value_type(text)
+        if value <= 0:
+            raise argparse.ArgumentTypeError(f'{text} is not greater than 0')
+        return value
+    parse.__name__ = value_type.__name__
+    return parse
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description='Re-score recorded sessions without the GUI')
+    parser.add_argument('recordings', help='directory of SessionRecorder recordings')
+    parser.add_argument('--pattern', default='*.adsrec', help='recording file name pattern')
+    parser.add_argument('--output-dir', help='directory for the results, defaults to the recordings directory')
+    parser.add_argument('--format', dest='output_format', choices=('npz', 'csv'), default='npz')
+    parser.add_argument('--window', type=positive(float), default=7, help='classified window length in seconds')
+    parser.add_argument('--hop', type=positive(float), default=1, help='seconds between consecutive windows')
+    parser.add_argument('--wavelet', default='', help='denoising wavelet, rolling mean filter if empty')
+    parser.add_argument('--level', type=int, default=0, help='wavelet decomposition level')
+    parser.add_argument('--eeg-channels', help='comma separated eeg rows, looked up from the board id by default')
+    parser.add_argument('--classifier', choices=[c.name for c in BrainFlowClassifiers], default='KNN')
+    parser.add_argument('--model-file', default='', help='model file of the classifier')
+    parser.add_argument('--classifier-backend', choices=('auto', 'native', 'numpy'), default='auto')
+    parser.add_argument('--data-filter-backend', help='DataFilter backend, see DataFilter.set_backend')
+    parser.add_argument('--jobs', type=positive(int), default=os.cpu_count(), help='number of worker processes')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    files = sorted(glob.glob(os.path.join(args.recordings, args.pattern)))
+    output_dir = args.output_dir or args.recordings
+    os.makedirs(output_dir, exist_ok=True)
+    eeg_channels = [int(row) for row in args.eeg_channels.split(',')] if args.eeg_channels else None
+    options = dict(window_seconds=args.window, hop_seconds=args.hop, wavelet=args.wavelet,
+                   decomposition_level=args.level, eeg_channels=eeg_channels)
+    initargs = (BrainFlowClassifiers[args.classifier].value, args.model_file, args.classifier_backend,
+                args.data_filter_backend)
+
+    # Every worker prepares the classifier when it starts, a missing library or model would fail all of them with
+    # BrokenProcessPool, so check it once here
+    try:
+        with ConcentrationClassifier(initargs[0], model_file=args.model_file, backend=args.classifier_backend):
+            pass
+    except Exception as e:
+        print(f'cannot prepare the {args.classifier} classifier: {e}', file=sys.stderr)
+        return 2
+
+    start = time.perf_counter()
+    failures = 0
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=init_worker, initargs=initargs) as executor:
+        futures = {executor.submit(rescore_file, file_name, output_dir, args.output_format, **options): file_name
+                   for file_name in files}
+        for future in as_completed(futures):
+            try:
+                file_name, num_windows, seconds = future.result()
+            except Exception as e:
+                failures += 1
+                print(f'{futures[future]} failed: {e!r}', file=sys.stderr)
+                continue
+            print(f'{file_name}: {num_windows} windows in {seconds:.2f} s')
+    print(f'{len(files) - failures}/{len(files)} sessions in {time.perf_counter() - start:.2f} s')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,92 @@
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Fixed capacity (rows x capacity) sample buffer backed by one preallocated NumPy array.
+
+    Every sample is stored twice, at its slot and at slot + capacity, so the most recent samples always sit in one
+    contiguous block of memory. That lets latest() hand out views instead of copies, and keeps the cost of append()
+    proportional to the chunk size rather than to the capacity.
+    """
+
+    def __init__(self, rows: int, capacity: int, dtype=np.float64):
+        """
+        :param rows: Number of rows (board channels) stored per sample.
+        :param capacity: Maximum number of samples kept in the buffer.
+        :param dtype: NumPy dtype of the storage array.
+        """
+        if rows <= 0 or capacity <= 0:
+            raise ValueError(f'rows and capacity must be positive, got {rows}x{capacity}')
+        self.rows = rows
+        self.capacity = capacity
+        self.total_written = 0
+        self._data = np.zeros((rows, 2 * capacity), dtype=dtype)
+        self._index = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def is_full(self) -> bool:
+        return self._size == self.capacity
+
+    def clear(self):
+        self.total_written = 0
+        self._index = 0
+        self._size = 0
+
+    def append(self, chunk: np.ndarray):
+        """
+        Append a (rows x n) chunk, overwriting the oldest samples once the buffer is full.
+
+        :param chunk: New samples, one column per sample.
+        """
+        num_samples = chunk.shape[1]
+        if chunk.shape[0] != self.rows:
+            raise ValueError(f'chunk has {chunk.shape[0]} rows, buffer expects {self.rows}')
+        self.total_written += num_samples
+        if num_samples > self.capacity:
+            chunk = chunk[:, -self.capacity:]
+            num_samples = self.capacity
+
+        first = min(num_samples, self.capacity - self._index)
+        self._write(self._index, chunk[:, :first])
+        if first < num_samples:
+            self._write(0, chunk[:, first:])
+
+        self._index = (self._index + num_samples) % self.capacity
+        self._size = min(self._size + num_samples, self.capacity)
+
+    def rewind(self, num_samples: int):
+        """
+        Drop the most recent samples so that the next append() overwrites them.
+
+        :param num_samples: Number of samples to drop, at most len(self).
+        """
+        if num_samples > self._size:
+            raise ValueError(f'cannot rewind {num_samples} samples, buffer holds {self._size}')
+        self.total_written -= num_samples
+        self._index = (self._index - num_samples) % self.capacity
+        self._size -= num_samples
+
+    def latest(self, num_samples: int = None) -> np.ndarray:
+        """
+        Get the most recent samples, oldest first, as a read-only view into the buffer.
+
+        :param num_samples: Number of samples to return, defaults to everything stored. Clipped to len(self).
+
+        :return: A (rows x num_samples) view, only valid until the next append().
+        """
+        if num_samples is None or num_samples > self._size:
+            num_samples = self._size
+        end = self._index + self.capacity
+        view = self._data[:, end - num_samples:end]
+        view.flags.writeable = False
+        return view
+
+    def _write(self, start: int, block: np.ndarray):
+        end = start + block.shape[1]
+        self._data[:, start:end] = block
+        self._data[:, start + self.capacity:end + self.capacity] = block
@@ -0,0 +1,495 @@
+import enum
+import logging
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from brainflow.board_shim import BoardShim
+from brainflow.data_filter import WindowFunctions
+
+from acquisition_scheduler import AdaptivePollScheduler
+from band_power_features import BandPowerExtractor
+from classifier_service import ConcentrationClassifier
+from latency_probes import latency_probes
+from psd_engine import PsdEngine
+from ring_buffer import RingBuffer
+from streaming_denoiser import StreamingDenoiser
+
+logger = logging.getLogger(__name__)
+
+
+class OverflowPolicy(enum.Enum):
+    """What a BoundedQueue does with a new item when it is already full"""
+
+    DROP_OLDEST = 0
+    DROP_NEWEST = 1
+    COALESCE = 2
+
+
+class BoundedQueue:
+    """
+    Thread safe FIFO with a fixed size and an explicit overflow policy.
+
+    With OverflowPolicy.COALESCE a new item arriving at a full queue is merged into the newest queued item with the
+    coalesce function, so no data is lost but the consumer sees fewer, larger items.
+    """
+
+    def __init__(self, maxsize: int, policy: OverflowPolicy, coalesce=None):
+        """
+        :param maxsize: Maximum number of queued items.
+        :param policy: Overflow policy applied once maxsize items are queued.
+        :param coalesce: Function (queued_item, new_item) -> merged_item, required for OverflowPolicy.COALESCE.
+        """
+        if policy == OverflowPolicy.COALESCE and coalesce is None:
+            raise ValueError('coalesce function is required for OverflowPolicy.COALESCE')
+        self.maxsize = maxsize
+        self.policy = policy
+        self.coalesce = coalesce
+        self.dropped = 0
+        self.coalesced = 0
+        self._items = deque()
+        self._not_empty = threading.Condition(threading.Lock())
+
+    def __len__(self) -> int:
+        with self._not_empty:
+            return len(self._items)
+
+    def put(self, item) -> bool:
+        """
+        Queue an item, applying the overflow policy if the queue is full.
+
+        :return: True if the queue was empty before this call, i.e. the consumer may need to be woken up.
+        """
+        with self._not_empty:
+            was_empty = not self._items
+            if len(self._items) < self.maxsize:
+                self._items.append(item)
+            elif self.policy == OverflowPolicy.DROP_OLDEST:
+                self._items.popleft()
+                self._items.append(item)
+                self.dropped += 1
+            elif self.policy == OverflowPolicy.DROP_NEWEST:
+                self.dropped += 1
+            else:
+                self._items[-1] = self.coalesce(self._items[-1], item)
+                self.coalesced += 1
+            self._not_empty.notify()
+            return was_empty
+
+    def get(self, timeout: float = None):
+        """
+        Take the oldest item, waiting up to timeout seconds for one to arrive.
+
+        :return: The item or None if the queue stayed empty.
+        """
+        with self._not_empty:
+            if not self._items:
+                self._not_empty.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def get_nowait(self):
+        return self.get(timeout=0)
+
+
+def concat_chunks(queued, new):
+    return np.hstack([queued, new])
+
+
+class ChunkPool:
+    """
+    Staging arrays the acquisition worker reads board data into and queues as is, without copying them.
+
+    A queued chunk is a view of a pool array and has to be released once its samples were consumed, after which the
+    array is handed out again. Arrays are only allocated while every pooled one is still in use, so the pool grows to
+    the number of chunks in flight and stays there.
+
+    :param capacity: Maximum number of samples per chunk.
+    """
+
+    def __init__(self, capacity: int = 8192):
+        self.capacity = capacity
+        self.allocations = 0
+        # id -> array of every pool array, strong references keep the ids unique
+        self._owned = {}
+        self._free = []
+        self._lock = threading.Lock()
+
+    def acquire(self, rows: int) -> np.ndarray:
+        """:return: A free (rows x capacity) array"""
+        with self._lock:
+            if self._free:
+                return self._free.pop()
+            array = np.empty((rows, self.capacity))
+            self._owned[id(array)] = array
+            self.allocations += 1
+            return array
+
+    def release(self, chunk: np.ndarray):
+        """Return the pool array chunk is a view of, chunks that are not pool views are ignored"""
+        base = chunk.base
+        with self._lock:
+            if base is not None and self._owned.get(id(base)) is base:
+                self._free.append(base)
+
+    def concat(self, queued: np.ndarray, new: np.ndarray) -> np.ndarray:
+        """Coalesce function for the chunk queue, the merged chunk is a copy so both inputs are released"""
+        merged = concat_chunks(queued, new)
+        self.release(queued)
+        self.release(new)
+        return merged
+
+
+class SessionFrame:
+    """
+    Ready to plot output of one processing step.
+
+    :param raw_waveform: (eeg channels x n) new raw samples.
+    :param processed_waveform: (eeg channels x n) processed samples matching raw_waveform.
+    :param psd_freqs: PSD frequency bins.
+    :param raw_psd: (eeg channels x bins) raw PSD.
+    :param processed_psd: (eeg channels x bins) processed PSD.
+    """
+    __slots__ = ('raw_waveform', 'processed_waveform', 'psd_freqs', 'raw_psd', 'processed_psd')
+
+    def __init__(self, raw_waveform, processed_waveform, psd_freqs, raw_psd, processed_psd):
+        self.raw_waveform = raw_waveform
+        self.processed_waveform = processed_waveform
+        self.psd_freqs = psd_freqs
+        self.raw_psd = raw_psd
+        self.processed_psd = processed_psd
+
+    @staticmethod
+    def merge(queued: "SessionFrame", new: "SessionFrame") -> "SessionFrame":
+        """Coalesce two frames: waveforms are concatenated so no samples are skipped, PSDs are taken from the newest"""
+        return SessionFrame(np.hstack([queued.raw_waveform, new.raw_waveform]),
+                            np.hstack([queued.processed_waveform, new.processed_waveform]),
+                            new.psd_freqs, new.raw_psd, new.processed_psd)
+
+
+class AcquisitionWorker(threading.Thread):
+    """
+    Producer thread polling the board and queueing raw chunks for the processing worker.
+
+    Polls are paced by an AdaptivePollScheduler, which is told after every poll how many samples it returned and how
+    many chunks are still waiting for the processing worker. Boards with read_into (BoardShim, PlaybackBoard) are read
+    into arrays of the ChunkPool, which are queued without a copy and released by the consumer, so polls do not
+    allocate once the pool has grown to the number of chunks in flight.
+    """
+
+    def __init__(self, board: BoardShim, output_queue: BoundedQueue, scheduler: AdaptivePollScheduler,
+                 pool: ChunkPool, timestamp_channel: int = None):
+        super().__init__(name='AcquisitionWorker', daemon=True)
+        self.board = board
+        self.output_queue = output_queue
+        self.scheduler = scheduler
+        self.pool = pool
+        # Row of the board's wall clock sample timestamps, feeds the board_read latency probe
+        self.timestamp_channel = timestamp_channel
+        # Rows of the board data, known after the first read, None for boards without read_into
+        self._rows = None
+        # Optional SessionRecorder, replaced as a whole by SessionPipeline.set_recorder
+        self.recorder = None
+        self._stop_event = threading.Event()
+
+    def run(self):
+        deadline = time.perf_counter() + self.scheduler.interval
+        while not self._stop_event.wait(max(deadline - time.perf_counter(), 0)):
+            woke = time.perf_counter()
+            current_data = self.read()
+            if current_data.shape[1] > 0:
+                if self.timestamp_channel is not None:
+                    latency_probes.record_age('board_read', current_data[self.timestamp_channel, -1])
+                recorder = self.recorder
+                if recorder is not None:
+                    # The recorder writes the chunk later on its own thread, after the pool array was reused
+                    recorder.append(current_data.copy())
+                self.output_queue.put(current_data)
+            else:
+                self.pool.release(current_data)
+
+            interval = self.scheduler.update(woke, current_data.shape[1], len(self.output_queue))
+            # Deadlines advance by the interval so wake up jitter does not accumulate, a poll that ends past the
+            # next deadline is an overrun and the schedule restarts from now
+            jitter = woke - deadline
+            deadline += interval
+            now = time.perf_counter()
+            overrun = now > deadline
+            if overrun:
+                deadline = now + interval
+            self.scheduler.stats.record(jitter, current_data.shape[1], overrun)
+
+    def read(self) -> np.ndarray:
+        if self._rows is None:
+            # The first read tells the number of rows
+            current_data = self.board.get_board_data()
+            if hasattr(self.board, 'read_into'):
+                self._rows = current_data.shape[0]
+            return current_data
+        staging = self.pool.acquire(self._rows)
+        return staging[:, :self.board.read_into(staging)]
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class ProcessingWorker(threading.Thread):
+    """
+    Consumer thread owning the sample history, running denoising, PSDs and classification and publishing SessionFrames.
+
+    Callbacks are invoked from this thread; Qt consumers should pass a signal's emit so that delivery is queued onto
+    the GUI thread.
+    """
+
+    def __init__(self, board_id: int, input_queue: BoundedQueue, output_queue: BoundedQueue, on_frame=None,
+                 on_classification=None, buffer_seconds: float = 7, classifier: ConcentrationClassifier = None,
+                 on_error=None, chunk_pool: ChunkPool = None, on_processing_error=None):
+        """
+        :param board_id: Board id used to look up the sampling rate and eeg channels.
+        :param input_queue: Queue of raw board chunks.
+        :param output_queue: Queue receiving SessionFrames.
+        :param on_frame: Called without arguments when output_queue goes from empty to non empty.
+        :param on_classification: Called with (theta, alpha, beta, concentration, sample_time) after each
+            classification, sample_time is the board timestamp of the newest classified sample.
+        :param buffer_seconds: Length of the sample history window.
+        :param classifier: Concentration classifier, see prepare_classifier, released when the worker stops.
+        :param on_error: Called with a message when the classifier cannot be prepared or fails, which disables
+            classification, so it is called at most once per session.
+        :param chunk_pool: Pool the chunks of input_queue are released to once processed.
+        :param on_processing_error: Called with a message when processing a chunk fails with an error different from
+            the previous failure, and with an empty string once a chunk is processed again. A persistent error, e.g.
+            a wavelet the backend rejects, is reported once instead of on every chunk.
+        """
+        super().__init__(name='ProcessingWorker', daemon=True)
+        self.board_id = board_id
+        self.input_queue = input_queue
+        self.output_queue = output_queue
+        self.on_frame = on_frame
+        self.on_classification = on_classification
+        self.on_error = on_error
+        self.on_processing_error = on_processing_error
+        self.chunk_pool = chunk_pool
+        self.buffer_seconds = buffer_seconds
+        self.classifier = classifier if classifier is not None else ConcentrationClassifier()
+        # Cleared when the classifier cannot be prepared or fails, requests are ignored from then on
+        self.classification_enabled = True
+        # Message of the processing failure reported last, None while chunks are processed fine
+        self.processing_error = None
+
+        # Board description is looked up once, nothing below queries the board library per chunk
+        descriptor = BoardShim.get_board_descriptor(board_id)
+        self.sampling_rate = descriptor.sampling_rate
+        self.eeg_channels = list(descriptor.eeg_channels)
+        self.timestamp_channel = descriptor.timestamp_channel
+        self.psd_engine = PsdEngine(self.sampling_rate, WindowFunctions.BLACKMAN_HARRIS.value)
+        self.feature_extractor = BandPowerExtractor(self.sampling_rate)
+
+        self.data_buffer = None
+        self.denoiser = None
+        self.welch = None
+        # eeg rows of the denoised window, row i holds eeg_channels[i]
+        self.processed_buffer = None
+
+        # (wavelet, decompose level), replaced as a whole so the worker never sees a half updated config
+        self.denoising = ('', 0)
+        self._classification_requested = threading.Event()
+        self._stop_event = threading.Event()
+
+    def set_denoising(self, wavelet: str, decompose: int):
+        self.denoising = (wavelet, decompose)
+
+    def prepare_classifier(self) -> bool:
+        """
+        Load the classifier model, called before the worker starts so a missing model is reported up front.
+
+        :return: False if it failed, classification is disabled then.
+        """
+        try:
+            self.classifier.prepare()
+        except Exception as e:
+            self.classification_enabled = False
+            self._fail('classifier could not be prepared', e)
+            return False
+        return True
+
+    def request_classification(self):
+        """Ask for a classification after the next processed chunk, repeated requests before that are coalesced"""
+        self._classification_requested.set()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            current_data = self.input_queue.get(timeout=0.1)
+            if current_data is None:
+                continue
+            try:
+                frame = self.process(current_data)
+            except Exception as e:
+                # Skip the chunk, the next one is processed against the buffer as it stands
+                self._fail_processing(e)
+                continue
+            finally:
+                # The samples were copied into data_buffer and the frame holds copies of its rows, none of them
+                # points into the pooled chunk
+                if self.chunk_pool is not None:
+                    self.chunk_pool.release(current_data)
+            if self.processing_error is not None:
+                logger.info('processing recovered')
+                self.processing_error = None
+                if self.on_processing_error is not None:
+                    self.on_processing_error('')
+            if frame is not None and self.output_queue.put(frame) and self.on_frame is not None:
+                self.on_frame()
+            if self.processed_buffer is not None and self._classification_requested.is_set():
+                self._classification_requested.clear()
+                if not self.classification_enabled:
+                    continue
+                try:
+                    result = self.classify()
+                except Exception as e:
+                    self.classification_enabled = False
+                    self._fail('classification failed and is disabled', e)
+                    continue
+                if self.on_classification is not None:
+                    self.on_classification(*result)
+        self.classifier.release()
+
+    def _fail_processing(self, error: Exception):
+        message = f'processing failed: {error}'
+        if message == self.processing_error:
+            logger.debug(message)
+            return
+        self.processing_error = message
+        logger.error('processing failed', exc_info=error)
+        if self.on_processing_error is not None:
+            self.on_processing_error(message)
+
+    def _fail(self, message: str, error: Exception):
+        logger.error(message, exc_info=error)
+        if self.on_error is not None:
+            self.on_error(f'{message}: {error}')
+
+    def process(self, current_data: np.ndarray) -> SessionFrame:
+        # Initialize/update buffer
+        if self.data_buffer is None:
+            capacity = max(int(self.buffer_seconds * self.sampling_rate), current_data.shape[1])
+            self.data_buffer = RingBuffer(current_data.shape[0], capacity)
+            self.data_buffer.append(current_data)
+            self.denoiser = StreamingDenoiser(self.eeg_channels, capacity)
+            self.welch = self.feature_extractor.streaming_welch(capacity)
+            return None
+        self.data_buffer.append(current_data)
+
+        # Raw data
+        raw_eeg = current_data[self.eeg_channels]
+
+        # Selectable psd range size
+        firstPowerOf2 = 1
+        nextPowerOf2 = 2
+        while nextPowerOf2 < len(self.data_buffer):
+            firstPowerOf2 = nextPowerOf2
+            nextPowerOf2 = nextPowerOf2 * 2
+        start = latency_probes.clock()
+        raw_psd, psd_x = self.psd_engine.psd(self.data_buffer.latest(firstPowerOf2)[self.eeg_channels])
+        latency_probes.record_since('psd', start)
+
+        # Data processing, the rolling filter only re-filters the new samples plus the denoiser's overlap margin
+        start = latency_probes.clock()
+        wavelet, decompose = self.denoising
+        if (wavelet, decompose) != (self.denoiser.wavelet, self.denoiser.decomposition_level):
+            self.denoiser.configure(wavelet, decompose)
+        processed_buffer = self.denoiser.update(self.data_buffer, current_data.shape[1])
+        self.processed_buffer = processed_buffer
+        latency_probes.record_since('denoise', start)
+
+        # Copied, the denoiser rewrites its buffer in place on the next tick while the frame may still be queued
+        processed_eeg = processed_buffer[:, -current_data.shape[1]:].copy()
+        start = latency_probes.clock()
+        processed_psd, psd_x = self.psd_engine.psd(processed_buffer[:, -firstPowerOf2:])
+        latency_probes.record_since('psd', start)
+
+        return SessionFrame(raw_eeg, processed_eeg, psd_x, raw_psd, processed_psd)
+
+    def classify(self):
+        # One Welch PSD per channel feeds both the band power monitor and the classifier, only the segments completed
+        # since the previous classification are transformed
+        start = latency_probes.clock()
+        ampls, freqs = self.welch.update(self.denoiser.buffer, self.denoiser.provisional, self.denoiser.generation)
+        features = self.feature_extractor.extract_psd(ampls, freqs, self.denoiser.buffer.latest())
+        theta, alpha, beta = features.monitor_band_powers
+        concentration_result = self.classifier.predict(features.feature_vector)
+        latency_probes.record_since('classification', start)
+
+        sample_time = self.data_buffer.latest(1)[self.timestamp_channel, 0]
+        latency_probes.record_age('classification_age', sample_time)
+        return theta, alpha, beta, concentration_result, sample_time
+
+
+class SessionPipeline:
+    """
+    Acquisition thread -> processing worker -> consumer, connected by bounded queues.
+
+    Raw chunks are coalesced rather than dropped so the sample history stays gap free; ready frames are coalesced
+    into a single pending frame so a slow consumer only ever sees the latest PSDs and the concatenated waveforms.
+    Nothing here depends on Qt, so the synthetic board path can be run headless.
+    """
+
+    def __init__(self, board: BoardShim, board_id: int, on_frame=None, on_classification=None,
+                 poll_interval: float = 0.04, buffer_seconds: float = 7, max_pending_chunks: int = 8,
+                 classifier: ConcentrationClassifier = None, on_error=None, on_processing_error=None):
+        self.chunk_pool = ChunkPool()
+        self.chunk_queue = BoundedQueue(max_pending_chunks, OverflowPolicy.COALESCE, self.chunk_pool.concat)
+        self.frame_queue = BoundedQueue(1, OverflowPolicy.COALESCE, SessionFrame.merge)
+        self.processing = ProcessingWorker(board_id, self.chunk_queue, self.frame_queue, on_frame,
+                                           on_classification, buffer_seconds, classifier, on_error, self.chunk_pool,
+                                           on_processing_error)
+        self.scheduler = AdaptivePollScheduler(self.processing.sampling_rate, poll_interval)
+        self.acquisition = AcquisitionWorker(board, self.chunk_queue, self.scheduler, self.chunk_pool,
+                                             timestamp_channel=self.processing.timestamp_channel)
+
+    def start(self) -> bool:
+        """
+        Prepare the classifier and start both threads, the session runs without classification if preparing fails.
+
+        :return: False if the classifier could not be prepared, on_error has been called then.
+        """
+        classifier_ready = self.processing.prepare_classifier()
+        self.processing.start()
+        self.acquisition.start()
+        return classifier_ready
+
+    def stop(self):
+        self.acquisition.stop()
+        self.acquisition.join()
+        self.processing.stop()
+        self.processing.join()
+
+    def set_denoising(self, wavelet: str, decompose: int):
+        self.processing.set_denoising(wavelet, decompose)
+
+    def request_classification(self):
+        self.processing.request_classification()
+
+    def set_recorder(self, recorder):
+        """Start passing raw chunks to a started SessionRecorder, None stops passing them"""
+        self.acquisition.recorder = recorder
+
+    def acquisition_stats(self) -> dict:
+        """
+        PollStats snapshot of the acquisition loop plus the current interval, raw chunks coalesced and staging arrays
+        allocated so far
+        """
+        stats = self.scheduler.stats.snapshot()
+        stats['interval_ms'] = self.scheduler.interval * 1e3
+        stats['coalesced_chunks'] = self.chunk_queue.coalesced
+        stats['staging_allocations'] = self.chunk_pool.allocations
+        return stats
+
+    def take_frame(self) -> SessionFrame:
+        """Non blocking, returns the pending frame or None"""
+        return self.frame_queue.get_nowait()
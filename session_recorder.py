@@ -0,0 +1,201 @@
+"""
+Chunked binary session recordings.
+
+File layout, all little endian:
+
+* 64 byte header: magic, format version, number of board rows, board id, sample item size (4 for float32, 8 for
+  float64), sampling rate, wall clock time of the first chunk, number of samples, byte offset of the index and the
+  row of the board timestamps (-1 if the board has none, missing from version 1 recordings);
+* samples, sample-major (num_samples x num_rows), appended chunk by chunk so the whole block can be opened as a single
+  np.memmap;
+* chunk index, one (first sample, wall clock time) entry per written chunk, appended when the recorder stops.
+
+A recording that was not stopped cleanly keeps num_samples = -1 in its header; SessionRecording then derives the
+number of samples from the file size and has an empty index.
+"""
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from session_pipeline import BoundedQueue, OverflowPolicy
+
+MAGIC = b'ADSREC\x00\x00'
+VERSION = 2
+HEADER = struct.Struct('<8sIIiIddqqi')
+HEADER_SIZE = 64
+INDEX_DTYPE = np.dtype([('sample', '<i8'), ('timestamp', '<f8')])
+
+
+def merge_timed_chunks(queued, new):
+    """Coalesce two (timestamp, chunk) items, the merged chunk keeps the timestamp of the older one"""
+    return queued[0], np.hstack([queued[1], new[1]])
+
+
+class SessionRecorder:
+    """
+    Appends raw board chunks to a recording on a background writer thread.
+
+    append only queues the chunk, so it can be called from the acquisition loop without waiting for the disk. If the
+    writer falls behind, queued chunks are concatenated instead of dropped.
+    """
+
+    def __init__(self, file_name: str, num_rows: int, sampling_rate: int, board_id: int, dtype=np.float64,
+                 max_pending_chunks: int = 64, timestamp_channel: int = None):
+        """
+        :param file_name: Recording file, overwritten if it exists.
+        :param num_rows: Number of rows of the board data, BoardShim.get_board_descriptor(board_id).num_rows.
+        :param sampling_rate: Sampling rate of the board.
+        :param dtype: np.float64 or np.float32 sample type on disk. float32 halves the file size but cannot hold unix
+            timestamps, its 24 bit mantissa rounds current ones to steps of 128 s, so playback and rescoring need
+            float64 for their timing.
+        :param timestamp_channel: Row of the board timestamps, lets playback re-stamp samples without the board library.
+        """
+        self.file_name = file_name
+        self.num_rows = num_rows
+        self.sampling_rate = sampling_rate
+        self.board_id = board_id
+        self.timestamp_channel = timestamp_channel
+        self.dtype = np.dtype(dtype).newbyteorder('<')
+        if self.dtype.kind != 'f' or self.dtype.itemsize not in (4, 8):
+            raise ValueError(f'unsupported sample type {dtype}')
+
+        self.num_samples = 0
+        self.start_time = None
+        self.error = None
+        self._index = []
+        self._queue = BoundedQueue(max_pending_chunks, OverflowPolicy.COALESCE, merge_timed_chunks)
+        self._file = None
+        self._thread = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        self._file = open(self.file_name, 'wb')
+        self._write_header(-1, 0)
+        self._thread = threading.Thread(target=self._run, name='SessionRecorder', daemon=True)
+        self._thread.start()
+
+    def append(self, chunk: np.ndarray):
+        """Queue a (num_rows x n) board chunk, never blocks"""
+        if chunk.shape[0] != self.num_rows:
+            raise ValueError(f'expected {self.num_rows} rows, got {chunk.shape[0]}')
+        if chunk.shape[1] > 0:
+            self._queue.put((time.time(), chunk))
+
+    def stop(self):
+        """Write the remaining chunks and the index, then close the file"""
+        self._stop_event.set()
+        self._thread.join()
+        if self.error is None:
+            index = np.array(self._index, dtype=INDEX_DTYPE)
+            index_offset = self._file.tell()
+            self._file.write(index.tobytes())
+            self._write_header(self.num_samples, index_offset)
+        self._file.close()
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _write_header(self, num_samples: int, index_offset: int):
+        self._file.seek(0)
+        header = HEADER.pack(MAGIC, VERSION, self.num_rows, self.board_id, self.dtype.itemsize,
+                             float(self.sampling_rate), self.start_time or 0.0, num_samples, index_offset,
+                             -1 if self.timestamp_channel is None else self.timestamp_channel)
+        self._file.write(header.ljust(HEADER_SIZE, b'\x00'))
+        self._file.seek(0, os.SEEK_END)
+
+    def _run(self):
+        while True:
+            item = self._queue.get(timeout=0.1)
+            if item is None:
+                if self._stop_event.is_set():
+                    break
+                continue
+            timestamp, chunk = item
+            try:
+                self._write_chunk(timestamp, chunk)
+            except OSError as e:
+                self.error = e
+                break
+
+    def _write_chunk(self, timestamp: float, chunk: np.ndarray):
+        if self.start_time is None:
+            self.start_time = timestamp
+        self._file.write(np.ascontiguousarray(chunk.T, dtype=self.dtype))
+        self._index.append((self.num_samples, timestamp))
+        self.num_samples += chunk.shape[1]
+
+
+class SessionRecording:
+    """
+    Read-only view of a recording, samples are memory mapped and only read from disk when sliced.
+
+    :param data: (num_rows x num_samples) memory mapped samples, laid out like BoardShim.get_board_data output.
+    :param index: Chunk index with 'sample' and 'timestamp' fields.
+    :param timestamp_channel: Row of the board timestamps, None if the board has none or the recording predates it.
+    """
+
+    def __init__(self, file_name: str):
+        self.file_name = file_name
+        with open(file_name, 'rb') as f:
+            header = HEADER.unpack(f.read(HEADER.size))
+            magic, version, self.num_rows, self.board_id, item_size, self.sampling_rate, self.start_time, \
+                num_samples, index_offset, timestamp_channel = header
+            if magic != MAGIC:
+                raise ValueError(f'{file_name} is not a session recording')
+            if version not in (1, VERSION):
+                raise ValueError(f'unsupported recording version {version}')
+            # Version 1 headers are zero padded where the timestamp row is stored now
+            self.timestamp_channel = timestamp_channel if version > 1 and timestamp_channel >= 0 else None
+
+            self.dtype = np.dtype(f'<f{item_size}')
+            sample_size = self.num_rows * item_size
+            if num_samples < 0:
+                num_samples = (os.fstat(f.fileno()).st_size - HEADER_SIZE) // sample_size
+                self.index = np.zeros(0, dtype=INDEX_DTYPE)
+            else:
+                f.seek(index_offset)
+                self.index = np.frombuffer(f.read(), dtype=INDEX_DTYPE)
+        self.num_samples = num_samples
+
+        if num_samples > 0:
+            samples = np.memmap(file_name, dtype=self.dtype, mode='r', offset=HEADER_SIZE,
+                                shape=(num_samples, self.num_rows))
+        else:
+            samples = np.zeros((0, self.num_rows), dtype=self.dtype)
+        self.data = samples.T
+
+    def __len__(self) -> int:
+        return self.num_samples
+
+    @property
+    def duration(self) -> float:
+        """Length of the recording in seconds"""
+        return self.num_samples / self.sampling_rate
+
+    def get_data(self, start: int = 0, stop: int = None, channels=None) -> np.ndarray:
+        """
+        Copy a range of samples into memory.
+
+        :param channels: Rows to return, all rows by default.
+
+        :return: (rows x samples) float64 array.
+        """
+        window = self.data[:, start:stop]
+        if channels is not None:
+            window = window[channels]
+        return np.array(window, dtype=np.float64)
+
+    def sample_at(self, timestamp: float) -> int:
+        """Approximate sample index recorded at wall clock time timestamp, interpolated between chunks"""
+        if len(self.index) == 0:
+            return int(round((timestamp - self.start_time) * self.sampling_rate))
+        return int(np.interp(timestamp, self.index['timestamp'], self.index['sample']))